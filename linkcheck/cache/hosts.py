@@ -0,0 +1,224 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Cache resolved host addresses and other DNS lookups.
+"""
+import socket
+import threading
+import time
+import Queue
+from .. import log, LOG_CACHE
+
+# maximum number of cached lookups
+DefaultMaxSize = 10000
+
+# number of threads resolving prefetched hosts
+NumPrefetchThreads = 2
+
+# maximum number of hosts waiting to be prefetched
+MaxPrefetchHosts = 1000
+
+
+class LookupCache (object):
+    """
+    Thread-safe cache of lookup results. Results expire at the time
+    given by the lookup function, failed lookups after the negative
+    time to live. Threads asking for a key that is being looked up wait
+    for that lookup instead of starting their own.
+    format: {key (string) -> (expiration time, lookup result or
+    exception of a failed lookup)}
+    """
+
+    def __init__ (self, negative_ttl, max_size=DefaultMaxSize):
+        """Initialize the cache.
+        @param negative_ttl: time to live of failed lookups in seconds
+        @param max_size: maximum number of cached lookups
+        """
+        self.negative_ttl = negative_ttl
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = {}
+        # {key -> event set when the running lookup of the key finished}
+        self.lookups = {}
+        self.hits = self.misses = 0
+
+    def get (self, key, lookup):
+        """Get the cached lookup result of given key, or look it up.
+        @param lookup: function called with the key, returning a tuple
+          (expiration time, result). An expiration time of None or a
+          result that is an exception mark a failed lookup.
+        @raises: the exception of a failed lookup
+        """
+        with self.lock:
+            entry = self._get_entry(key)
+            if entry is not None:
+                self.hits += 1
+                return get_result(entry)
+            self.misses += 1
+            event = self.lookups.get(key)
+            if event is None:
+                self.lookups[key] = threading.Event()
+        if event is None:
+            return get_result(self.lookup(key, lookup))
+        event.wait()
+        with self.lock:
+            entry = self.entries.get(key)
+        if entry is None:
+            # the entry has been removed in the meantime
+            entry = self.lookup(key, lookup)
+        return get_result(entry)
+
+    def _get_entry (self, key):
+        """Get cache entry of key if it has not expired. Not thread-safe!"""
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.time():
+            del self.entries[key]
+            entry = None
+        return entry
+
+    def lookup (self, key, lookup):
+        """Look up key, cache and return the entry. If the lookup raises
+        an exception, nothing is cached and waiting threads do their own
+        lookup."""
+        try:
+            expires, result = lookup(key)
+        except:
+            with self.lock:
+                event = self.lookups.pop(key, None)
+            if event is not None:
+                event.set()
+            raise
+        if expires is None or isinstance(result, Exception):
+            expires = time.time() + self.negative_ttl
+        entry = (expires, result)
+        with self.lock:
+            if len(self.entries) >= self.max_size:
+                self._remove_entries()
+            self.entries[key] = entry
+            event = self.lookups.pop(key, None)
+        if event is not None:
+            event.set()
+        return entry
+
+    def _remove_entries (self):
+        """Remove expired entries, and the entries expiring first if the
+        cache is still full. Not thread-safe!"""
+        now = time.time()
+        keys = [key for key, entry in self.entries.items()
+                if entry[0] < now]
+        if len(self.entries) - len(keys) >= self.max_size:
+            expiring = sorted(self.entries, key=lambda key: self.entries[key][0])
+            keys = expiring[:len(self.entries) - self.max_size // 2]
+        for key in keys:
+            del self.entries[key]
+
+    def __contains__ (self, key):
+        """Check if key is cached or being looked up."""
+        with self.lock:
+            return key in self.lookups or self._get_entry(key) is not None
+
+    def __len__ (self):
+        """Get number of cached lookups."""
+        return len(self.entries)
+
+
+class HostCache (LookupCache):
+    """
+    Cache of the IP addresses of host names. Addresses expire after
+    the given time to live. Prefetched hosts are resolved in the
+    background.
+    format: {host (string) -> (expiration time, list of IP addresses
+    or socket.error of a failed lookup)}
+    """
+
+    def __init__ (self, ttl, negative_ttl, max_size=DefaultMaxSize):
+        """Initialize the host cache.
+        @param ttl: time to live of resolved addresses in seconds
+        @param negative_ttl: time to live of failed lookups in seconds
+        @param max_size: maximum number of cached hosts
+        """
+        super(HostCache, self).__init__(negative_ttl, max_size=max_size)
+        self.ttl = ttl
+        self.prefetch_queue = None
+
+    def get_addresses (self, host):
+        """Get the IP addresses of given host.
+        @return: list of IP addresses in the order of socket.getaddrinfo()
+        @rtype: list
+        @raises: socket.error if the host could not be resolved
+        """
+        return self.get(host.lower(), self.resolve)
+
+    def resolve (self, host):
+        """Resolve host.
+        @return: tuple (expiration time, list of IP addresses or
+          socket.error)
+        """
+        log.debug(LOG_CACHE, "Resolve host %r", host)
+        try:
+            addresses = []
+            for res in socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM):
+                # res is a tuple (address family, socket type, protocol,
+                #  canonical name, socket address)
+                if res[4][0] not in addresses:
+                    addresses.append(res[4][0])
+            return time.time() + self.ttl, addresses
+        except socket.error as msg:
+            log.debug(LOG_CACHE, "Could not resolve host %r: %s", host, msg)
+            return None, msg
+        except UnicodeError as msg:
+            return None, socket.gaierror(socket.EAI_NONAME, str(msg))
+
+    def prefetch (self, host):
+        """Resolve host in the background if it is not cached. Hosts are
+        dropped if too many hosts are waiting to be resolved."""
+        host = host.lower()
+        if host in self:
+            return
+        with self.lock:
+            if self.prefetch_queue is None:
+                self.start_prefetch_threads()
+        try:
+            self.prefetch_queue.put_nowait(host)
+        except Queue.Full:
+            pass
+
+    def start_prefetch_threads (self):
+        """Start the threads resolving prefetched hosts. Not thread-safe!"""
+        self.prefetch_queue = Queue.Queue(MaxPrefetchHosts)
+        for i in range(NumPrefetchThreads):
+            t = threading.Thread(target=self.run_prefetch,
+                                 name="PrefetchHosts-%d" % i)
+            t.daemon = True
+            t.start()
+
+    def run_prefetch (self):
+        """Resolve prefetched hosts forever."""
+        while True:
+            host = self.prefetch_queue.get()
+            try:
+                self.get_addresses(host)
+            except socket.error:
+                pass
+
+
+def get_result (entry):
+    """Get the lookup result of a cache entry, or raise the exception
+    of a failed lookup."""
+    if isinstance(entry[1], Exception):
+        raise entry[1]
+    return entry[1]
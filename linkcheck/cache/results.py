@@ -17,49 +17,173 @@
 """
 Cache check results.
 """
-from ..decorators import synchronized
+import sys
+import collections
 from ..lock import get_lock
 
 
-# lock object
-cache_lock = get_lock("results_cache_lock")
+# default number of cache shards
+NumShards = 16
+
+
+def get_result_size(key, result):
+    """Estimate the memory size in bytes of a cache entry."""
+    size = sys.getsizeof(key) + sys.getsizeof(result)
+    for attr in result.__slots__:
+        value = getattr(result, attr)
+        size += sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(sys.getsizeof(x) for x in value)
+    return size
+
+
+def get_shard_limit(limit, num_shards):
+    """Divide a size limit of the whole cache evenly among the shards."""
+    if limit is None:
+        return None
+    return max(1, (limit + num_shards - 1) // num_shards)
 
 
 class ResultCache(object):
     """
     Thread-safe cache of UrlData.to_wire() results.
     the cache is limited in size since we rather recheck the same URL
-    multiple times instead of running out of memory.
+    multiple times instead of running out of memory. When the cache is
+    full, the results that have not been used recently are removed.
+    The size is limited by the number of results and/or by the estimated
+    memory size of the results in bytes.
+
+    Looking up results needs no lock. Adding results locks only one of
+    several shards, selected by the hash of the key, so threads seldom
+    wait for each other. The size limits are divided evenly among the
+    shards.
     format: {cache key (string) -> result (UrlData.towire())}
     """
 
-    def __init__(self, max_size=100000):
+    def __init__(self, max_size=100000, max_bytes=None, num_shards=NumShards):
         """Initialize result cache."""
-        # mapping {URL -> cached result}
-        self.cache = {}
-        self.max_size = max_size
+        max_size = get_shard_limit(max_size, num_shards)
+        max_bytes = get_shard_limit(max_bytes, num_shards)
+        self.shards = [ResultCacheShard(max_size, max_bytes, i)
+                       for i in range(num_shards)]
+
+    def get_shard(self, key):
+        """Get the shard that stores the result of the given key."""
+        return self.shards[hash(key) % len(self.shards)]
 
-    @synchronized(cache_lock)
     def get_result(self, key):
         """Return cached result or None if not found."""
-        return self.cache.get(key)
+        return self.get_shard(key).get_result(key)
 
-    @synchronized(cache_lock)
     def add_result(self, key, result):
         """Add result object to cache with given key.
-        The request is ignored when the cache is already full or the key
-        is None.
+        The request is ignored when the key is None. If the cache is
+        full the results that have not been used recently are removed.
         """
-        if len(self.cache) > self.max_size:
+        if key is None:
             return
-        if key is not None:
-            self.cache[key] = result
+        self.get_shard(key).add_result(key, result)
 
     def has_result(self, key):
         """Non-thread-safe function for fast containment checks."""
-        return key in self.cache
+        return key in self.get_shard(key).cache
+
+    @property
+    def num_added(self):
+        """Number of added results, including re-added evicted ones."""
+        return sum(shard.num_added for shard in self.shards)
+
+    def get_stats(self):
+        """Get cache statistics.
+        @return: dictionary with number of hits, misses, evictions
+          and cached results
+        @rtype: dict
+        """
+        return dict(
+            hits=sum(shard.hits for shard in self.shards),
+            misses=sum(shard.misses for shard in self.shards),
+            evictions=sum(shard.evictions for shard in self.shards),
+            size=len(self),
+        )
 
     def __len__(self):
         """Get number of cached elements. This is not thread-safe and is
         likely to change before the returned value is used."""
-        return len(self.cache)
+        return sum(len(shard.cache) for shard in self.shards)
+
+
+class ResultCacheShard(object):
+    """
+    Thread-safe cache of a part of the results.
+    The eviction uses the second chance (CLOCK) algorithm: results are
+    evicted in insertion order, but results that were used since they
+    were added or checked the last time are moved to the end once more.
+    This approximates LRU eviction without having to lock lookups.
+    format: {cache key (string) -> result (UrlData.towire())}
+    """
+
+    def __init__(self, max_size, max_bytes, num):
+        """Initialize cache shard with given size limits."""
+        self.lock = get_lock("results_cache_lock_%d" % num)
+        # mapping {URL -> cached result} in insertion order
+        self.cache = collections.OrderedDict()
+        # keys of results that were used since the last eviction check
+        self.used = set()
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        # statistics
+        self.hits = self.misses = self.evictions = 0
+        self.num_added = 0
+
+    def get_result(self, key):
+        """Return cached result or None if not found.
+        Thread-safe without locking since dictionary lookups and set
+        additions are atomic. The statistics counters are not exact
+        when several threads update them at the same time."""
+        result = self.cache.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.used.add(key)
+        return result
+
+    def add_result(self, key, result):
+        """Add result object to cache with given key and remove
+        results if the cache is full."""
+        with self.lock:
+            old_result = self.cache.pop(key, None)
+            if old_result is None:
+                self.num_added += 1
+                # the key may have been marked after it was evicted
+                self.used.discard(key)
+            elif self.max_bytes is not None:
+                self.num_bytes -= get_result_size(key, old_result)
+            self.cache[key] = result
+            if self.max_bytes is not None:
+                self.num_bytes += get_result_size(key, result)
+            self.evict()
+
+    def evict(self):
+        """Remove results until the cache is not full. Results that have
+        been used get a second chance. Not thread-safe!"""
+        while len(self.cache) > 1 and self.is_full():
+            key, result = self.cache.popitem(last=False)
+            if key in self.used:
+                self.used.discard(key)
+                self.cache[key] = result
+                continue
+            if self.max_bytes is not None:
+                self.num_bytes -= get_result_size(key, result)
+            self.evictions += 1
+        if len(self.used) > len(self.cache):
+            # remove keys that get_result() marked after their result
+            # was evicted
+            self.used.intersection_update(self.cache)
+
+    def is_full(self):
+        """Check if cache exceeds its size limits. Not thread-safe!"""
+        if self.max_size is not None and len(self.cache) > self.max_size:
+            return True
+        return self.max_bytes is not None and self.num_bytes > self.max_bytes
@@ -17,56 +17,99 @@
 """
 Cache robots.txt contents.
 """
-from .. import robotparser2
-from ..containers import LFUCache
+import time
+import threading
+import weakref
+import Queue
+from .. import robotparser2, log, LOG_CACHE
 from ..decorators import synchronized
 from ..lock import get_lock
+from . import hosts
 
 
-# lock objects
-cache_lock = get_lock("robots.txt_cache_lock")
+# lock object
 robot_lock = get_lock("robots.txt_robot_lock")
 
+# minimum number of seconds a fetched robots.txt file is cached, even if
+# its caching headers allow less
+MinTtl = 60
+
+# number of threads fetching prefetched robots.txt files
+NumPrefetchThreads = 2
+
+# maximum number of robots.txt URLs waiting to be prefetched
+MaxPrefetchUrls = 1000
+
 
 class RobotsTxt (object):
     """
-    Thread-safe cache of downloaded robots.txt files.
-    format: {cache key (string) -> robots.txt content (RobotFileParser)}
+    Thread-safe cache of downloaded robots.txt files. Files expire after
+    the time allowed by their HTTP caching headers, or after the given
+    time to live if there are none. Files that could not be fetched
+    are cached for the negative time to live.
+    format: {robots.txt URL (string) -> (expiration time, RobotFileParser)}
     """
 
-    def __init__ (self, useragent):
-        """Initialize per-URL robots.txt cache."""
-        # mapping {URL -> parsed robots.txt}
-        self.cache = LFUCache(size=100)
-        self.hits = self.misses = 0
-        self.roboturl_locks = {}
+    def __init__ (self, useragent, max_size=10000, ttl=24*60*60,
+                  negative_ttl=60*60, timeout=None):
+        """Initialize per-URL robots.txt cache.
+        @param max_size: maximum number of cached robots.txt files
+        @param ttl: time to live in seconds of fetched robots.txt files
+          without caching headers
+        @param negative_ttl: time to live in seconds of robots.txt files
+          that could not be fetched
+        @param timeout: request timeout in seconds or None
+        """
+        self.cache = hosts.LookupCache(negative_ttl, max_size=max_size)
+        self.ttl = ttl
+        self.timeout = timeout
         self.useragent = useragent
+        # robots.txt files whose crawl delay and sitemaps have been used
+        self.used = weakref.WeakKeyDictionary()
+        self.prefetch_queue = None
 
     def allows_url (self, url_data):
         """Ask robots.txt allowance."""
         roboturl = url_data.get_robots_txt_url()
-        with self.get_lock(roboturl):
-            return self._allows_url(url_data, roboturl)
-
-    def _allows_url (self, url_data, roboturl):
-        """Ask robots.txt allowance. Assumes only single thread per robots.txt
-        URL calls this function."""
-        with cache_lock:
-            if roboturl in self.cache:
-                self.hits += 1
-                rp = self.cache[roboturl]
-                return rp.can_fetch(self.useragent, url_data.url)
-            self.misses += 1
         kwargs = dict(auth=url_data.auth, session=url_data.session)
         if hasattr(url_data, "proxy") and hasattr(url_data, "proxy_type"):
             kwargs["proxies"] = {url_data.proxytype: url_data.proxy}
-        rp = robotparser2.RobotFileParser(**kwargs)
+        rp = self.cache.get(roboturl, lambda url: self.fetch(url, **kwargs))
+        if self.set_used(rp):
+            self.set_crawl_delay(rp, url_data)
+            self.add_sitemap_urls(rp, url_data, roboturl)
+        return rp.can_fetch(self.useragent, url_data.url)
+
+    def fetch (self, roboturl, **kwargs):
+        """Fetch and parse robots.txt file.
+        @return: tuple (expiration time or None if the file could not
+          be fetched, RobotFileParser)
+        """
+        rp = robotparser2.RobotFileParser(timeout=self.timeout, **kwargs)
         rp.set_url(roboturl)
         rp.read()
-        with cache_lock:
-            self.cache[roboturl] = rp
-        self.add_sitemap_urls(rp, url_data, roboturl)
-        return rp.can_fetch(self.useragent, url_data.url)
+        if rp.fetch_error:
+            return None, rp
+        ttl = self.ttl if rp.max_age is None else rp.max_age
+        return time.time() + max(ttl, MinTtl), rp
+
+    @synchronized(robot_lock)
+    def set_used (self, rp):
+        """Mark robots.txt file as used.
+        @return: False if the file has been used before
+        @rtype: bool
+        """
+        if rp in self.used:
+            return False
+        self.used[rp] = True
+        return True
+
+    def set_crawl_delay(self, rp, url_data):
+        """Throttle requests to the URL host by the robots.txt
+        Crawl-delay."""
+        delay = rp.get_crawldelay(self.useragent)
+        if delay:
+            url_data.aggregate.throttle.set_crawl_delay(url_data.urlparts[1], delay)
 
     def add_sitemap_urls(self, rp, url_data, roboturl):
         """Add sitemap URLs to queue."""
@@ -75,7 +118,48 @@ class RobotsTxt (object):
         for sitemap_url, line in rp.sitemap_urls:
             url_data.add_url(sitemap_url, line=line)
 
-    @synchronized(robot_lock)
-    def get_lock(self, roboturl):
-        """Return lock for robots.txt url."""
-        return self.roboturl_locks.setdefault(roboturl, get_lock(roboturl))
+    def prefetch (self, url_data):
+        """Fetch the robots.txt file of the host of given URL in the
+        background, if the URL will be checked and needs no credentials
+        or proxy to fetch it."""
+        if url_data.has_result or url_data.extern[1] or \
+           url_data.scheme not in ("http", "https"):
+            return
+        if url_data.aggregate.config["proxy"].get(url_data.scheme) or \
+           url_data.get_user_password()[0] is not None:
+            return
+        roboturl = url_data.get_robots_txt_url()
+        if roboturl in self.cache:
+            return
+        with robot_lock:
+            if self.prefetch_queue is None:
+                self.start_prefetch_threads()
+        try:
+            self.prefetch_queue.put_nowait((roboturl, url_data.aggregate))
+        except Queue.Full:
+            pass
+
+    def start_prefetch_threads (self):
+        """Start the threads fetching prefetched robots.txt files.
+        Not thread-safe!"""
+        self.prefetch_queue = Queue.Queue(MaxPrefetchUrls)
+        for i in range(NumPrefetchThreads):
+            t = threading.Thread(target=self.run_prefetch,
+                                 name="PrefetchRobotsTxt-%d" % i)
+            t.daemon = True
+            t.start()
+
+    def run_prefetch (self):
+        """Fetch prefetched robots.txt files forever."""
+        while True:
+            roboturl, aggregate = self.prefetch_queue.get()
+            try:
+                session = aggregate.get_request_session()
+            except KeyError:
+                aggregate.add_request_session()
+                session = aggregate.get_request_session()
+            try:
+                self.cache.get(roboturl,
+                    lambda url: self.fetch(url, session=session))
+            except Exception as msg:
+                log.debug(LOG_CACHE, "Prefetching %s failed: %s", roboturl, msg)
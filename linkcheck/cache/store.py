@@ -0,0 +1,206 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Store check results on disk for the next run.
+"""
+import os
+import time
+import sqlite3
+import cPickle as pickle
+from .. import log, LOG_CACHE
+from ..decorators import synchronized
+from ..lock import get_lock
+
+
+# lock object
+store_lock = get_lock("result_store_lock")
+
+# increase when the stored data format changes
+StoreVersion = 1
+
+# commit changes after this number of stored results
+CommitInterval = 100
+
+# seconds to wait for the database lock of another process when the
+# database file is shared by worker processes
+SharedTimeout = 60.0
+
+
+class StoredResult (object):
+    """A result read from the result store."""
+
+    def __init__ (self, result, links, etag, last_modified, expires):
+        """Store result data.
+        @param result: the stored check result
+        @type result: CompactUrlData
+        @param links: argument tuples of the UrlBase.add_url() calls of
+          the stored check
+        @type links: list of tuples
+        @param etag: ETag header value or None
+        @param last_modified: Last-Modified header value or None
+        @param expires: expiration time in seconds since the epoch
+        @type expires: float
+        """
+        self.result = result
+        self.links = links
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    def is_fresh (self):
+        """Check if the result has not expired yet."""
+        return time.time() < self.expires
+
+
+class ResultStore (object):
+    """
+    Thread-safe SQLite database of UrlData.to_wire() results.
+    Results expire after the given time to live. Expired results
+    with an ETag or Last-Modified header are kept for conditional
+    HTTP requests.
+    Worker processes share the database file. A shared store waits
+    longer for the database lock and commits every change, so other
+    processes get the lock soon. Database errors, eg. a lock timeout,
+    only lose the affected result.
+    format: {cache key (string) -> StoredResult}
+    """
+
+    def __init__ (self, filename, ttl, shared=False):
+        """Open the result database.
+        @param filename: name of the SQLite database file
+        @param ttl: time to live of stored results in seconds
+        @param shared: if True, other processes use the database, too
+        @type shared: bool
+        """
+        self.filename = os.path.expanduser(filename)
+        self.ttl = ttl
+        self.num_changes = 0
+        if shared:
+            self.commit_interval = 1
+            timeout = SharedTimeout
+        else:
+            self.commit_interval = CommitInterval
+            # the default of the sqlite3 module
+            timeout = 5.0
+        self.conn = sqlite3.connect(self.filename, timeout=timeout,
+                                    check_same_thread=False)
+        self.conn.text_factory = unicode
+        self.init_db()
+
+    def init_db (self):
+        """Create the results table and remove results that can not be
+        used anymore."""
+        version = self.conn.execute("pragma user_version").fetchone()[0]
+        if version != StoreVersion:
+            log.debug(LOG_CACHE, "Reset result store %s with version %d",
+                      self.filename, version)
+            self.conn.execute("drop table if exists results")
+            self.conn.execute("pragma user_version=%d" % StoreVersion)
+        self.conn.execute("""create table if not exists results (
+            key text primary key,
+            result blob not null,
+            links blob not null,
+            etag text,
+            last_modified text,
+            expires real not null
+        )""")
+        self.conn.execute("""delete from results where expires < ? and
+            etag is null and last_modified is null""", (time.time(),))
+        self.conn.commit()
+
+    @synchronized(store_lock)
+    def get_result (self, key):
+        """Return stored result or None if not found."""
+        if self.conn is None:
+            return None
+        try:
+            row = self.conn.execute("""select result, links, etag,
+                last_modified, expires from results where key=?""",
+                (key,)).fetchone()
+        except sqlite3.Error as msg:
+            log.debug(LOG_CACHE, "Could not read stored result of %s: %s",
+                      key, msg)
+            return None
+        if row is None:
+            return None
+        try:
+            result = pickle.loads(str(row[0]))
+            links = pickle.loads(str(row[1]))
+        except Exception as msg:
+            log.debug(LOG_CACHE, "Invalid stored result for %s: %s", key, msg)
+            return None
+        return StoredResult(result, links, row[2], row[3], row[4])
+
+    @synchronized(store_lock)
+    def add_result (self, key, result, links, etag=None, last_modified=None):
+        """Store result object with given key. It expires after the time
+        to live of this store.
+        """
+        if self.conn is None or key is None:
+            return
+        data = (key,
+            buffer(pickle.dumps(result, pickle.HIGHEST_PROTOCOL)),
+            buffer(pickle.dumps(links, pickle.HIGHEST_PROTOCOL)),
+            etag, last_modified, time.time() + self.ttl)
+        try:
+            self.conn.execute("""insert or replace into results
+                (key, result, links, etag, last_modified, expires)
+                values (?, ?, ?, ?, ?, ?)""", data)
+            self._changed()
+        except sqlite3.Error as msg:
+            log.debug(LOG_CACHE, "Could not store result of %s: %s",
+                      key, msg)
+
+    @synchronized(store_lock)
+    def refresh_result (self, key):
+        """Renew the expiration time of the result with given key, eg.
+        when the server reported that the content has not been modified."""
+        if self.conn is None:
+            return
+        try:
+            self.conn.execute("update results set expires=? where key=?",
+                              (time.time() + self.ttl, key))
+            self._changed()
+        except sqlite3.Error as msg:
+            log.debug(LOG_CACHE, "Could not refresh stored result of %s: %s",
+                      key, msg)
+
+    def _changed (self):
+        """Commit after a number of changes. Not thread-safe!"""
+        self.num_changes += 1
+        if self.num_changes >= self.commit_interval:
+            self.conn.commit()
+            self.num_changes = 0
+
+    @synchronized(store_lock)
+    def close (self):
+        """Commit all changes and close the database."""
+        if self.conn is None:
+            return
+        try:
+            self.conn.commit()
+        except sqlite3.Error as msg:
+            log.debug(LOG_CACHE, "Could not commit stored results: %s", msg)
+        self.conn.close()
+        self.conn = None
+
+    @synchronized(store_lock)
+    def __len__ (self):
+        """Get number of stored results."""
+        if self.conn is None:
+            return 0
+        return self.conn.execute("select count(*) from results").fetchone()[0]
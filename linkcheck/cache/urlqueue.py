@@ -19,6 +19,7 @@ Handle a queue of URLs to check.
 """
 import threading
 import collections
+import heapq
 from time import time as _time
 from .. import log, LOG_CACHE
 
@@ -32,24 +33,133 @@ class Empty(Exception):
     pass
 
 
-NUM_PUTS_CLEANUP = 10000
+def get_host (url_data):
+    """Get the host key used for scheduling the given URL. URLs without
+    a host (eg. local files) get the empty host key, which is not limited.
+    @return: host key
+    @rtype: unicode
+    """
+    if url_data.urlparts is None:
+        return u""
+    return url_data.urlparts[1]
+
+
+class UrlRef (object):
+    """Lightweight record of a queued URL whose cache key is already
+    queued or being checked. It only stores the data needed to log the
+    cached result of the first URL with this key for this occurrence,
+    or to construct the URL data again when that result is missing.
+    References can be pickled without their aggregate."""
+
+    __slots__ = ("url_class", "url", "cache_url", "host", "aggregate",
+        "base_url", "parent_url", "base_ref", "recursion_level", "line",
+        "column", "page", "name", "extern", "anchor")
+
+    # a reference never has a result of its own
+    has_result = False
+
+    @property
+    def ContentMimetypes (self):
+        """Parseable content types of the URL class."""
+        return self.url_class.ContentMimetypes
+
+    def __init__ (self, url_data):
+        """Store the URL specific data of given URL data."""
+        self.url_class = url_data.__class__
+        self.url = url_data.url
+        self.cache_url = url_data.cache_url
+        self.host = get_host(url_data)
+        self.aggregate = url_data.aggregate
+        self.base_url = url_data.base_url
+        self.parent_url = url_data.parent_url
+        self.base_ref = url_data.base_ref
+        self.recursion_level = url_data.recursion_level
+        self.line = url_data.line
+        self.column = url_data.column
+        self.page = url_data.page
+        self.name = url_data.name
+        self.extern = url_data.extern
+        self.anchor = url_data.anchor
+
+    def get_url_data (self):
+        """Construct the URL data of this reference again.
+        @return: new URL data
+        @rtype: instance of url_class
+        """
+        return self.url_class(self.base_url, self.recursion_level,
+            self.aggregate, parent_url=self.parent_url,
+            base_ref=self.base_ref, line=self.line, column=self.column,
+            page=self.page, name=self.name, extern=self.extern)
+
+    def __getstate__ (self):
+        """Get all data except the aggregate for pickling."""
+        return dict((name, getattr(self, name)) for name in self.__slots__
+                    if name != "aggregate")
+
+    def __setstate__ (self, state):
+        """Set unpickled data. The aggregate has to be set afterwards."""
+        self.aggregate = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
 
 class UrlQueue (object):
     """A queue supporting several consumer tasks. The task_done() idea is
-    from the Python 2.5 implementation of Queue.Queue()."""
+    from the Python 2.5 implementation of Queue.Queue().
 
-    def __init__ (self, max_allowed_urls=None):
-        """Initialize the queue state and task counters."""
+    URLs which already have a result are checked first. All other URLs
+    are stored in one FIFO queue per host. URLs with the same cache key
+    as a queued URL or an URL in progress are only stored as UrlRef
+    records until the result of that URL is available. When a result
+    is added to the cache, the queued URLs and references with the same
+    cache key are promoted to the URLs with a result. Promoted URLs are
+    removed lazily from their host queue when they reach its front.
+    A host is ready when it has less than max_connections_per_host URLs
+    in progress and when its throttling due time (see
+    Aggregate.get_host_due_time()) has passed. Ready hosts are kept in
+    a heap ordered by their due time, so get() only returns URLs whose
+    host may be contacted now."""
+
+    def __init__ (self, max_allowed_urls=None, max_connections_per_host=None,
+                  new_host_callback=None):
+        """Initialize the queue state and task counters.
+        @param new_host_callback: if given, called with the first queued
+          URL of each host that has no queued URLs, eg. to prefetch data
+          of the host. It must not block.
+        @ptype new_host_callback: function or None
+        """
+        self.new_host_callback = new_host_callback
         # Note: don't put a maximum size on the queue since it would
         # lead to deadlocks when all worker threads called put().
+        # URLs with a result in the cache
         self.queue = collections.deque()
+        # {host -> deque of URLs}
+        self.host_queues = {}
+        # {cache key -> URL in a host queue}
+        self.pending = {}
+        # cache keys of URLs from host queues in progress
+        self.checking = set()
+        # {cache key -> list of UrlRef waiting for the result of the key}
+        self.refs = {}
+        # ids of promoted URLs which are still in a host queue
+        self.promoted = set()
+        # heap with entries (due time, sequence number, host)
+        self.host_heap = []
+        # the hosts that have an entry in the heap
+        self.host_scheduled = set()
+        # {host -> number of URLs in progress}
+        self.host_in_progress = collections.defaultdict(int)
+        # {id(url_data) -> host} of URLs in progress
+        self.in_progress_hosts = {}
+        self.host_seq = 0
+        self.num_queued = 0
         # mutex must be held whenever the queue is mutating.  All methods
         # that acquire mutex must release it before returning.  mutex
         # is shared between the two conditions, so acquiring and
         # releasing the conditions also acquires and releases mutex.
         self.mutex = threading.Lock()
-        # Notify not_empty whenever an item is added to the queue; a
-        # thread waiting to get is notified then.
+        # Notify not_empty whenever an item is added to the queue or
+        # a host gets ready; a thread waiting to get is notified then.
         self.not_empty = threading.Condition(self.mutex)
         self.all_tasks_done = threading.Condition(self.mutex)
         self.unfinished_tasks = 0
@@ -61,12 +171,16 @@ class UrlQueue (object):
         if max_allowed_urls is not None and max_allowed_urls <= 0:
             raise ValueError("Non-positive number of allowed URLs: %d" % max_allowed_urls)
         self.max_allowed_urls = max_allowed_urls
-        self.num_puts = 0
+        if max_connections_per_host is not None and \
+           max_connections_per_host <= 0:
+            raise ValueError("Non-positive number of connections per host: %d"
+                             % max_connections_per_host)
+        self.max_connections_per_host = max_connections_per_host
 
     def qsize (self):
         """Return the approximate size of the queue (not reliable!)."""
         with self.mutex:
-            return len(self.queue)
+            return self.num_queued
 
     def empty (self):
         """Return True if the queue is empty, False otherwise.
@@ -78,7 +192,7 @@ class UrlQueue (object):
     def _empty (self):
         """Return True if the queue is empty, False otherwise.
         Not thread-safe!"""
-        return not self.queue
+        return self.num_queued == 0
 
     def get (self, timeout=None):
         """Get first not-in-progress url from the queue and
@@ -90,20 +204,110 @@ class UrlQueue (object):
     def _get (self, timeout):
         """Non thread-safe utility function of self.get() doing the real
         work."""
-        if timeout is None:
-            while self._empty():
-                self.not_empty.wait()
-        else:
+        if timeout is not None:
             if timeout < 0:
                 raise ValueError("'timeout' must be a positive number")
             endtime = _time() + timeout
-            while self._empty():
+        while True:
+            url_data, wait = self._get_ready()
+            if url_data is not None:
+                self.in_progress += 1
+                self.num_queued -= 1
+                return url_data
+            if timeout is not None:
                 remaining = endtime - _time()
                 if remaining <= 0.0:
                     raise Empty()
-                self.not_empty.wait(remaining)
-        self.in_progress += 1
-        return self.queue.popleft()
+                if wait is None or wait > remaining:
+                    wait = remaining
+            self.not_empty.wait(wait)
+
+    def _get_ready (self):
+        """Get an URL whose host is ready.
+        @return: tuple (url_data, None) if an URL is available,
+          else (None, seconds to wait or None to wait for a notify)
+        """
+        if self.queue:
+            url_data = self.queue.popleft()
+            self.in_progress_hosts[id(url_data)] = None
+            return url_data, None
+        while self.host_heap:
+            due, dummy, host = self.host_heap[0]
+            now = _time()
+            if due > now:
+                return None, due - now
+            heapq.heappop(self.host_heap)
+            urls = self.host_queues[host]
+            self._remove_promoted(urls)
+            if not urls:
+                del self.host_queues[host]
+                self.host_scheduled.discard(host)
+                continue
+            # the throttling due time could have been moved since
+            # the host was scheduled
+            due = self.get_host_due_time(urls[0], host)
+            if due > now:
+                self._push_host(host, due)
+                continue
+            self.host_scheduled.discard(host)
+            url_data = urls.popleft()
+            self._remove_promoted(urls)
+            if not urls:
+                del self.host_queues[host]
+            del self.pending[url_data.cache_url]
+            self.checking.add(url_data.cache_url)
+            self.host_in_progress[host] += 1
+            self.in_progress_hosts[id(url_data)] = host
+            self._schedule_host(host)
+            return url_data, None
+        return None, None
+
+    def _remove_promoted (self, urls):
+        """Remove promoted URLs from the front of a host queue."""
+        while urls and id(urls[0]) in self.promoted:
+            self.promoted.remove(id(urls.popleft()))
+
+    def promote (self, key):
+        """Check queued URLs and references with given cache key before
+        all other URLs since their result is available now."""
+        with self.mutex:
+            url_data = self.pending.pop(key, None)
+            if url_data is not None:
+                self.queue.append(url_data)
+                self.promoted.add(id(url_data))
+                self.not_empty.notify()
+            self._release_refs(key)
+
+    def _release_refs (self, key):
+        """Move references with given cache key to the URLs with
+        a result. Not thread-safe!"""
+        refs = self.refs.pop(key, None)
+        if refs:
+            self.queue.extend(refs)
+            self.not_empty.notify(len(refs))
+
+    def get_host_due_time (self, url_data, host):
+        """Get time when the given host may be contacted again."""
+        if not host:
+            return 0
+        return url_data.aggregate.get_host_due_time(host)
+
+    def _push_host (self, host, due):
+        """Add host with given due time to the heap."""
+        self.host_seq += 1
+        heapq.heappush(self.host_heap, (due, self.host_seq, host))
+        self.host_scheduled.add(host)
+
+    def _schedule_host (self, host):
+        """Add host to the heap if it has queued URLs and is not
+        at the maximum number of connections."""
+        if host in self.host_scheduled or host not in self.host_queues:
+            return
+        if host and self.max_connections_per_host is not None and \
+           self.host_in_progress[host] >= self.max_connections_per_host:
+            return
+        urls = self.host_queues[host]
+        self._push_host(host, self.get_host_due_time(urls[0], host))
 
     def put (self, item):
         """Put an item into the queue.
@@ -126,32 +330,22 @@ class UrlQueue (object):
             assert key is not None, "no result for None key: %s" % url_data
             if self.max_allowed_urls is not None:
                 self.max_allowed_urls -= 1
-            self.num_puts += 1
-            if self.num_puts >= NUM_PUTS_CLEANUP:
-                self.cleanup()
-            self.queue.append(url_data)
+            if key in self.pending or key in self.checking:
+                # wait for the result of the queued URL
+                self.refs.setdefault(key, []).append(UrlRef(url_data))
+            else:
+                self.pending[key] = url_data
+                host = get_host(url_data)
+                if host in self.host_queues:
+                    self.host_queues[host].append(url_data)
+                else:
+                    self.host_queues[host] = collections.deque([url_data])
+                    self._schedule_host(host)
+                    if self.new_host_callback is not None:
+                        self.new_host_callback(url_data)
+        self.num_queued += 1
         self.unfinished_tasks += 1
 
-    def cleanup(self):
-        """Move cached elements to top."""
-        self.num_puts = 0
-        cached = []
-        for i, url_data in enumerate(self.queue):
-            key = url_data.cache_url
-            cache = url_data.aggregate.result_cache
-            if cache.has_result(key):
-                cached.append(i)
-        for pos in cached:
-            self._move_to_top(pos)
-
-    def _move_to_top(self, pos):
-        """Move element at given position to top of queue."""
-        if pos > 0:
-            self.queue.rotate(-pos)
-            item = self.queue.popleft()
-            self.queue.rotate(pos)
-            self.queue.appendleft(item)
-
     def task_done (self, url_data):
         """
         Indicate that a formerly enqueued task is complete.
@@ -169,6 +363,17 @@ class UrlQueue (object):
         """
         with self.all_tasks_done:
             log.debug(LOG_CACHE, "task_done %s", url_data.url)
+            host = self.in_progress_hosts.pop(id(url_data), None)
+            if host is not None:
+                self.host_in_progress[host] -= 1
+                if not self.host_in_progress[host]:
+                    del self.host_in_progress[host]
+                self._schedule_host(host)
+                self.not_empty.notify()
+                key = url_data.cache_url
+                self.checking.discard(key)
+                # the check did not add a result, eg. on errors
+                self._release_refs(key)
             self.finished_tasks += 1
             self.unfinished_tasks -= 1
             self.in_progress -= 1
@@ -203,8 +408,15 @@ class UrlQueue (object):
     def do_shutdown (self):
         """Shutdown the queue by not accepting any more URLs."""
         with self.mutex:
-            unfinished = self.unfinished_tasks - len(self.queue)
+            unfinished = self.unfinished_tasks - self.num_queued
             self.queue.clear()
+            self.host_queues.clear()
+            self.pending.clear()
+            self.refs.clear()
+            self.promoted.clear()
+            self.host_heap = []
+            self.host_scheduled.clear()
+            self.num_queued = 0
             if unfinished <= 0:
                 if unfinished < 0:
                     raise ValueError('shutdown is in error')
@@ -215,4 +427,4 @@ class UrlQueue (object):
     def status (self):
         """Get tuple (finished tasks, in progress, queue size)."""
         # no need to acquire self.mutex since the numbers are unreliable anyways.
-        return (self.finished_tasks, self.in_progress, len(self.queue))
+        return (self.finished_tasks, self.in_progress, self.num_queued)
@@ -0,0 +1,59 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Share equal URL strings of the whole check run.
+"""
+
+# maximum number of URLs in the table
+DefaultMaxSize = 1000000
+
+
+class UrlTable (object):
+    """
+    Thread-safe table of URL strings. The same URL is found on many
+    pages, and each found link, queued URL, cached result and logged
+    result would otherwise store its own copy of the URL strings.
+    Interned URLs share one string object.
+    format: {url (unicode) -> url}
+    """
+
+    def __init__ (self, max_size=DefaultMaxSize):
+        """Initialize the table.
+        @param max_size: maximum number of URLs in the table; a full
+          table is cleared, which keeps already interned strings shared
+        """
+        self.max_size = max_size
+        self.urls = {}
+
+    def intern (self, url):
+        """Get the shared string equal to the given URL.
+        @param url: the URL or None
+        @ptype url: unicode or None
+        @return: the shared string, or None
+        @rtype: unicode or None
+        """
+        if not url:
+            return url
+        # setdefault() is atomic, so no lock is needed
+        shared = self.urls.setdefault(url, url)
+        if shared is url and len(self.urls) > self.max_size:
+            self.urls = {}
+        return shared
+
+    def __len__ (self):
+        """Get number of URLs in the table."""
+        return len(self.urls)
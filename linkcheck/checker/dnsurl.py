@@ -18,8 +18,6 @@
 Handle for dns: links.
 """
 
-import socket
-
 from . import urlbase
 
 
@@ -40,10 +38,10 @@ class DnsUrl (urlbase.UrlBase):
     def check_connection(self):
         """Resolve hostname."""
         host = self.urlparts[1]
-        addresses = socket.getaddrinfo(host, 80, 0, 0, socket.SOL_TCP)
+        addresses = self.aggregate.host_cache.get_addresses(host)
         args = {'host': host}
         if addresses:
-            args['ips'] = [x[4][0] for x in addresses]
+            args['ips'] = addresses
             self.set_result(_('%(host)s resolved to IPs %(ips)s') % args, valid=True)
         else:
             self.set_result(_('%(host)r could not be resolved') % args, valid=False)
@@ -26,17 +26,9 @@ import requests
 import warnings
 warnings.simplefilter('ignore', requests.packages.urllib3.exceptions.InsecureRequestWarning)
 
-try:
-    from cStringIO import StringIO
-except ImportError:
-    # Python 3
-    from io import StringIO
-
 from .. import (log, LOG_CHECK, strformat, mimeutil,
-    url as urlutil, LinkCheckerError, httputil)
+    url as urlutil, httputil)
 from . import (internpaturl, proxysupport)
-from ..HtmlParser import htmlsax
-from ..htmlutil import linkparse
 # import warnings
 from .const import WARN_HTTP_EMPTY_CONTENT
 from requests.sessions import REDIRECT_STATI
@@ -44,6 +36,8 @@ from requests.sessions import REDIRECT_STATI
 # assumed HTTP header encoding
 HEADER_ENCODING = "iso-8859-1"
 HTTP_SCHEMAS = ('http://', 'https://')
+# status codes of servers that do not support HEAD requests
+HEAD_ERROR_STATI = (405, 501)
 
 # helper alias
 unicode_safe = strformat.unicode_safe
@@ -64,6 +58,8 @@ class HttpUrl (internpaturl.InternPatternUrl, proxysupport.ProxySupport):
         self.auth = None
         self.ssl_cipher = None
         self.ssl_cert = None
+        # HTTP request method
+        self.method = 'GET'
 
     def allows_robots (self, url):
         """
@@ -84,23 +80,7 @@ class HttpUrl (internpaturl.InternPatternUrl, proxysupport.ProxySupport):
         """
         if not self.is_html():
             return True
-        # construct parser object
-        handler = linkparse.MetaRobotsFinder()
-        parser = htmlsax.parser(handler)
-        handler.parser = parser
-        if self.charset:
-            parser.encoding = self.charset
-        # parse
-        try:
-            parser.feed(self.get_content())
-            parser.flush()
-        except linkparse.StopParse as msg:
-            log.debug(LOG_CHECK, "Stopped parsing: %s", msg)
-            pass
-        # break cyclic dependencies
-        handler.parser = None
-        parser.handler = None
-        return handler.follow
+        return self.get_html_analysis().follow
 
     def add_size_info (self):
         """Get size of URL content from HTTP header."""
@@ -143,22 +123,68 @@ class HttpUrl (internpaturl.InternPatternUrl, proxysupport.ProxySupport):
             self.do_check_content = False
             return
         # check the http connection
+        self.method = self.get_request_method()
         request = self.build_request()
         self.send_request(request)
         self._add_response_info()
         self.follow_redirections(request)
+        if self.method == 'HEAD':
+            self.check_head_response()
         self.check_response()
+        if self.stored_result is not None and \
+           self.url_connection.status_code == 304:
+            # the stored result is used and its links are replayed
+            self.not_modified = True
+            return
         if self.allows_simple_recursion():
             self.parse_header_links()
 
+    def get_request_method(self):
+        """Use a HEAD request if the headrequests option is set, the
+        host supports HEAD requests, the URL is not parsed for recursion
+        and no content plugin needs the content.
+        @return: 'HEAD' or 'GET'
+        """
+        if self.aggregate.config["headrequests"] and \
+           self.aggregate.allows_head(self.urlparts[1]) and \
+           not self.allows_simple_recursion() and \
+           not self.aggregate.plugin_manager.content_plugins_need_content(self):
+            return 'HEAD'
+        return 'GET'
+
+    def check_head_response(self):
+        """Repeat the HEAD request with GET if the server does not
+        support HEAD requests or if the URL has been redirected to a URL
+        that needs its content. Else the content is not checked."""
+        if self.url_connection.status_code in HEAD_ERROR_STATI:
+            log.debug(LOG_CHECK, "HEAD request not supported by %s",
+                      self.urlparts[1])
+            self.aggregate.add_head_error_host(self.urlparts[1])
+        self.method = self.get_request_method()
+        if self.method == 'HEAD':
+            # the response has no content
+            self.do_check_content = False
+            return
+        self.url_connection.close()
+        request = self.build_request()
+        self.send_request(request)
+        self._add_response_info()
+        self.follow_redirections(request)
+
     def build_request(self):
         """Build a prepared request object."""
         clientheaders = {}
         if (self.parent_url and
             self.parent_url.lower().startswith(HTTP_SCHEMAS)):
             clientheaders["Referer"] = self.parent_url
+        if self.stored_result is not None:
+            # conditional request for the expired stored result
+            if self.stored_result.etag:
+                clientheaders["If-None-Match"] = self.stored_result.etag
+            if self.stored_result.last_modified:
+                clientheaders["If-Modified-Since"] = self.stored_result.last_modified
         kwargs = dict(
-            method='GET',
+            method=self.method,
             url=self.url,
             headers=clientheaders,
         )
@@ -190,26 +216,20 @@ class HttpUrl (internpaturl.InternPatternUrl, proxysupport.ProxySupport):
         self.set_content_type()
         self.add_size_info()
 
-    def _get_ssl_sock(self):
-        """Get raw SSL socket."""
+    def _get_ssl_connection(self):
+        """Get raw connected SSL connection."""
         assert self.scheme == u"https", self
         raw_connection = self.url_connection.raw._connection
         if raw_connection.sock is None:
             # sometimes the socket is not yet connected
             # see https://github.com/kennethreitz/requests/issues/1966
             raw_connection.connect()
-        return raw_connection.sock
+        return raw_connection
 
     def _add_ssl_info(self):
         """Add SSL cipher info."""
         if self.scheme == u'https':
-            sock = self._get_ssl_sock()
-            if hasattr(sock, 'cipher'):
-                self.ssl_cert = sock.getpeercert()
-            else:
-                # using pyopenssl
-                cert = sock.connection.get_peer_certificate()
-                self.ssl_cert = httputil.x509_to_dict(cert)
+            self.ssl_cert = httputil.get_ssl_cert(self._get_ssl_connection())
             log.debug(LOG_CHECK, "Got SSL certificate %s", self.ssl_cert)
         else:
             self.ssl_cert = None
@@ -305,16 +325,33 @@ class HttpUrl (internpaturl.InternPatternUrl, proxysupport.ProxySupport):
             else:
                 self.set_result(_("OK"))
 
-    def read_content(self):
-        """Return data and data size for this URL.
-        Can be overridden in subclasses."""
-        maxbytes = self.aggregate.config["maxfilesizedownload"]
-        buf = StringIO()
-        for data in self.url_connection.iter_content(chunk_size=self.ReadChunkBytes):
-            if buf.tell() + len(data) > maxbytes:
-                raise LinkCheckerError(_("File size too large"))
-            buf.write(data)
-        return buf.getvalue()
+    def get_cache_validators (self):
+        """Get ETag and Last-Modified headers of a successful response.
+        @return: tuple (ETag, Last-Modified) with None for missing values
+        """
+        if self.url_connection is None or \
+           self.url_connection.status_code != 200:
+            return None, None
+        return self.getheader("ETag"), self.getheader("Last-Modified")
+
+    def read_content_chunks(self):
+        """Yield chunks of content data from this URL."""
+        return self.url_connection.iter_content(chunk_size=self.ReadChunkBytes)
+
+    def can_stream_html (self):
+        """Indicate wether the HTML content can be parsed while it
+        downloads. This needs the streamparse option, a HTML page that
+        would be parsed for recursion and no content plugin that needs
+        the content data."""
+        if not self.aggregate.config["streamparse"]:
+            return False
+        if self.data is not None or self.html_analysis is not None:
+            return False
+        if not self.is_html() or not self.allows_simple_recursion():
+            return False
+        if self.size > self.aggregate.config["maxfilesizeparse"]:
+            return False
+        return not self.aggregate.plugin_manager.content_plugins_need_data(self)
 
     def parse_header_links(self):
         """Parse URLs in HTTP headers Link:."""
@@ -47,6 +47,42 @@ def getaddresses (addr):
     return addresses
 
 
+def lookup_mail_hosts (domain):
+    """Look up the mail hosts of a domain. If the domain has no MX
+    records, its A records are used instead.
+    @return: tuple (expiration time, (has_mx, hosts, invalid_answer))
+      with the sorted list of (preference, host) tuples as hosts. For
+      an invalid DNS answer, hosts is None and invalid_answer is the
+      answer text. The expiration time is None if no host was found.
+    @rtype: tuple
+    """
+    from dns.exception import DNSException
+    log.debug(LOG_CHECK, "looking up MX mailhost %r", domain)
+    try:
+        answers = resolver.query(domain, 'MX')
+    except DNSException:
+        answers = []
+    if len(answers) == 0:
+        try:
+            answers = resolver.query(domain, 'A')
+        except DNSException:
+            return None, (False, [], None)
+        # set preference to zero
+        mxdata = [(0, rdata.to_text(omit_final_dot=True))
+                  for rdata in answers]
+        return answers.expiration, (False, mxdata, None)
+    from dns.rdtypes.mxbase import MXBase
+    mxdata = [(rdata.preference,
+               rdata.exchange.to_text(omit_final_dot=True))
+               for rdata in answers if isinstance(rdata, MXBase)]
+    if not mxdata:
+        return None, (True, None, str(answers.rrset))
+    # sort according to preference (lower preference means this
+    # host should be preferred)
+    mxdata.sort()
+    return answers.expiration, (True, mxdata, None)
+
+
 def is_quoted (addr):
     """Return True iff mail address string is quoted."""
     return addr.startswith(u'"') and addr.endswith(u'"')
@@ -235,57 +271,45 @@ class MailtoUrl (urlbase.UrlBase):
         If no MX records are found, print a warning and try
         to look for A DNS records. If no A records are found either
         print an error.
+
+        The mail hosts are looked up once per domain, and are cached
+        for the mail addresses of all mailto: URLs.
         """
+        domains = set()
         for mail in sorted(self.addresses):
-            self.check_smtp_domain(mail)
+            mail = strformat.ascii_safe(mail)
+            domain = mail.rsplit('@', 1)[1].lower()
+            if domain in domains:
+                continue
+            domains.add(domain)
+            self.check_smtp_domain(domain)
             if not self.valid:
                 break
 
-    def check_smtp_domain (self, mail):
+    def check_smtp_domain (self, domain):
         """
-        Check a single mail address.
+        Check the mail hosts of a single mail domain.
         """
-        from dns.exception import DNSException
-        log.debug(LOG_CHECK, "checking mail address %r", mail)
-        mail = strformat.ascii_safe(mail)
-        username, domain = mail.rsplit('@', 1)
-        log.debug(LOG_CHECK, "looking up MX mailhost %r", domain)
-        try:
-            answers = resolver.query(domain, 'MX')
-        except DNSException:
-            answers = []
-        if len(answers) == 0:
+        log.debug(LOG_CHECK, "checking mail domain %r", domain)
+        has_mx, mxdata, answer = self.aggregate.mail_host_cache.get(domain,
+            lookup_mail_hosts)
+        if mxdata is None:
+            self.set_result(
+                _("Got invalid DNS answer %(answer)s for %(domain)s.") %
+                {'answer': answer, 'domain': domain}, valid=False,
+                 overwrite=True)
+            return
+        if not has_mx:
             self.add_warning(_("No MX mail host for %(domain)s found.") %
                             {'domain': domain},
                              tag=WARN_MAIL_NO_MX_HOST)
-            try:
-                answers = resolver.query(domain, 'A')
-            except DNSException:
-                answers = []
-            if len(answers) == 0:
+            if not mxdata:
                 self.set_result(_("No host for %(domain)s found.") %
                                  {'domain': domain}, valid=False,
                                  overwrite=True)
                 return
-            # set preference to zero
-            mxdata = [(0, rdata.to_text(omit_final_dot=True))
-                      for rdata in answers]
-        else:
-            from dns.rdtypes.mxbase import MXBase
-            mxdata = [(rdata.preference,
-                       rdata.exchange.to_text(omit_final_dot=True))
-                       for rdata in answers if isinstance(rdata, MXBase)]
-            if not mxdata:
-                self.set_result(
-                    _("Got invalid DNS answer %(answer)s for %(domain)s.") %
-                    {'answer': answers, 'domain': domain}, valid=False,
-                     overwrite=True)
-                return
-            # sort according to preference (lower preference means this
-            # host should be preferred)
-            mxdata.sort()
         # debug output
-        log.debug(LOG_CHECK, "found %d MX mailhosts:", len(answers))
+        log.debug(LOG_CHECK, "found %d MX mailhosts:", len(mxdata))
         for preference, host in mxdata:
             log.debug(LOG_CHECK, "MX host %r, preference %d", host, preference)
             pass
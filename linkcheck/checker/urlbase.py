@@ -222,6 +222,14 @@ class UrlBase (object):
         self.content_type = u""
         # URLs seen through redirections
         self.aliases = []
+        # expired result of the result store for conditional requests
+        self.stored_result = None
+        # flag if the server reported the stored result as not modified
+        self.not_modified = False
+        # list of add_url() arguments to store, None if not recorded
+        self.child_links = None
+        # links, anchors and meta robots of HTML content, parsed once
+        self.html_analysis = None
 
     def set_result (self, msg, valid=True, overwrite=False):
         """
@@ -338,6 +346,17 @@ class UrlBase (object):
             self.set_result(unicode_safe(msg), valid=False)
         else:
             self.set_cache_url()
+        self.intern_urls()
+
+    def intern_urls (self):
+        """Share the URL strings with all other URLs of this check run,
+        since queued URLs, cached results and loggers keep them."""
+        intern = self.aggregate.url_table.intern
+        self.base_url = intern(self.base_url)
+        self.parent_url = intern(self.parent_url)
+        self.base_ref = intern(self.base_ref)
+        self.url = intern(self.url)
+        self.cache_url = intern(self.cache_url)
 
     def check_url_warnings(self):
         """Check URL name and length."""
@@ -420,7 +439,10 @@ class UrlBase (object):
         # check if self.host can be an IP address
         # check for obfuscated IP address
         if iputil.is_obfuscated_ip(self.host):
-            ips = iputil.resolve_host(self.host)
+            try:
+                ips = self.aggregate.host_cache.get_addresses(self.host)
+            except socket.error:
+                ips = []
             if ips:
                 self.host = ips[0]
                 self.add_warning(
@@ -473,6 +495,8 @@ class UrlBase (object):
             # check content and recursion
             try:
                 if self.can_get_content():
+                    if self.can_stream_html():
+                        self.stream_html()
                     self.aggregate.plugin_manager.run_content_plugins(self)
                 if self.allows_recursion():
                     return True
@@ -630,17 +654,76 @@ class UrlBase (object):
                 self.aggregate.add_downloaded_bytes(self.size)
         return self.data
 
+    def get_html_analysis (self):
+        """Parse HTML content once for recursion, robots meta tags and
+        anchor checks.
+        @rtype: linkparse.HtmlAnalyzer
+        """
+        if self.html_analysis is None:
+            from ..parser import analyze_html
+            self.html_analysis = analyze_html(self)
+        return self.html_analysis
+
+    def can_stream_html (self):
+        """Indicate wether the HTML content can be parsed while it
+        downloads. Only HTTP content is streamed."""
+        return False
+
+    def stream_html (self):
+        """Parse HTML content while it downloads without keeping the
+        content data. Content after maxfilesizeparse bytes is downloaded
+        but not parsed. Found URLs are kept in the analysis and are
+        queued when parsing the content for recursion, so nothing is
+        queued when the download fails or the content is too large."""
+        from ..parser import stream_html
+        log.debug(LOG_CHECK, "Stream content of %r", self.url)
+        maxbytes = self.aggregate.config["maxfilesizeparse"]
+        chunks = self.iter_content()
+        def parse_chunks ():
+            """Yield chunks up to the maximum parse size."""
+            for data in chunks:
+                if self.size > maxbytes:
+                    # parse only the part within the maximum parse size
+                    yield data[:len(data) - (self.size - maxbytes)]
+                    break
+                yield data
+        t = time.time()
+        self.size = 0
+        self.html_analysis = stream_html(self, parse_chunks())
+        for data in chunks:
+            pass
+        self.dltime = time.time() - t
+        if self.size == 0:
+            self.add_warning(_("Content size is zero."),
+                             tag=WARN_URL_CONTENT_SIZE_ZERO)
+        else:
+            self.aggregate.add_downloaded_bytes(self.size)
+
+    def iter_content (self):
+        """Yield content data chunks and count the content size."""
+        maxbytes = self.aggregate.config["maxfilesizedownload"]
+        for data in self.read_content_chunks():
+            self.size += len(data)
+            if self.size > maxbytes:
+                raise LinkCheckerError(_("File size too large"))
+            yield data
+
     def read_content(self):
         """Return data for this URL. Can be overridden in subclasses."""
         buf = StringIO()
-        data = self.read_content_chunk()
-        while data:
+        for data in self.read_content_chunks():
             if buf.tell() + len(data) > self.aggregate.config["maxfilesizedownload"]:
                 raise LinkCheckerError(_("File size too large"))
             buf.write(data)
-            data = self.read_content_chunk()
         return buf.getvalue()
 
+    def read_content_chunks(self):
+        """Yield chunks of content data from this URL."""
+        data = self.read_content_chunk()
+        while data:
+            yield data
+            data = self.read_content_chunk()
+
     def read_content_chunk(self):
         """Read one chunk of content from this URL."""
         return self.url_connection.read(self.ReadChunkBytes)
@@ -656,6 +739,8 @@ class UrlBase (object):
 
     def add_url (self, url, line=0, column=0, page=0, name=u"", base=None):
         """Add new URL to queue."""
+        if self.child_links is not None:
+            self.child_links.append((url, line, column, page, name, base))
         if base:
             base_ref = urlutil.url_norm(base)[0]
         else:
@@ -665,6 +750,13 @@ class UrlBase (object):
             page=page, name=name, parent_content_type=self.content_type)
         self.aggregate.urlqueue.put(url_data)
 
+    def get_cache_validators (self):
+        """Get values to check if the content changed since it has been
+        stored.
+        @return: tuple (ETag, Last-Modified) with None for missing values
+        """
+        return None, None
+
     def serialized (self, sep=os.linesep):
         """
         Return serialized url check data as unicode string.
@@ -73,6 +73,7 @@ Modules = (
     ("sqlite3", u"Sqlite", 'sqlite_version'),
     ("gconf", u"Gconf", '__version__'),
     ("meliae", u"Meliae", '__version__'),
+    ("gevent", u"Gevent", '__version__'),
 )
 
 def get_modules_info():
@@ -162,23 +163,44 @@ class Configuration (dict):
         super(Configuration, self).__init__()
         ## checking options
         self["allowedschemes"] = []
+        self["brokerkey"] = os.environ.get("LINKCHECKER_BROKERKEY", None)
         self['cookiefile'] = None
+        self["coordinator"] = None
         self["debugmemory"] = False
+        self["engine"] = "threads"
+        self["headrequests"] = False
         self["localwebroot"] = None
         self["maxfilesizeparse"] = 1*1024*1024
         self["maxfilesizedownload"] = 5*1024*1024
         self["maxnumurls"] = None
         self["maxrunseconds"] = None
         self["maxrequestspersecond"] = 10
+        self["maxconnectionsperhost"] = 0
+        self["maxconnections"] = 400
+        self["connectionidletimeout"] = 30
+        self["dnscachettl"] = 300
+        self["dnscachenegativettl"] = 60
+        self["dnsprefetch"] = False
+        self["robotscachesize"] = 10000
+        self["robotscachettl"] = 24*60*60
+        self["robotscachenegativettl"] = 60*60
+        self["robotsprefetch"] = True
         self["maxhttpredirects"] = 10
         self["nntpserver"] = os.environ.get("NNTP_SERVER", None)
+        self["processes"] = 1
         self["proxy"] = urllib.getproxies()
+        self["resultcachesize"] = 100000
+        self["resultcachebytes"] = 0
+        self["resultcachefile"] = None
+        self["resultcachettl"] = 24*60*60
         self["sslverify"] = True
+        self["streamparse"] = False
         self["threads"] = 10
         self["timeout"] = 60
         self["aborttimeout"] = 300
         self["recursionlevel"] = -1
         self["useragent"] = UserAgent
+        self["worker"] = None
         ## authentication
         self["authentication"] = []
         self["loginurl"] = None
@@ -199,6 +221,7 @@ class Configuration (dict):
         self["verbose"] = False
         self["warnings"] = True
         self["fileoutput"] = []
+        self["logqueuesize"] = 1000
         self['output'] = 'text'
         self["status"] = False
         self["status_wait_seconds"] = 5
@@ -288,6 +311,8 @@ class Configuration (dict):
         self.sanitize_proxies()
         self.sanitize_plugins()
         self.sanitize_ssl()
+        self.sanitize_engine()
+        self.sanitize_processes()
         # set default socket timeout
         socket.setdefaulttimeout(self['timeout'])
 
@@ -340,6 +365,44 @@ class Configuration (dict):
             if ftp_proxy:
                 self["proxy"]["ftp"] = ftp_proxy
 
+    def sanitize_engine (self):
+        """Fall back to the thread engine if the event engine is not
+        usable."""
+        from ..director import events
+        if self["engine"] != events.ENGINE_EVENTS:
+            return
+        if not events.is_installed():
+            log.warn(LOG_CHECK,
+              _("the event engine has not been activated; using threads."))
+            self["engine"] = events.ENGINE_THREADS
+        elif self["threads"] < 1:
+            log.warn(LOG_CHECK,
+              _("the event engine needs a positive number of threads; using threads."))
+            self["engine"] = events.ENGINE_THREADS
+
+    def sanitize_processes (self):
+        """Check in one process if worker processes can not be used."""
+        if self["worker"] and self["threads"] < 1:
+            log.warn(LOG_CHECK,
+              _("workers need a positive number of threads; using one thread."))
+            self["threads"] = 1
+        if self["processes"] <= 1 or self["coordinator"]:
+            # connected workers are not forked
+            return
+        from ..director import events
+        if os.name != 'posix':
+            log.warn(LOG_CHECK,
+              _("worker processes are only supported on POSIX systems; using one process."))
+            self["processes"] = 1
+        elif self["engine"] != events.ENGINE_THREADS:
+            log.warn(LOG_CHECK,
+              _("the event engine does not support worker processes; using one process."))
+            self["processes"] = 1
+        elif self["threads"] < 1:
+            log.warn(LOG_CHECK,
+              _("worker processes need a positive number of threads; using one process."))
+            self["processes"] = 1
+
     def sanitize_plugins(self):
         """Ensure each plugin is configurable."""
         for plugin in self["enabledplugins"]:
@@ -115,6 +115,7 @@ class LCConfigParser (ConfigParser.RawConfigParser, object):
             parts = [f.strip().lower() for f in val.split(',')]
             logconf.set_debug(parts)
         self.read_boolean_option(section, "status")
+        self.read_int_option(section, "logqueuesize", min=0)
         if self.has_option(section, "log"):
             val = self.get(section, "log").strip().lower()
             self.config['output'] = val
@@ -135,12 +136,24 @@ class LCConfigParser (ConfigParser.RawConfigParser, object):
         section = "checking"
         self.read_int_option(section, "threads", min=-1)
         self.config['threads'] = max(0, self.config['threads'])
+        self.read_int_option(section, "processes", min=1)
         self.read_int_option(section, "timeout", min=1)
         self.read_int_option(section, "aborttimeout", min=1)
         self.read_int_option(section, "recursionlevel", min=-1)
         self.read_string_option(section, "nntpserver")
+        self.read_string_option(section, "brokerkey")
         self.read_string_option(section, "useragent")
         self.read_int_option(section, "maxrequestspersecond", min=1)
+        self.read_int_option(section, "maxconnectionsperhost", min=0)
+        self.read_int_option(section, "maxconnections", min=1)
+        self.read_int_option(section, "connectionidletimeout", min=0)
+        self.read_int_option(section, "dnscachettl", min=0)
+        self.read_int_option(section, "dnscachenegativettl", min=0)
+        self.read_boolean_option(section, "dnsprefetch")
+        self.read_int_option(section, "robotscachesize", min=1)
+        self.read_int_option(section, "robotscachettl", min=0)
+        self.read_int_option(section, "robotscachenegativettl", min=0)
+        self.read_boolean_option(section, "robotsprefetch")
         self.read_int_option(section, "maxnumurls", min=0)
         self.read_int_option(section, "maxfilesizeparse", min=1)
         self.read_int_option(section, "maxfilesizedownload", min=1)
@@ -150,6 +163,12 @@ class LCConfigParser (ConfigParser.RawConfigParser, object):
         self.read_boolean_option(section, "debugmemory")
         self.read_string_option(section, "cookiefile")
         self.read_string_option(section, "localwebroot")
+        self.read_int_option(section, "resultcachesize", min=1)
+        self.read_int_option(section, "resultcachebytes", min=0)
+        self.read_string_option(section, "resultcachefile")
+        self.read_int_option(section, "resultcachettl", min=0)
+        self.read_boolean_option(section, "streamparse")
+        self.read_boolean_option(section, "headrequests")
         try:
             self.read_boolean_option(section, "sslverify")
         except ValueError:
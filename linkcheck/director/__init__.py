@@ -22,7 +22,7 @@ import thread
 import time
 from .. import log, LOG_CHECK, LinkCheckerInterrupt, plugins
 from ..cache import urlqueue, robots_txt, results
-from . import aggregator, console
+from . import aggregator, console, processes
 
 
 def check_urls (aggregate):
@@ -43,7 +43,13 @@ def check_urls (aggregate):
             dict(msg=msg))
         raise
     try:
-        if not aggregate.urlqueue.empty():
+        if aggregate.urlqueue.empty():
+            pass
+        elif aggregate.config["coordinator"]:
+            processes.check_urls_coordinator(aggregate)
+        elif aggregate.config["processes"] > 1:
+            processes.check_urls(aggregate)
+        else:
             aggregate.start_threads()
         check_url(aggregate)
         aggregate.finish()
@@ -67,6 +73,17 @@ def check_urls (aggregate):
     # and both should be handled by the calling layer.
 
 
+def check_worker (config):
+    """Check URLs for the coordinator at config["worker"] until the
+    coordinator stops this worker or the user hits Ctrl-C.
+    @return: None
+    """
+    try:
+        processes.check_worker(config)
+    except KeyboardInterrupt:
+        log.warn(LOG_CHECK, _("interrupt; stopping the worker"))
+
+
 def check_url (aggregate):
     """Helper function waiting for URL queue."""
     while True:
@@ -125,11 +142,38 @@ def abort_now ():
         os._exit(3)
 
 
+def get_robots_txt (config):
+    """Get a robots.txt cache with given configuration."""
+    return robots_txt.RobotsTxt(config["useragent"],
+        max_size=config["robotscachesize"], ttl=config["robotscachettl"],
+        negative_ttl=config["robotscachenegativettl"],
+        timeout=config["timeout"])
+
+
 def get_aggregate (config):
     """Get an aggregator instance with given configuration."""
-    _urlqueue = urlqueue.UrlQueue(max_allowed_urls=config["maxnumurls"])
-    _robots_txt = robots_txt.RobotsTxt(config["useragent"])
+    _robots_txt = get_robots_txt(config)
+    if config["robotsprefetch"] and config["processes"] == 1:
+        # with worker processes, the workers prefetch robots.txt files
+        new_host_callback = _robots_txt.prefetch
+    else:
+        new_host_callback = None
+    _urlqueue = urlqueue.UrlQueue(max_allowed_urls=config["maxnumurls"],
+        max_connections_per_host=config["maxconnectionsperhost"] or None,
+        new_host_callback=new_host_callback)
     plugin_manager = plugins.PluginManager(config)
-    result_cache = results.ResultCache()
+    if config["resultcachebytes"]:
+        result_cache = results.ResultCache(max_size=None,
+            max_bytes=config["resultcachebytes"])
+    else:
+        result_cache = results.ResultCache(max_size=config["resultcachesize"])
+    if config["resultcachefile"]:
+        from ..cache import store
+        # worker processes share the database file
+        shared = config["processes"] > 1 or bool(config["worker"])
+        result_store = store.ResultStore(config["resultcachefile"],
+            config["resultcachettl"], shared=shared)
+    else:
+        result_store = None
     return aggregator.Aggregate(config, _urlqueue, _robots_txt, plugin_manager,
-        result_cache)
+        result_cache, result_store=result_store)
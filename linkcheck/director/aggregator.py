@@ -20,27 +20,30 @@ Aggregate needed object instances for checker threads.
 import threading
 import thread
 import requests
-import time
 try:
     import urlparse
 except ImportError:
     # Python 3
     from urllib import parse as urlparse
-import random
 from .. import log, LOG_CHECK, strformat, LinkCheckerError
 from ..decorators import synchronized
-from ..cache import urlqueue
+from ..cache import urlqueue, hosts, urls
 from ..htmlutil import formsearch
-from . import logger, status, checker, interrupt
+from . import logger, status, checker, interrupt, throttle, connections
 
 
 _threads_lock = threading.RLock()
-_hosts_lock = threading.RLock()
 _downloadedbytes_lock = threading.RLock()
 
-def new_request_session(config, cookies):
-    """Create a new request session."""
+def new_request_session(config, cookies, adapter=None):
+    """Create a new request session.
+    @param adapter: HTTP adapter shared by all sessions, or None to use
+      the default adapters of the session
+    """
     session = requests.Session()
+    if adapter is not None:
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
     if cookies:
         session.cookies = cookies
     session.max_redirects = config["maxhttpredirects"]
@@ -57,7 +60,7 @@ class Aggregate (object):
     """Store thread-safe data collections for checker threads."""
 
     def __init__ (self, config, urlqueue, robots_txt, plugin_manager,
-                  result_cache):
+                  result_cache, result_store=None):
         """Store given link checking objects."""
         self.config = config
         self.urlqueue = urlqueue
@@ -67,12 +70,22 @@ class Aggregate (object):
         self.robots_txt = robots_txt
         self.plugin_manager = plugin_manager
         self.result_cache = result_cache
-        self.times = {}
+        self.result_store = result_store
+        self.url_table = urls.UrlTable()
         self.cookies = None
-        requests_per_second = config["maxrequestspersecond"]
-        self.wait_time_min = 1.0 / requests_per_second
-        self.wait_time_max = max(self.wait_time_min + 0.5, 0.5)
+        self.throttle = throttle.HostThrottle(config["maxrequestspersecond"])
+        self.host_cache = hosts.HostCache(config["dnscachettl"],
+            config["dnscachenegativettl"])
+        # {mail domain -> mail hosts}, see mailtourl.lookup_mail_hosts()
+        self.mail_host_cache = hosts.LookupCache(config["dnscachenegativettl"])
+        self.http_adapter = connections.SharedHTTPAdapter(
+            config["maxconnectionsperhost"], config["maxconnections"],
+            config["connectionidletimeout"], host_cache=self.host_cache)
         self.downloaded_bytes = 0
+        # hosts that do not support HEAD requests
+        self.head_error_hosts = set()
+        # statistics of worker processes
+        self.process_stats = []
 
     def visit_loginurl(self):
         """Check for a login URL and visit it."""
@@ -106,9 +119,7 @@ class Aggregate (object):
             t.start()
             self.threads.append(t)
         if self.config["maxrunseconds"]:
-            t = interrupt.Interrupt(self.config["maxrunseconds"])
-            t.start()
-            self.threads.append(t)
+            self.start_interrupt_thread()
         num = self.config["threads"]
         if num > 0:
             for dummy in range(num):
@@ -116,13 +127,21 @@ class Aggregate (object):
                 self.threads.append(t)
                 t.start()
         else:
-            self.request_sessions[thread.get_ident()] = new_request_session(self.config, self.cookies)
+            self.add_request_session()
             checker.check_urls(self.urlqueue, self.logger)
 
+    @synchronized(_threads_lock)
+    def start_interrupt_thread (self):
+        """Spawn thread stopping the check after maxrunseconds."""
+        t = interrupt.Interrupt(self.config["maxrunseconds"])
+        t.start()
+        self.threads.append(t)
+
     @synchronized(_threads_lock)
     def add_request_session(self):
         """Add a request session for current thread."""
-        session = new_request_session(self.config, self.cookies)
+        session = new_request_session(self.config, self.cookies,
+                                      self.http_adapter)
         self.request_sessions[thread.get_ident()] = session
 
     @synchronized(_threads_lock)
@@ -130,18 +149,22 @@ class Aggregate (object):
         """Get the request session for current thread."""
         return self.request_sessions[thread.get_ident()]
 
-    @synchronized(_hosts_lock)
     def wait_for_host(self, host):
         """Throttle requests to one host."""
-        t = time.time()
-        if host in self.times:
-            due_time = self.times[host]
-            if due_time > t:
-                wait = due_time - t
-                time.sleep(wait)
-                t = time.time()
-        wait_time = random.uniform(self.wait_time_min, self.wait_time_max)
-        self.times[host] = t + wait_time
+        self.throttle.wait(host)
+
+    def add_head_error_host(self, host):
+        """Remember that the given host does not support HEAD requests."""
+        self.head_error_hosts.add(host)
+
+    def allows_head(self, host):
+        """Check if HEAD requests can be sent to the given host."""
+        return host not in self.head_error_hosts
+
+    def get_host_due_time(self, host):
+        """Get the time when the next request to the given host
+        is allowed without waiting."""
+        return self.throttle.get_due_time(host)
 
     @synchronized(_threads_lock)
     def print_active_threads (self):
@@ -196,6 +219,9 @@ class Aggregate (object):
             self.cancel()
         for t in self.threads:
             t.stop()
+        if self.result_store is not None:
+            self.result_store.close()
+        self.http_adapter.close()
 
     @synchronized(_threads_lock)
     def is_finished (self):
@@ -203,15 +229,47 @@ class Aggregate (object):
         self.remove_stopped_threads()
         return self.urlqueue.empty() and not self.threads
 
+    def add_result(self, key, result):
+        """Add result to the cache and check the queued URLs with the
+        same key first."""
+        self.result_cache.add_result(key, result)
+        self.urlqueue.promote(key)
+
     @synchronized(_downloadedbytes_lock)
     def add_downloaded_bytes(self, numbytes):
         """Add to number of downloaded bytes."""
         self.downloaded_bytes += numbytes
 
+    def get_stats(self):
+        """Get statistics for the ending output of the log.
+        @return: statistics of this and all worker processes
+        @rtype: dict
+        """
+        stats = dict(
+            downloaded_bytes=self.downloaded_bytes,
+            num_urls = self.result_cache.num_added,
+            result_cache_stats=self.result_cache.get_stats(),
+            connection_stats=self.http_adapter.get_stats(),
+            throttled_seconds=self.throttle.get_wait_times(),
+        )
+        for process_stats in self.process_stats:
+            stats["downloaded_bytes"] += process_stats["downloaded_bytes"]
+            stats["num_urls"] += process_stats["num_urls"]
+            for key, value in process_stats["result_cache_stats"].items():
+                stats["result_cache_stats"][key] += value
+            for key, value in process_stats["connection_stats"].items():
+                stats["connection_stats"][key] += value
+            throttled_seconds = stats["throttled_seconds"]
+            for host, value in process_stats["throttled_seconds"].items():
+                throttled_seconds[host] = throttled_seconds.get(host, 0) + value
+        return stats
+
+    def add_process_stats(self, stats):
+        """Add statistics of a worker process, as returned by its
+        get_stats()."""
+        self.process_stats.append(stats)
+
     def end_log_output(self, **kwargs):
         """Print ending output to log."""
-        kwargs.update(dict(
-            downloaded_bytes=self.downloaded_bytes,
-            num_urls = len(self.result_cache),
-        ))
+        kwargs.update(self.get_stats())
         self.logger.end_log_output(**kwargs)
@@ -0,0 +1,405 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Brokers exchanging URLs and check results between the coordinator
+and its workers.
+
+The coordinator puts URLs into one queue per host partition. Each
+worker checks one partition, pulls batches of URLs from its queue and
+sends check results, found URLs of other partitions and the number of
+queued and finished URLs back as messages. See the processes module
+for the messages.
+
+The QueueBroker works in one process or, with multiprocessing queues,
+with forked worker processes. The SocketBroker serves a QueueBroker to
+workers connecting over TCP or a Unix socket with a SocketBrokerClient.
+Messages are pickled, so both sides of each connection first prove that
+they know the shared broker key before any message is read. The messages
+are not encrypted.
+"""
+import os
+import hmac
+import hashlib
+import select
+import socket
+import struct
+import threading
+import SocketServer
+import Queue
+import cPickle as pickle
+from .. import log, LOG_CHECK, LinkCheckerError
+
+# maximum number of URLs sent to a worker at once
+BatchSize = 100
+
+# seconds to wait for URLs before checking that the worker is connected
+PollSeconds = 1.0
+
+# format of the length prefix of a pickled message
+LengthFormat = "!I"
+LengthSize = struct.calcsize(LengthFormat)
+
+# size of the random challenge each side of a connection sends
+ChallengeSize = 20
+# size of the answer to a challenge
+DigestSize = hashlib.sha256().digest_size
+
+
+class AuthenticationError (LinkCheckerError):
+    """The other side of a connection does not know the broker key."""
+    pass
+
+
+class QueueBroker (object):
+    """Broker with one queue per partition and one message queue."""
+
+    def __init__ (self, num_partitions, queue_class=Queue.Queue):
+        """Initialize the queues.
+        @param num_partitions: number of host partitions
+        @param queue_class: class of the queues, eg. Queue.Queue or
+          multiprocessing.Queue
+        """
+        self.num_partitions = num_partitions
+        self.url_queues = [queue_class() for dummy in range(num_partitions)]
+        self.messages = queue_class()
+
+    def put_url (self, partition, ref):
+        """Send URL to the worker of given partition. Used by the
+        coordinator."""
+        self.url_queues[partition].put(ref)
+
+    def get_urls (self, partition, timeout=None):
+        """Wait for URLs of given partition. Used by the workers.
+        @return: list of UrlRef objects, or None if the worker should stop
+        @rtype: list or None
+        @raises: Queue.Empty if no URL arrived in time
+        """
+        url_queue = self.url_queues[partition]
+        ref = url_queue.get(timeout=timeout)
+        if ref is None:
+            return None
+        urls = [ref]
+        while len(urls) < BatchSize:
+            try:
+                ref = url_queue.get_nowait()
+            except Queue.Empty:
+                break
+            if ref is None:
+                # stop after this batch
+                url_queue.put(None)
+                break
+            urls.append(ref)
+        return urls
+
+    def put_message (self, message):
+        """Send message to the coordinator. Used by the workers."""
+        self.messages.put(message)
+
+    def get_message (self, timeout):
+        """Get next worker message. Used by the coordinator.
+        @raises: Queue.Empty if no message arrived in time
+        """
+        return self.messages.get(timeout=timeout)
+
+    def stop (self):
+        """Stop all workers after their queued URLs."""
+        for url_queue in self.url_queues:
+            url_queue.put(None)
+
+
+def get_socket_address (address):
+    """Parse a socket address. Addresses containing a slash are Unix
+    socket file names, all others have the form host:port or port. The
+    default host is localhost.
+    @return: tuple (socket family, address)
+    @raises: LinkCheckerError on invalid addresses
+    """
+    if "/" in address:
+        return socket.AF_UNIX, address
+    host, sep, port = address.rpartition(":")
+    if not port.isdigit():
+        raise LinkCheckerError(_("invalid socket address %(address)r") %
+                               {"address": address})
+    return socket.AF_INET, (host or "localhost", int(port))
+
+
+def send_message (wfile, message):
+    """Write pickled message with length prefix to the given file."""
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    wfile.write(struct.pack(LengthFormat, len(data)) + data)
+    wfile.flush()
+
+
+def recv_message (rfile):
+    """Read pickled message with length prefix from the given file.
+    @raises: EOFError if the connection has been closed
+    """
+    size = struct.unpack(LengthFormat, recv_data(rfile, LengthSize))[0]
+    return pickle.loads(recv_data(rfile, size))
+
+
+def recv_data (rfile, size):
+    """Read the given number of bytes from the given file.
+    @raises: EOFError if the connection has been closed
+    """
+    data = rfile.read(size)
+    if len(data) < size:
+        raise EOFError()
+    return data
+
+
+def authenticate (rfile, wfile, key, role, peer_role):
+    """Check that the other side of a connection knows the broker key,
+    and prove that this side knows it. Each side sends a random
+    challenge and answers the challenge of the other side with a HMAC
+    of its role and the challenge, so an answer can not be replayed or
+    sent back.
+    @param role: name of this side, "coordinator" or "worker"
+    @param peer_role: name of the other side
+    @raises: AuthenticationError if the other side gives a wrong answer
+    @raises: EOFError if the connection has been closed
+    """
+    challenge = os.urandom(ChallengeSize)
+    wfile.write(challenge)
+    wfile.flush()
+    peer_challenge = recv_data(rfile, ChallengeSize)
+    wfile.write(get_digest(key, role, peer_challenge))
+    wfile.flush()
+    digest = recv_data(rfile, DigestSize)
+    if not compare_digest(digest, get_digest(key, peer_role, challenge)):
+        raise AuthenticationError(_("wrong broker key of the %(role)s") %
+                                  {"role": peer_role})
+
+
+def get_digest (key, role, challenge):
+    """Get the answer of given role to a challenge."""
+    if isinstance(key, unicode):
+        key = key.encode("utf-8")
+    return hmac.new(key, role + challenge, hashlib.sha256).digest()
+
+
+def compare_digest (digest1, digest2):
+    """Compare digests in constant time."""
+    if hasattr(hmac, "compare_digest"):
+        # Python 2.7.7 or later
+        return hmac.compare_digest(digest1, digest2)
+    if len(digest1) != len(digest2):
+        return False
+    result = 0
+    for char1, char2 in zip(digest1, digest2):
+        result |= ord(char1) ^ ord(char2)
+    return result == 0
+
+
+class WorkerHandler (SocketServer.StreamRequestHandler):
+    """Serve one connection of a worker. Each worker pulls URLs with one
+    connection and pushes messages with another one, so a worker waiting
+    for URLs can still send messages."""
+
+    def handle (self):
+        """Handle requests until the worker disconnects."""
+        try:
+            authenticate(self.rfile, self.wfile, self.server.broker.key,
+                         "coordinator", "worker")
+            request = recv_message(self.rfile)
+        except (EOFError, socket.error):
+            return
+        except AuthenticationError as msg:
+            log.warn(LOG_CHECK, _("rejected worker connection: %(msg)s") %
+                     {"msg": msg})
+            return
+        if request[0] == "hello":
+            self.handle_pull()
+        elif request[0] == "push":
+            self.handle_push()
+
+    def handle_pull (self):
+        """Assign a partition to the worker and send it URLs."""
+        broker = self.server.broker
+        partition = broker.add_worker()
+        send_message(self.wfile, (partition, broker.num_partitions,
+                                  broker.worker_state))
+        if partition is None:
+            return
+        try:
+            while True:
+                recv_message(self.rfile)
+                urls = self.get_urls(partition)
+                send_message(self.wfile, urls)
+                if urls is None:
+                    break
+        except (EOFError, socket.error):
+            # the worker stopped before it was told to
+            broker.put_message(("lost", partition))
+
+    def get_urls (self, partition):
+        """Wait for URLs of given partition while the worker is connected.
+        @raises: EOFError if the worker disconnected
+        """
+        while True:
+            try:
+                return self.server.broker.get_urls(partition,
+                                                   timeout=PollSeconds)
+            except Queue.Empty:
+                pass
+            # the worker sends nothing while waiting for URLs, so a
+            # readable socket has been closed
+            if select.select([self.connection], [], [], 0)[0] and \
+               not self.connection.recv(1, socket.MSG_PEEK):
+                raise EOFError()
+
+    def handle_push (self):
+        """Pass the messages of the worker to the coordinator."""
+        broker = self.server.broker
+        while True:
+            try:
+                message = recv_message(self.rfile)
+            except EOFError:
+                break
+            broker.put_message(message)
+
+
+class ThreadingTCPServer (SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """Threaded TCP server."""
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ThreadingUnixServer (SocketServer.ThreadingMixIn,
+                           SocketServer.UnixStreamServer):
+    """Threaded Unix socket server."""
+    daemon_threads = True
+
+
+class SocketBroker (QueueBroker):
+    """Broker serving the partition queues to workers connecting to
+    the given socket address."""
+
+    def __init__ (self, address, num_partitions, worker_state, key):
+        """Start listening on the given address.
+        @param worker_state: data sent to each worker when it connects,
+          eg. the shared configuration
+        @param key: broker key the workers must know
+        """
+        super(SocketBroker, self).__init__(num_partitions)
+        self.worker_state = worker_state
+        self.key = key
+        self.num_workers = 0
+        self.lock = threading.Lock()
+        family, self.address = get_socket_address(address)
+        if family == socket.AF_UNIX:
+            server_class = ThreadingUnixServer
+            if os.path.exists(self.address):
+                os.remove(self.address)
+        else:
+            server_class = ThreadingTCPServer
+        self.server = server_class(self.address, WorkerHandler)
+        self.server.broker = self
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="Broker")
+        self.thread.daemon = True
+        self.thread.start()
+        log.debug(LOG_CHECK, "broker listening on %s", address)
+
+    def add_worker (self):
+        """Assign a partition to a new worker.
+        @return: partition number, or None if all partitions have a worker
+        """
+        with self.lock:
+            if self.num_workers >= self.num_partitions:
+                return None
+            partition = self.num_workers
+            self.num_workers += 1
+        log.debug(LOG_CHECK, "worker for partition %d connected", partition)
+        return partition
+
+    def close (self):
+        """Stop listening for workers."""
+        self.server.shutdown()
+        self.server.server_close()
+        if self.server.address_family == socket.AF_UNIX:
+            os.remove(self.address)
+
+
+class SocketBrokerClient (object):
+    """Worker side of a SocketBroker."""
+
+    def __init__ (self, address, key):
+        """Connect to the broker at given address.
+        @raises: AuthenticationError if the broker does not know the key
+        """
+        self.pull = Connection(address, key)
+        self.push = Connection(address, key)
+        send_message(self.push.wfile, ("push",))
+        # checker threads send messages in parallel
+        self.lock = threading.Lock()
+
+    def hello (self):
+        """Get partition and state of this worker.
+        @return: tuple (partition or None, number of partitions, state)
+        """
+        send_message(self.pull.wfile, ("hello",))
+        return recv_message(self.pull.rfile)
+
+    def get_urls (self, partition):
+        """Wait for URLs of the partition of this worker.
+        @return: list of UrlRef objects, or None if the worker should stop
+        """
+        try:
+            send_message(self.pull.wfile, ("get_urls",))
+            return recv_message(self.pull.rfile)
+        except (EOFError, socket.error):
+            return None
+
+    def put_message (self, message):
+        """Send message to the coordinator."""
+        with self.lock:
+            send_message(self.push.wfile, message)
+
+    def close (self):
+        """Close the connections."""
+        self.pull.close()
+        self.push.close()
+
+
+class Connection (object):
+    """Authenticated socket connection with buffered file objects."""
+
+    def __init__ (self, address, key):
+        """Connect to the given address and authenticate with the
+        broker key."""
+        family, address = get_socket_address(address)
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.connect(address)
+        self.rfile = self.sock.makefile("rb")
+        self.wfile = self.sock.makefile("wb")
+        try:
+            authenticate(self.rfile, self.wfile, key, "worker",
+                         "coordinator")
+        except EOFError:
+            self.close()
+            raise AuthenticationError(
+                _("the coordinator closed the connection"))
+        except AuthenticationError:
+            self.close()
+            raise
+
+    def close (self):
+        """Close the connection."""
+        self.rfile.close()
+        self.wfile.close()
+        self.sock.close()
@@ -21,7 +21,7 @@ import copy
 import time
 from . import task
 from ..cache import urlqueue
-from .. import parser
+from .. import parser, log, LOG_CACHE
 
 # Interval in which each check thread looks if it's stopped.
 QUEUE_POLL_INTERVALL_SECS = 1.0
@@ -45,39 +45,108 @@ def check_url(url_data, logger):
         cache = url_data.aggregate.result_cache
         key = url_data.cache_url
         result = cache.get_result(key)
-        if result is None:
-            # check
-            check_start = time.time()
-            try:
-                url_data.check()
-                do_parse = url_data.check_content()
-                url_data.checktime = time.time() - check_start
-                # Add result to cache
-                result = url_data.to_wire()
-                cache.add_result(key, result)
-                for alias in url_data.aliases:
-                    # redirect aliases
-                    cache.add_result(alias, result)
-                # parse content recursively
-                # XXX this could add new warnings which should be cached.
-                if do_parse:
-                    parser.parse_url(url_data)
-            finally:
-                # close/release possible open connection
-                url_data.close_connection()
-        else:
+        if result is not None:
             # copy data from cache and adjust it
-            result = copy.copy(result)
-            result.parent_url = url_data.parent_url
-            result.base_ref = url_data.base_ref or u""
-            result.base_url = url_data.base_url or u""
-            result.line = url_data.line
-            result.column = url_data.column
-            result.level = url_data.recursion_level
-            result.name = url_data.name
+            result = adjust_result(copy.copy(result), url_data)
+            if not url_data.aggregate.plugin_manager.check_cached_result(
+               url_data, result):
+                # the document of the cached result has been parsed
+                # already, only its URL specific checks are missing
+                if isinstance(url_data, urlqueue.UrlRef):
+                    url_data = url_data.get_url_data()
+                result = check_new_url(url_data, None, parse=False)
+        else:
+            if isinstance(url_data, urlqueue.UrlRef):
+                # the result of the referenced URL is missing
+                url_data = url_data.get_url_data()
+            store = url_data.aggregate.result_store
+            stored = None
+            if store is not None:
+                stored = store.get_result(key)
+            if stored is not None and stored.is_fresh():
+                result = use_stored_result(url_data, stored)
+            else:
+                result = check_new_url(url_data, stored)
         logger.log_url(result)
 
 
+def check_new_url(url_data, stored, parse=True):
+    """Check URL that has no cached result, add the result to the cache
+    and parse the content recursively.
+    @param stored: expired result of the result store or None
+    @param parse: if False, the content is not parsed for recursion and
+      the result is not stored
+    @return: check result
+    """
+    aggregate = url_data.aggregate
+    store = aggregate.result_store if parse else None
+    key = url_data.cache_url
+    url_data.stored_result = stored
+    if store is not None:
+        # remember found URLs to replay them from the result store
+        url_data.child_links = []
+    # check
+    check_start = time.time()
+    try:
+        url_data.check()
+        if url_data.not_modified:
+            log.debug(LOG_CACHE, "Using stored result of unmodified %s", key)
+            store.refresh_result(key)
+            return use_stored_result(url_data, stored)
+        do_parse = url_data.check_content()
+        url_data.checktime = time.time() - check_start
+        # Add result to cache
+        result = url_data.to_wire()
+        aggregate.add_result(key, result)
+        for alias in url_data.aliases:
+            # redirect aliases
+            aggregate.add_result(alias, result)
+        # parse content recursively
+        # XXX this could add new warnings which should be cached.
+        if do_parse and parse:
+            parser.parse_url(url_data)
+        if store is not None and url_data.caching:
+            etag, last_modified = url_data.get_cache_validators()
+            store.add_result(key, result, url_data.child_links,
+                etag=etag, last_modified=last_modified)
+    finally:
+        # close/release possible open connection
+        url_data.close_connection()
+    return result
+
+
+def use_stored_result(url_data, stored):
+    """Use result of the result store for the given URL, add it to the
+    cache and queue the URLs found when the result has been stored.
+    @return: check result
+    """
+    result = adjust_result(stored.result, url_data)
+    # the stored anchor warning is kept if the document is not indexed
+    url_data.aggregate.plugin_manager.check_cached_result(url_data, result)
+    url_data.aggregate.add_result(url_data.cache_url, result)
+    if stored.links and url_data.allows_simple_recursion():
+        # add URLs relative to the final URL after redirections
+        url_data.url = result.url
+        url_data.content_type = result.content_type
+        for args in stored.links:
+            url_data.add_url(*args)
+    return result
+
+
+def adjust_result(result, url_data):
+    """Adjust URL specific attributes of given result to the URL data.
+    @return: adjusted result
+    """
+    result.parent_url = url_data.parent_url or u""
+    result.base_ref = url_data.base_ref or u""
+    result.base_url = url_data.base_url or u""
+    result.line = url_data.line
+    result.column = url_data.column
+    result.level = url_data.recursion_level
+    result.name = url_data.name
+    return result
+
+
 class Checker(task.LoggedCheckedTask):
     """URL check thread."""
 
@@ -0,0 +1,246 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+HTTP connections shared by all checker threads.
+
+Each checker thread has its own request session with its own cookies,
+but all sessions send their requests with one HTTPAdapter. Its
+connection pools keep the connections to each host open, so a
+connection opened by one thread is reused by the others, including the
+robots.txt and plugin requests sent with the same sessions. New
+connections get the addresses of their host from the host cache.
+"""
+import socket
+import threading
+import time
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from requests.packages.urllib3.poolmanager import PoolManager
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, \
+    HTTPSConnectionPool
+from requests.packages.urllib3.exceptions import ConnectTimeoutError
+try:
+    # urllib3 1.14 or later
+    from requests.packages.urllib3.exceptions import NewConnectionError
+except ImportError:
+    NewConnectionError = None
+from .. import log, LOG_CHECK
+
+
+class PoolStats (object):
+    """Thread-safe counters of sent requests and opened connections."""
+
+    def __init__ (self):
+        """Initialize the counters."""
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.handshakes = 0
+
+    def add_request (self, new_connection, https):
+        """Count a request.
+        @param new_connection: True if the request opened a new
+          connection instead of reusing a kept-alive one
+        @param https: True if the connection is encrypted, ie. opening
+          it needed a TLS handshake
+        """
+        with self.lock:
+            self.requests += 1
+            if new_connection:
+                self.connections += 1
+                if https:
+                    self.handshakes += 1
+
+    def get_stats (self):
+        """Get the counters.
+        @return: dictionary with the number of requests, connections
+          and handshakes
+        @rtype: dict
+        """
+        with self.lock:
+            return dict(requests=self.requests, connections=self.connections,
+                        handshakes=self.handshakes)
+
+
+class ResolvingConnectionMixin (object):
+    """Connection resolving its host with the host cache. The addresses
+    are tried in order until one of them connects. This needs the
+    _dns_host attribute of urllib3 1.22 or later, older versions
+    resolve the host with each connect."""
+
+    host_cache = None
+
+    def _new_conn (self):
+        """Connect to the first reachable address of the host."""
+        if self.host_cache is None or not hasattr(self, "_dns_host"):
+            return super(ResolvingConnectionMixin, self)._new_conn()
+        dns_host = self._dns_host
+        try:
+            addresses = self.host_cache.get_addresses(dns_host)
+        except socket.error as msg:
+            raise NewConnectionError(self,
+                "Failed to establish a new connection: %s" % msg)
+        error = NewConnectionError(self,
+            "Failed to establish a new connection: no address found for %s" %
+            dns_host)
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    return super(ResolvingConnectionMixin, self)._new_conn()
+                except (NewConnectionError, ConnectTimeoutError) as msg:
+                    error = msg
+        finally:
+            self._dns_host = dns_host
+        raise error
+
+
+class ResolvingHTTPConnection (ResolvingConnectionMixin,
+                               HTTPConnectionPool.ConnectionCls):
+    """HTTP connection resolving its host with the host cache."""
+
+
+class ResolvingHTTPSConnection (ResolvingConnectionMixin,
+                                HTTPSConnectionPool.ConnectionCls):
+    """HTTPS connection resolving its host with the host cache."""
+
+
+class CountingPoolMixin (object):
+    """Connection pool counting its requests and closing connections
+    that were idle for too long. The stats, idle_timeout and host_cache
+    attributes are set by the SharedPoolManager."""
+
+    stats = None
+    idle_timeout = None
+    host_cache = None
+
+    def _new_conn (self):
+        """Create a connection using the host cache."""
+        conn = super(CountingPoolMixin, self)._new_conn()
+        conn.host_cache = self.host_cache
+        return conn
+
+    def _get_conn (self, timeout=None):
+        """Get a connection from the pool, and close it if it has not been
+        used for idle_timeout seconds. A closed connection reconnects on
+        its next request."""
+        conn = super(CountingPoolMixin, self)._get_conn(timeout=timeout)
+        idle_since = getattr(conn, "idle_since", None)
+        if self.idle_timeout and idle_since is not None and \
+           time.time() - idle_since > self.idle_timeout:
+            log.debug(LOG_CHECK, "Close idle connection to %s", self.host)
+            conn.close()
+        return conn
+
+    def _put_conn (self, conn):
+        """Put a connection back into the pool."""
+        if conn is not None:
+            conn.idle_since = time.time()
+        super(CountingPoolMixin, self)._put_conn(conn)
+
+    def _make_request (self, conn, *args, **kwargs):
+        """Count the request before sending it. A connection without a
+        socket connects first."""
+        if self.stats is not None:
+            new_connection = getattr(conn, "sock", None) is None
+            self.stats.add_request(new_connection, self.scheme == "https")
+        return super(CountingPoolMixin, self)._make_request(conn, *args, **kwargs)
+
+
+class CountingHTTPConnectionPool (CountingPoolMixin, HTTPConnectionPool):
+    """Counting HTTP connection pool."""
+
+    ConnectionCls = ResolvingHTTPConnection
+
+
+class CountingHTTPSConnectionPool (CountingPoolMixin, HTTPSConnectionPool):
+    """Counting HTTPS connection pool."""
+
+    ConnectionCls = ResolvingHTTPSConnection
+
+
+class SharedPoolManager (PoolManager):
+    """Pool manager with counting connection pools."""
+
+    def __init__ (self, stats, idle_timeout, host_cache, **kwargs):
+        """Store the counters, the idle timeout and the host cache
+        for the pools."""
+        super(SharedPoolManager, self).__init__(**kwargs)
+        self.stats = stats
+        self.idle_timeout = idle_timeout
+        self.host_cache = host_cache
+        self.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def _new_pool (self, scheme, host, port, *args, **kwargs):
+        """Create a connection pool for a new host."""
+        log.debug(LOG_CHECK, "New connection pool for %s://%s:%s",
+                  scheme, host, port)
+        pool = super(SharedPoolManager, self)._new_pool(scheme, host, port,
+                                                        *args, **kwargs)
+        pool.stats = self.stats
+        pool.idle_timeout = self.idle_timeout
+        pool.host_cache = self.host_cache
+        return pool
+
+
+class SharedHTTPAdapter (HTTPAdapter):
+    """Thread-safe HTTP adapter for the request sessions of all
+    checker threads."""
+
+    def __init__ (self, max_connections_per_host, max_connections,
+                  idle_timeout, host_cache=None):
+        """Initialize the connection pools.
+        @param max_connections_per_host: maximum number of kept-alive
+          connections to one host, or zero for the requests default
+        @param max_connections: maximum number of kept-alive connections
+          to all hosts; the pools of the least recently used hosts are
+          closed when more hosts are connected
+        @param idle_timeout: close kept-alive connections that have not
+          been used for this number of seconds; zero keeps them open
+        @param host_cache: cache resolving the hosts of new connections,
+          or None to resolve them with each connect
+        @ptype host_cache: linkcheck.cache.hosts.HostCache or None
+        """
+        self.stats = PoolStats()
+        self.idle_timeout = idle_timeout
+        self.host_cache = host_cache
+        if not max_connections_per_host:
+            max_connections_per_host = DEFAULT_POOLSIZE
+        num_pools = max(1, max_connections // max_connections_per_host)
+        super(SharedHTTPAdapter, self).__init__(pool_connections=num_pools,
+            pool_maxsize=max_connections_per_host)
+
+    def init_poolmanager (self, connections, maxsize, block=False,
+                          **pool_kwargs):
+        """Initialize the shared pool manager."""
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = SharedPoolManager(self.stats, self.idle_timeout,
+            self.host_cache,
+            num_pools=connections, maxsize=maxsize, block=block,
+            **pool_kwargs)
+
+    def get_stats (self):
+        """Get the connection statistics.
+        @return: dictionary with the number of requests, new connections
+          and TLS handshakes
+        @rtype: dict
+        """
+        return self.stats.get_stats()
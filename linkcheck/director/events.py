@@ -0,0 +1,59 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Event loop engine for checking URLs.
+
+The engine uses gevent to replace the blocking socket, SSL, DNS, time
+and threading primitives of the standard library with cooperative
+versions. Each checker then runs as a greenlet instead of an OS thread,
+and all network I/O is multiplexed by one event loop. The director,
+URL queue, caches and loggers are used unchanged.
+
+The standard library must be patched before any other module is
+imported, which is why the linkchecker script does the patching itself
+before importing linkcheck. Here it is only checked that the patching
+has been done.
+"""
+try:
+    from gevent import monkey
+except ImportError:
+    monkey = None
+
+# the available check engines
+ENGINE_THREADS = "threads"
+ENGINE_EVENTS = "events"
+Engines = (ENGINE_THREADS, ENGINE_EVENTS)
+
+# the modules that must be patched for the event engine to work
+PatchedModules = ("socket", "ssl", "thread", "threading", "time", "select")
+
+
+def is_available ():
+    """Check if the event engine can be used.
+    @return: True if gevent is installed
+    @rtype: bool
+    """
+    return monkey is not None
+
+
+def is_installed ():
+    """Check if the standard library has been patched for the event engine.
+    @rtype: bool
+    """
+    if not is_available():
+        return False
+    return all(monkey.is_module_patched(name) for name in PatchedModules)
@@ -14,12 +14,33 @@
 # You should have received a copy of the GNU General Public License along
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
-"""Logger for aggregator instances"""
+"""Logger for aggregator instances.
+
+Check results are logged by a writer thread, so checker threads do not
+wait for the output of the loggers. The checker threads put the results
+into a bounded queue and block when it is full. The writer thread logs
+the results in queue order and flushes the loggers after a number of
+results or when no result arrived for some time.
+"""
+import time
 import threading
 import thread
+import Queue
 from ..decorators import synchronized
+from . import console
 _lock = threading.Lock()
 
+# maximum number of results logged by the writer thread at once
+BatchSize = 100
+
+# flush the loggers after this number of results...
+FlushUrls = 1000
+# ...or after this number of seconds
+FlushSeconds = 1.0
+
+# queued instead of a result to log an internal error
+InternalError = object()
+
 
 class Logger (object):
     """Thread safe multi-logger class used by aggregator instances."""
@@ -30,21 +51,41 @@ class Logger (object):
         self.loggers.extend(config['fileoutput'])
         self.verbose = config["verbose"]
         self.warnings = config["warnings"]
+        self.queue_size = config["logqueuesize"]
+        self.queue = None
+        self.writer = None
 
     def start_log_output (self):
         """
-        Start output of all configured loggers.
+        Start output of all configured loggers and the writer thread.
         """
         for logger in self.loggers:
             logger.start_output()
+        if self.queue_size > 0:
+            self.queue = Queue.Queue(self.queue_size)
+            self.writer = threading.Thread(target=self.write, name="Logger")
+            self.writer.daemon = True
+            self.writer.start()
 
     def end_log_output (self, **kwargs):
         """
-        End output of all configured loggers.
+        Log the queued results and end output of all configured loggers.
         """
+        self.stop_writer()
         for logger in self.loggers:
             logger.end_output(**kwargs)
 
+    def stop_writer (self):
+        """Wait until the writer thread logged all queued results."""
+        writer = self.writer
+        if writer is None:
+            return
+        self.writer = None
+        self.queue.put(None)
+        # join with timeout so the main thread can be interrupted
+        while writer.is_alive():
+            writer.join(FlushSeconds)
+
     def do_print (self, url_data):
         """Determine if URL entry should be logged or not."""
         if self.verbose:
@@ -53,8 +94,19 @@ class Logger (object):
             return True
         return not url_data.valid
 
-    @synchronized(_lock)
     def log_url (self, url_data):
+        """Send new url to all configured loggers. The result is queued
+        for the writer thread if it is running.
+        @param url_data: the check result
+        @type url_data: CompactUrlData
+        """
+        if self.writer is not None:
+            self.queue.put(url_data)
+        else:
+            self._log_url(url_data)
+
+    @synchronized(_lock)
+    def _log_url (self, url_data):
         """Send new url to all configured loggers."""
         self.check_active_loggers()
         do_print = self.do_print(url_data)
@@ -63,12 +115,71 @@ class Logger (object):
         for log in self.loggers:
             log.log_filter_url(url_data, do_print)
 
-    @synchronized(_lock)
     def log_internal_error (self):
+        """Document that an internal error occurred. The error is
+        logged after the queued results."""
+        if self.writer is not None:
+            self.queue.put(InternalError)
+        else:
+            self._log_internal_error()
+
+    @synchronized(_lock)
+    def _log_internal_error (self):
         """Document that an internal error occurred."""
         for logger in self.loggers:
             logger.log_internal_error()
 
+    def write (self):
+        """Log queued results in batches until the stop marker None
+        is queued. Used by the writer thread."""
+        num_urls = 0
+        last_flush = time.time()
+        while True:
+            # wait for results until the next flush is due
+            try:
+                if num_urls:
+                    timeout = max(0, last_flush + FlushSeconds - time.time())
+                    items = [self.queue.get(timeout=timeout)]
+                else:
+                    items = [self.queue.get()]
+            except Queue.Empty:
+                items = []
+            while items and len(items) < BatchSize:
+                try:
+                    items.append(self.queue.get_nowait())
+                except Queue.Empty:
+                    break
+            for item in items:
+                if item is None:
+                    self.flush()
+                    return
+                self.write_item(item)
+            num_urls += len(items)
+            if num_urls and (num_urls >= FlushUrls or
+               time.time() - last_flush >= FlushSeconds):
+                self.flush()
+                num_urls = 0
+                last_flush = time.time()
+
+    def write_item (self, item):
+        """Log one queued result or internal error."""
+        try:
+            if item is InternalError:
+                self._log_internal_error()
+            else:
+                self._log_url(item)
+        except Exception:
+            # the checker threads would wait forever for a stopped writer
+            console.internal_error()
+            self._log_internal_error()
+
+    @synchronized(_lock)
+    def flush (self):
+        """Flush the output of all active loggers."""
+        for logger in self.loggers:
+            if logger.is_active:
+                logger.flush()
+
     def check_active_loggers(self):
         """Check if all loggers are deactivated due to I/O errors."""
         for logger in self.loggers:
@@ -0,0 +1,329 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Check URLs with several worker processes.
+
+The hosts are partitioned by a hash of their name. Each worker checks
+the URLs of the hosts in its partition with its own checker threads,
+URL queue, result cache, robots.txt cache and host throttle. Since URLs
+with the same cache key have the same host, each result is cached only
+in the worker that needs it.
+
+The coordinator and the workers exchange URLs and results with a broker
+(see the broker module). Found URLs of hosts in other partitions, check
+results and the number of queued and finished URLs are sent to the
+coordinator. The coordinator forwards the URLs to their worker, logs the
+results with the configured loggers and stops the workers when all URLs
+are checked.
+
+The workers are either forked by the coordinator, which only works on
+POSIX systems, or are started separately and connect to the socket of
+the coordinator.
+"""
+import sys
+import signal
+import zlib
+import multiprocessing
+import Queue
+from .. import log, LOG_CHECK
+from ..cache import urlqueue
+from . import broker
+
+# seconds to wait for worker messages before checking that all workers
+# are still running
+PollSeconds = 1.0
+
+# configuration options that connected workers do not get from the
+# coordinator
+LocalOptions = ("logger", "fileoutput", "threads", "processes", "engine",
+    "coordinator", "worker", "brokerkey", "status", "status_wait_seconds", "debugmemory",
+    "trace", "sslverify", "resultcachefile", "pluginfolders", "proxy")
+
+
+def get_partition (host, num_partitions):
+    """Get the partition of the given host. The hash value must not
+    differ between processes.
+    @return: partition number from 0 to num_partitions - 1
+    @rtype: int
+    """
+    return zlib.crc32(host.encode("utf-8", "replace")) % num_partitions
+
+
+class PartitionUrlQueue (urlqueue.UrlQueue):
+    """URL queue of a worker. URLs of hosts in other partitions are sent
+    to the coordinator, and the coordinator is informed about every
+    queued and finished URL."""
+
+    def __init__ (self, partition, num_partitions, broker, **kwargs):
+        """Store partition and the broker to the coordinator."""
+        super(PartitionUrlQueue, self).__init__(**kwargs)
+        self.partition = partition
+        self.num_partitions = num_partitions
+        self.broker = broker
+
+    def put (self, url_data):
+        """Put URL of this partition into the queue, and send other URLs
+        to the coordinator."""
+        if not url_data.has_result and self.partition != \
+           get_partition(urlqueue.get_host(url_data), self.num_partitions):
+            self.broker.put_message(("url", urlqueue.UrlRef(url_data)))
+            return
+        with self.mutex:
+            if self._put_local(url_data):
+                self.broker.put_message(("add",))
+            self.not_empty.notify()
+
+    def put_ref (self, ref, aggregate):
+        """Put URL sent by the coordinator into the queue. The coordinator
+        already counted it."""
+        ref.aggregate = aggregate
+        url_data = ref.get_url_data()
+        with self.mutex:
+            if not self._put_local(url_data):
+                self.broker.put_message(("done",))
+            self.not_empty.notify()
+
+    def _put_local (self, url_data):
+        """Put URL into the queue. Not thread-safe!
+        @return: True if the URL has been queued
+        @rtype: bool
+        """
+        num = self.unfinished_tasks
+        self._put(url_data)
+        return self.unfinished_tasks > num
+
+    def task_done (self, url_data):
+        """Mark URL as done and inform the coordinator."""
+        super(PartitionUrlQueue, self).task_done(url_data)
+        self.broker.put_message(("done",))
+
+
+class ProcessLogger (object):
+    """Send the check results of a worker to the coordinator."""
+
+    def __init__ (self, broker):
+        """Store the broker to the coordinator."""
+        self.broker = broker
+
+    def log_url (self, url_data):
+        """Send check result to the coordinator."""
+        self.broker.put_message(("result", url_data))
+
+    def log_internal_error (self):
+        """Send internal error to the coordinator."""
+        self.broker.put_message(("internal_error",))
+
+
+def check_partition (config, cookies, partition, num_partitions, broker):
+    """Check the URLs of one partition until the coordinator stops
+    this worker.
+    @param cookies: cookies of the login URL or None
+    @param broker: worker side of the broker
+    """
+    from . import get_aggregate
+    config["status"] = False
+    config["maxrunseconds"] = None
+    worker = get_aggregate(config)
+    worker.cookies = cookies
+    if config["robotsprefetch"]:
+        new_host_callback = worker.robots_txt.prefetch
+    else:
+        new_host_callback = None
+    worker.urlqueue = PartitionUrlQueue(partition, num_partitions, broker,
+        max_allowed_urls=config["maxnumurls"],
+        max_connections_per_host=config["maxconnectionsperhost"] or None,
+        new_host_callback=new_host_callback)
+    worker.logger = ProcessLogger(broker)
+    worker.start_threads()
+    try:
+        while True:
+            urls = broker.get_urls(partition)
+            if urls is None:
+                break
+            for ref in urls:
+                worker.urlqueue.put_ref(ref, worker)
+    finally:
+        worker.cancel()
+        worker.finish()
+    broker.put_message(("stats", worker.get_stats()))
+
+
+def fork_partition (aggregate, partition, num_partitions, broker):
+    """Check the URLs of one partition in a forked worker process."""
+    # the main process handles interrupts and terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    check_partition(aggregate.config, aggregate.cookies, partition,
+                    num_partitions, broker)
+
+
+def check_urls (aggregate):
+    """Check the queued URLs of the aggregate with forked worker
+    processes, and log their results."""
+    num_processes = aggregate.config["processes"]
+    queue_broker = broker.QueueBroker(num_processes,
+        queue_class=multiprocessing.Queue)
+    processes = []
+    # the workers must not write buffered output of the main process
+    sys.stdout.flush()
+    sys.stderr.flush()
+    close_result_store(aggregate)
+    for partition in range(num_processes):
+        process = multiprocessing.Process(target=fork_partition,
+            name="CheckProcess-%d" % partition,
+            args=(aggregate, partition, num_processes, queue_broker))
+        process.daemon = True
+        process.start()
+        processes.append(process)
+    log.debug(LOG_CHECK, "started %d worker processes", num_processes)
+    def is_alive ():
+        """Check if all workers are running or have finished."""
+        return all(process.is_alive() or process.exitcode == 0
+                   for process in processes)
+    try:
+        if aggregate.config["maxrunseconds"]:
+            aggregate.start_interrupt_thread()
+        coordinate(aggregate, queue_broker, is_alive)
+        for process in processes:
+            process.join()
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+
+def close_result_store (aggregate):
+    """Close the result store of the coordinator. Only the workers use
+    their result stores, and forked workers must not inherit an open
+    database connection."""
+    if aggregate.result_store is not None:
+        aggregate.result_store.close()
+
+
+def get_worker_state (aggregate):
+    """Get the data connected workers need from the coordinator.
+    @return: dictionary with shared configuration and login cookies
+    @rtype: dict
+    """
+    config = dict((key, value) for key, value in aggregate.config.items()
+                  if key not in LocalOptions)
+    return dict(config=config, cookies=aggregate.cookies)
+
+
+def check_urls_coordinator (aggregate):
+    """Check the queued URLs of the aggregate with workers connecting
+    to the coordinator socket, and log their results."""
+    config = aggregate.config
+    socket_broker = broker.SocketBroker(config["coordinator"],
+        config["processes"], get_worker_state(aggregate), config["brokerkey"])
+    log.info(LOG_CHECK, _("Waiting for %(num)d workers at %(address)s.") %
+             dict(num=config["processes"], address=config["coordinator"]))
+    close_result_store(aggregate)
+    try:
+        if config["maxrunseconds"]:
+            aggregate.start_interrupt_thread()
+        coordinate(aggregate, socket_broker, lambda: True)
+    finally:
+        socket_broker.close()
+
+
+def check_worker (config):
+    """Connect to the coordinator at config["worker"] and check the URLs
+    of the assigned partition until the coordinator stops this worker.
+    @raises: broker.AuthenticationError if the coordinator does not
+      know the broker key
+    """
+    client = broker.SocketBrokerClient(config["worker"], config["brokerkey"])
+    try:
+        partition, num_partitions, state = client.hello()
+        if partition is None:
+            log.warn(LOG_CHECK,
+              _("All partitions of the coordinator have a worker."))
+            return
+        log.info(LOG_CHECK, _("Checking partition %(num)d of %(total)d.") %
+                 dict(num=partition + 1, total=num_partitions))
+        config.update(state["config"])
+        check_partition(config, state["cookies"], partition,
+                        num_partitions, client)
+    finally:
+        client.close()
+
+
+def coordinate (aggregate, broker, is_alive):
+    """Send the queued URLs to the workers and handle worker messages
+    until all URLs are checked.
+    @param broker: coordinator side of the broker
+    @param is_alive: function checking that no worker died
+    """
+    def send_url (ref):
+        """Send URL to the worker of its partition."""
+        broker.put_url(get_partition(ref.host, broker.num_partitions), ref)
+    num_urls = 0
+    while True:
+        try:
+            url_data = aggregate.urlqueue.get(timeout=0)
+        except urlqueue.Empty:
+            break
+        try:
+            if url_data.has_result:
+                aggregate.logger.log_url(url_data.to_wire())
+            elif isinstance(url_data, urlqueue.UrlRef):
+                send_url(url_data)
+                num_urls += 1
+            else:
+                send_url(urlqueue.UrlRef(url_data))
+                num_urls += 1
+        finally:
+            aggregate.urlqueue.task_done(url_data)
+    # number of URLs that are queued or in progress in the workers
+    while num_urls:
+        try:
+            message = broker.get_message(PollSeconds)
+        except Queue.Empty:
+            if is_alive():
+                continue
+            log.error(LOG_CHECK, _("A worker process died unexpectedly."))
+            return
+        kind = message[0]
+        if kind == "result":
+            aggregate.logger.log_url(message[1])
+        elif kind == "add":
+            num_urls += 1
+        elif kind == "done":
+            num_urls -= 1
+        elif kind == "url":
+            send_url(message[1])
+            num_urls += 1
+        elif kind == "internal_error":
+            aggregate.logger.log_internal_error()
+        elif kind == "lost":
+            log.error(LOG_CHECK, _("The worker of partition %(num)d disconnected.") %
+                      dict(num=message[1] + 1))
+            return
+    broker.stop()
+    num_stats = 0
+    while num_stats < broker.num_partitions:
+        try:
+            message = broker.get_message(PollSeconds)
+        except Queue.Empty:
+            if is_alive():
+                continue
+            break
+        if message[0] == "stats":
+            aggregate.add_process_stats(message[1])
+            num_stats += 1
+        elif message[0] == "lost":
+            num_stats += 1
@@ -0,0 +1,99 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Throttle the number of requests to each host.
+"""
+import threading
+import time
+from .. import log, LOG_CHECK
+
+
+class HostThrottle (object):
+    """Token bucket per host. Each host gets requests_per_second tokens
+    per second, and at most burst tokens can be saved up. A robots.txt
+    Crawl-delay lowers the rate of a host.
+
+    A request reserves a token with a short lock held, and the
+    requesting thread sleeps afterwards without any lock, so a
+    throttled host never blocks threads checking other hosts."""
+
+    def __init__ (self, requests_per_second, burst=1):
+        """Initialize the host buckets."""
+        self.interval = 1.0 / requests_per_second
+        self.burst = burst
+        self.lock = threading.Lock()
+        # {host -> time when the bucket of the host is full again}
+        self.full_times = {}
+        # {host -> crawl delay in seconds}
+        self.crawl_delays = {}
+        # {host -> seconds spent throttled}
+        self.wait_times = {}
+
+    def get_interval (self, host):
+        """Get the minimum number of seconds between two requests
+        to the given host. Not thread-safe!"""
+        return max(self.interval, self.crawl_delays.get(host, 0))
+
+    def set_crawl_delay (self, host, delay):
+        """Set robots.txt crawl delay in seconds for given host."""
+        with self.lock:
+            if delay > 0:
+                log.debug(LOG_CHECK, "Crawl-delay of %d seconds for %s", delay, host)
+                self.crawl_delays[host] = delay
+            else:
+                self.crawl_delays.pop(host, None)
+
+    def get_due_time (self, host):
+        """Get the time when a request to the given host can be sent
+        without waiting."""
+        with self.lock:
+            return self._get_due_time(host)
+
+    def _get_due_time (self, host):
+        """Get the time when a request to the given host can be sent
+        without waiting. Not thread-safe!"""
+        full_time = self.full_times.get(host)
+        if full_time is None:
+            return 0
+        return full_time - (self.burst - 1) * self.get_interval(host)
+
+    def reserve (self, host):
+        """Reserve a token for a request to the given host.
+        @return: number of seconds to wait before sending the request
+        @rtype: float
+        """
+        with self.lock:
+            now = time.time()
+            start = max(now, self._get_due_time(host))
+            full_time = max(now, self.full_times.get(host, now))
+            self.full_times[host] = full_time + self.get_interval(host)
+            wait = start - now
+            if wait > 0:
+                self.wait_times[host] = self.wait_times.get(host, 0) + wait
+            return wait
+
+    def wait (self, host):
+        """Wait until a request to the given host is allowed."""
+        wait = self.reserve(host)
+        if wait > 0:
+            log.debug(LOG_CHECK, "Throttle %s for %.3f seconds", host, wait)
+            time.sleep(wait)
+
+    def get_wait_times (self):
+        """Get copy of the throttled seconds per host."""
+        with self.lock:
+            return self.wait_times.copy()
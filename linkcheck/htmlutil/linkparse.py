@@ -19,6 +19,11 @@ Find link tags in HTML text.
 """
 
 import re
+try:
+    import urlparse
+except ImportError:
+    # Python 3
+    from urllib import parse as urlparse
 from .. import strformat, log, LOG_CHECK, url as urlutil
 from . import linkname
 
@@ -87,6 +92,8 @@ _quoted_pat = ur"('[^']+'|\"[^\"]+\"|[^\)\s]+)"
 css_url_re = re.compile(ur"url\(\s*(?P<url>%s)\s*\)" % _quoted_pat)
 swf_url_re = re.compile("(?i)%s" % urlutil.safe_url_pattern)
 c_comment_re = re.compile(ur"/\*.*?\*/", re.DOTALL)
+# absolute or scheme-relative HTTP(S) URLs with a host to prefetch
+url_prefetch_re = re.compile(ur"(?i)^(https?:)?//")
 
 
 def strip_c_comments (text):
@@ -187,10 +194,16 @@ class LinkFinder (TagFinder):
     """Find HTML links, and apply them to the callback function with the
     format (url, lineno, column, name, codebase)."""
 
-    def __init__ (self, callback, tags):
-        """Store content in buffer and initialize URL list."""
+    def __init__ (self, callback, tags, prefetch=None):
+        """Store content in buffer and initialize URL list.
+        @param prefetch: if given, the hosts of found absolute HTTP(S)
+          URLs are passed to this function, eg. to resolve them before
+          the URLs are checked
+        @ptype prefetch: function or None
+        """
         super(LinkFinder, self).__init__()
         self.callback = callback
+        self.prefetch = prefetch
         # set universal tag attributes using tagname None
         self.universal_attrs = set(tags.get(None, []))
         self.tags = dict()
@@ -279,5 +292,70 @@ class LinkFinder (TagFinder):
     def found_url(self, url, name, base):
         """Add newly found URL to queue."""
         assert isinstance(url, unicode) or url is None, repr(url)
+        if self.prefetch is not None and url:
+            self.prefetch_host(url)
         self.callback(url, line=self.parser.last_lineno(),
                       column=self.parser.last_column(), name=name, base=base)
+
+    def prefetch_host (self, url):
+        """Pass host of given absolute HTTP(S) URL to the prefetch
+        function."""
+        url = url.strip()
+        if not url_prefetch_re.match(url):
+            return
+        try:
+            host = urlparse.urlsplit(url).hostname
+        except ValueError:
+            return
+        if host:
+            self.prefetch(host)
+
+
+class HtmlAnalyzer (LinkFinder):
+    """Collect everything the checker needs from a HTML page in one parse:
+    the links, the anchors, the meta robots flags and the title. The
+    meta robots flags and the title are only searched before the
+    <body> tag."""
+
+    def __init__ (self, prefetch=None):
+        """Initialize the collected page data.
+        @param prefetch: see LinkFinder
+        """
+        super(HtmlAnalyzer, self).__init__(self.add_link, LinkTags,
+                                           prefetch=prefetch)
+        log.debug(LOG_CHECK, "HTML analyzer")
+        # list of tuples (url, line, column, name, base)
+        self.links = []
+        # list of tuples (anchor, line, column, name, base)
+        self.anchors = []
+        self.anchor_universal_attrs = set(AnchorTags[None])
+        self.anchor_tags = dict((tag, set(attrs) | self.anchor_universal_attrs)
+            for tag, attrs in AnchorTags.items())
+        self.follow = self.index = True
+        self.title = None
+        self.found_robots = self.found_body = False
+
+    def add_link (self, url, line, column, name, base):
+        """Store found link."""
+        self.links.append((url, line, column, name, base))
+
+    def start_element (self, tag, attrs):
+        """Collect page data of the tag."""
+        if tag == 'body':
+            self.found_body = True
+        elif not self.found_body:
+            if tag == 'meta' and not self.found_robots and \
+               attrs.get('name') == 'robots':
+                val = attrs.get_true('content', u'').lower().split(u',')
+                self.follow = u'nofollow' not in val
+                self.index = u'noindex' not in val
+                self.found_robots = True
+            elif tag == 'title' and self.title is None:
+                data = self.parser.peek(MAX_TITLELEN)
+                data = data.decode(self.parser.encoding, "ignore")
+                self.title = linkname.title_name(data)
+        line = self.parser.last_lineno()
+        column = self.parser.last_column()
+        for attr in self.anchor_tags.get(tag, self.anchor_universal_attrs).intersection(attrs):
+            self.anchors.append((attrs.get(attr), line, column, u"", self.base_ref))
+        super(HtmlAnalyzer, self).start_element(tag, attrs)
@@ -15,6 +15,8 @@
 # with this program; if not, write to the Free Software Foundation, Inc.,
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 import base64
+import time
+from email.utils import parsedate_tz, mktime_tz
 from datetime import datetime
 
 
@@ -28,6 +30,28 @@ def encode_base64 (s):
     return base64.b64encode(s)
 
 
+def get_ssl_cert(connection):
+    """Get the parsed SSL certificate of a connected HTTPS connection.
+    The certificate is parsed once per socket and stored in the
+    connection, so requests reusing a kept-alive connection to a host
+    do not parse it again.
+    @param connection: connected urllib3 HTTPS connection
+    @return: certificate dictionary
+    @rtype: dict
+    """
+    sock = connection.sock
+    cached = getattr(connection, "ssl_cert_cache", None)
+    if cached is not None and cached[0] is sock:
+        return cached[1]
+    if hasattr(sock, 'cipher'):
+        cert = sock.getpeercert()
+    else:
+        # using pyopenssl
+        cert = x509_to_dict(sock.connection.get_peer_certificate())
+    connection.ssl_cert_cache = (sock, cert)
+    return cert
+
+
 def x509_to_dict(x509):
     """Parse a x509 pyopenssl object to a dictionary with keys
     subject, subjectAltName and optional notAfter.
@@ -126,6 +150,39 @@ def http_keepalive (headers):
     return keepalive
 
 
+def get_max_age (headers):
+    """
+    Get the number of seconds a response may be cached from the
+    Cache-Control max-age value or the Expires and Date headers.
+
+    @param headers: HTTP headers
+    @type headers: dict
+    @return: seconds, zero for responses that must not be cached, or
+      None if the headers have no caching information
+    @rtype: int or None
+    """
+    for directive in headers.get("Cache-Control", "").lower().split(","):
+        directive = directive.strip()
+        if directive in ("no-store", "no-cache"):
+            return 0
+        if directive.startswith("max-age="):
+            try:
+                return max(0, int(directive[8:].strip('" ')))
+            except (ValueError, OverflowError):
+                return 0
+    expires = headers.get("Expires")
+    if expires is None:
+        return None
+    expires = parsedate_tz(expires)
+    if expires is None:
+        # invalid dates mean the response has already expired
+        return 0
+    date = headers.get("Date")
+    date = parsedate_tz(date) if date else None
+    now = mktime_tz(date) if date else time.time()
+    return max(0, int(mktime_tz(expires) - now))
+
+
 def get_content_type (headers):
     """
     Get the MIME type from the Content-Type header value, or
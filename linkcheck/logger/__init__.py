@@ -91,6 +91,12 @@ class LogStatistics (object):
         self.avg_number = 0
         # overall downloaded bytes
         self.downloaded_bytes = None
+        # result cache hits, misses, evictions and size
+        self.result_cache_stats = None
+        # HTTP requests, new connections and TLS handshakes
+        self.connection_stats = None
+        # {host -> seconds spent waiting for the host}
+        self.throttled_seconds = None
 
     def log_url (self, url_data, do_print):
         """Log URL statistics."""
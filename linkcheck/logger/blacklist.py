@@ -19,6 +19,7 @@ A blacklist logger.
 """
 
 import os
+import ast
 import codecs
 from . import _Logger
 
@@ -54,9 +55,9 @@ class BlacklistLogger (_Logger):
     def log_url (self, url_data):
         """
         Put invalid url in blacklist, delete valid url from blacklist.
+        The key shares the URL strings of the check result.
         """
         key = (url_data.parent_url, url_data.cache_url)
-        key = repr(key)
         if key in self.blacklist:
             if url_data.valid:
                 del self.blacklist[key]
@@ -83,6 +84,11 @@ class BlacklistLogger (_Logger):
                 if line.startswith('#') or not line:
                     continue
                 value, key = line.split(None, 1)
+                try:
+                    key = parse_key(key)
+                except (SyntaxError, ValueError):
+                    # invalid key
+                    continue
                 self.blacklist[key] = int(value)
 
     def write_blacklist (self):
@@ -95,3 +101,15 @@ class BlacklistLogger (_Logger):
         self.close_fileoutput()
         # restore umask
         os.umask(oldmask)
+
+
+def parse_key (key):
+    """Parse a blacklist key of the form (parent URL, cache URL).
+    Older versions wrote the key as quoted string.
+    @return: tuple (parent URL, cache URL)
+    @rtype: tuple
+    """
+    key = ast.literal_eval(key)
+    if isinstance(key, basestring):
+        key = ast.literal_eval(key)
+    return key
@@ -0,0 +1,343 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+A compact binary logger storing the check results column by column,
+and a reader for its output files.
+
+The file starts with the Magic string, followed by chunks of up to
+chunksize URLs. Each chunk starts with the number of URLs, the number
+of new strings and the byte size of the new strings, followed by the
+byte lengths of the new strings, the UTF-8 encoded new strings and
+the value arrays of all Columns. String values are stored as ids of
+a dictionary shared by all chunks: id 0 is the empty string, and each
+chunk adds the strings first used in it. All numbers are stored in
+little-endian byte order.
+"""
+
+import os
+import sys
+import mmap
+import array
+import struct
+import bisect
+import calendar
+from . import _Logger
+from .. import log, LOG_CHECK
+
+Magic = "LCCOLS01"
+
+# number of URLs, number of new strings and byte size of new strings
+ChunkHeader = struct.Struct("<III")
+
+# column name and array type code; type code "I" columns hold string ids
+Columns = (
+    ("url", "I"),
+    ("parent_url", "I"),
+    ("base_ref", "I"),
+    ("name", "I"),
+    ("result", "I"),
+    ("warning", "I"),
+    ("info", "I"),
+    ("content_type", "I"),
+    ("valid", "B"),
+    ("extern", "B"),
+    ("size", "d"),
+    ("checktime", "d"),
+    ("dltime", "d"),
+    ("modified", "d"),
+    ("level", "i"),
+    ("line", "i"),
+    ("column", "i"),
+)
+ColumnTypes = dict(Columns)
+
+StringColumns = [name for name, typecode in Columns if typecode == "I"]
+
+ByteSwap = sys.byteorder != "little"
+
+
+def get_values (url_data):
+    """Get column values of a check result.
+    @return: {column name -> unicode string or number}
+    @rtype: dict
+    """
+    modified = url_data.modified
+    if modified is None:
+        timestamp = -1.0
+    else:
+        timestamp = calendar.timegm(modified.utctimetuple()) + \
+          modified.microsecond / 1000000.0
+    return dict(
+        url=url_data.url,
+        parent_url=url_data.parent_url,
+        base_ref=url_data.base_ref,
+        name=url_data.name,
+        result=url_data.result,
+        warning=u"\n".join(x[1] for x in url_data.warnings),
+        info=u"\n".join(url_data.info),
+        content_type=url_data.content_type,
+        valid=1 if url_data.valid else 0,
+        extern=1 if url_data.extern else 0,
+        size=url_data.size,
+        checktime=url_data.checktime,
+        dltime=url_data.dltime,
+        modified=timestamp,
+        level=url_data.level,
+        line=url_data.line if url_data.line is not None else -1,
+        column=url_data.column if url_data.column is not None else -1,
+    )
+
+
+def to_bytes (values):
+    """Get little-endian bytes of an array."""
+    if ByteSwap:
+        values = array.array(values.typecode, values)
+        values.byteswap()
+    return values.tostring()
+
+
+def from_bytes (typecode, data):
+    """Get array from little-endian bytes."""
+    values = array.array(typecode)
+    values.fromstring(data)
+    if ByteSwap:
+        values.byteswap()
+    return values
+
+
+class ColumnLogger (_Logger):
+    """
+    Columnar binary output, see the module documentation for the
+    file format. Read the output with ColumnReader.
+    """
+
+    LoggerName = 'column'
+
+    LoggerArgs = {
+        "filename": "linkchecker-out.column",
+        "chunksize": "10000",
+    }
+
+    def __init__ (self, **kwargs):
+        """Initialize the string dictionary and the column arrays."""
+        args = self.get_args(kwargs)
+        super(ColumnLogger, self).__init__(**args)
+        self.filename = os.path.expanduser(args['filename'])
+        self.chunksize = max(1, int(args['chunksize']))
+        self.fd = None
+        # {string -> id}
+        self.strings = {u"": 0}
+        self.reset_chunk()
+
+    def reset_chunk (self):
+        """Start a new chunk without URLs."""
+        self.num_rows = 0
+        self.new_strings = []
+        self.values = dict((name, array.array(typecode))
+                           for name, typecode in Columns)
+
+    def comment (self, s, **args):
+        """
+        Write nothing.
+        """
+        pass
+
+    def start_output (self):
+        """Open the output file and write the file header."""
+        super(ColumnLogger, self).start_output()
+        path = os.path.dirname(self.filename)
+        try:
+            if path and not os.path.isdir(path):
+                os.makedirs(path)
+            self.fd = open(self.filename, "wb")
+            self.fd.write(Magic)
+        except (OSError, IOError) as msg:
+            self.disable(msg)
+
+    def get_string_id (self, s):
+        """Get dictionary id of the given string, adding new strings to
+        the current chunk."""
+        if not s:
+            return 0
+        string_id = self.strings.get(s)
+        if string_id is None:
+            string_id = self.strings[s] = len(self.strings)
+            self.new_strings.append(s.encode("utf-8"))
+        return string_id
+
+    def log_url (self, url_data):
+        """Add the check result to the current chunk and write the chunk
+        when it is full."""
+        for name, value in get_values(url_data).items():
+            if name in StringColumns:
+                value = self.get_string_id(value)
+            self.values[name].append(value)
+        self.num_rows += 1
+        if self.num_rows >= self.chunksize:
+            self.write_chunk()
+
+    def write_chunk (self):
+        """Write the current chunk and start a new one."""
+        if not self.num_rows:
+            return
+        if self.fd is not None:
+            lengths = array.array("I", (len(s) for s in self.new_strings))
+            data = [ChunkHeader.pack(self.num_rows, len(lengths),
+                                     sum(lengths)),
+                    to_bytes(lengths)]
+            data.extend(self.new_strings)
+            data.extend(to_bytes(self.values[name]) for name, dummy in Columns)
+            try:
+                self.fd.write("".join(data))
+            except IOError as msg:
+                self.disable(msg)
+        self.reset_chunk()
+
+    def disable (self, msg):
+        """Close the output file after an error and disable this logger."""
+        log.warn(LOG_CHECK,
+            "Could not write to output file %s: %s\n"
+            "Disabling log output of %s", self.filename, msg, self)
+        if self.fd is not None:
+            self.fd.close()
+            self.fd = None
+        self.is_active = False
+
+    def end_output (self, **kwargs):
+        """Write the last chunk and close the output file."""
+        self.write_chunk()
+        if self.fd is not None:
+            self.fd.close()
+            self.fd = None
+
+
+class Chunk (object):
+    """Location of a chunk in a memory-mapped column file."""
+
+    def __init__ (self, data, offset, first_string_id):
+        """Read the chunk header at the given offset.
+        @param data: the memory-mapped file
+        @param first_string_id: id of the first new string of this chunk
+        """
+        self.num_rows, self.num_strings, strings_size = \
+          ChunkHeader.unpack_from(data, offset)
+        self.first_string_id = first_string_id
+        self.lengths_offset = offset + ChunkHeader.size
+        self.strings_offset = self.lengths_offset + 4 * self.num_strings
+        offset = self.strings_offset + strings_size
+        # {column name -> offset of the column values}
+        self.offsets = {}
+        for name, typecode in Columns:
+            self.offsets[name] = offset
+            offset += array.array(typecode).itemsize * self.num_rows
+        self.end = offset
+        # offsets of the new strings, read when needed
+        self.string_offsets = None
+
+
+class ColumnReader (object):
+    """Read a file of the column logger without loading it into memory.
+    Only the chunk headers are read when the file is opened; the column
+    values and strings are read from the memory-mapped file when needed.
+    """
+
+    def __init__ (self, filename):
+        """Open the file and read the chunk headers.
+        @raises: ValueError if the file is no column logger output
+        """
+        self.fd = open(filename, "rb")
+        self.data = mmap.mmap(self.fd.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(Magic)] != Magic:
+            self.close()
+            raise ValueError("%r is no column logger output" % filename)
+        self.chunks = []
+        # ids of the first new string of each chunk
+        self.first_string_ids = []
+        num_strings = 1
+        offset = len(Magic)
+        while offset + ChunkHeader.size <= len(self.data):
+            chunk = Chunk(self.data, offset, num_strings)
+            if chunk.end > len(self.data):
+                # incomplete chunk of an aborted output
+                break
+            self.chunks.append(chunk)
+            self.first_string_ids.append(num_strings)
+            num_strings += chunk.num_strings
+            offset = chunk.end
+        self.num_strings = num_strings
+
+    def __len__ (self):
+        """Get number of URLs."""
+        return sum(chunk.num_rows for chunk in self.chunks)
+
+    def get_column (self, chunk, name):
+        """Get the values of one column of a chunk.
+        @rtype: array.array
+        """
+        typecode = ColumnTypes[name]
+        offset = chunk.offsets[name]
+        size = array.array(typecode).itemsize * chunk.num_rows
+        return from_bytes(typecode, self.data[offset:offset + size])
+
+    def get_string (self, string_id):
+        """Get string with given dictionary id.
+        @rtype: unicode
+        """
+        if string_id == 0:
+            return u""
+        if not 0 < string_id < self.num_strings:
+            raise KeyError(string_id)
+        index = bisect.bisect_right(self.first_string_ids, string_id) - 1
+        chunk = self.chunks[index]
+        if chunk.string_offsets is None:
+            data = self.data[chunk.lengths_offset:chunk.strings_offset]
+            offsets = array.array("I", [chunk.strings_offset])
+            for length in from_bytes("I", data):
+                offsets.append(offsets[-1] + length)
+            chunk.string_offsets = offsets
+        i = string_id - chunk.first_string_id
+        start, end = chunk.string_offsets[i], chunk.string_offsets[i + 1]
+        return self.data[start:end].decode("utf-8")
+
+    def rows (self, columns=None, where=None):
+        """Iterate over the URLs. Only the values of the given columns are
+        read. String ids are replaced by their strings.
+        @param columns: names of the columns to read, default all columns
+        @ptype columns: list or None
+        @param where: function getting the column values of an URL,
+          returning True if the URL should be returned
+        @ptype where: function or None
+        @return: iterator of {column name -> value} dictionaries
+        """
+        if columns is None:
+            columns = [name for name, dummy in Columns]
+        for chunk in self.chunks:
+            values = [(name, self.get_column(chunk, name)) for name in columns]
+            for i in xrange(chunk.num_rows):
+                row = {}
+                for name, column in values:
+                    if name in StringColumns:
+                        row[name] = self.get_string(column[i])
+                    else:
+                        row[name] = column[i]
+                if where is None or where(row):
+                    yield row
+
+    def close (self):
+        """Close the file."""
+        self.data.close()
+        self.fd.close()
@@ -50,28 +50,26 @@ class DOTLogger (_GraphLogger):
         self.write(u"// ")
         self.writeln(s=s, **args)
 
-    def log_url (self, url_data):
-        """Write one node."""
-        node = self.get_node(url_data)
-        if node is not None:
-            self.writeln(u'  "%s" [' % dotquote(node["label"]))
-            if self.has_part("realurl"):
-                self.writeln(u'    href="%s",' % dotquote(node["url"]))
-            if node["dltime"] >= 0 and self.has_part("dltime"):
-                self.writeln(u"    dltime=%d," % node["dltime"])
-            if node["size"] >= 0 and self.has_part("dlsize"):
-                self.writeln(u"    size=%d," % node["size"])
-            if node["checktime"] and self.has_part("checktime"):
-                self.writeln(u"    checktime=%d," % node["checktime"])
-            if self.has_part("extern"):
-                self.writeln(u"    extern=%d," % node["extern"])
-            self.writeln(u"  ];")
+    def write_node (self, node):
+        """Write one node. Nodes are identified by their id since
+        labels need not be unique."""
+        self.writeln(u"  %d [" % node["id"])
+        self.writeln(u'    label="%s",' % dotquote(node["label"]))
+        if self.has_part("realurl"):
+            self.writeln(u'    href="%s",' % dotquote(node["url"]))
+        if node["dltime"] >= 0 and self.has_part("dltime"):
+            self.writeln(u"    dltime=%d," % node["dltime"])
+        if node["size"] >= 0 and self.has_part("dlsize"):
+            self.writeln(u"    size=%d," % node["size"])
+        if node["checktime"] and self.has_part("checktime"):
+            self.writeln(u"    checktime=%d," % node["checktime"])
+        if self.has_part("extern"):
+            self.writeln(u"    extern=%d," % node["extern"])
+        self.writeln(u"  ];")
 
-    def write_edge (self, node):
+    def write_edge (self, parent_id, node):
         """Write edge from parent to node."""
-        source = dotquote(self.nodes[node["parent_url"]]["label"])
-        target = dotquote(node["label"])
-        self.writeln(u'  "%s" -> "%s" [' % (source, target))
+        self.writeln(u"  %d -> %d [" % (parent_id, node["id"]))
         self.writeln(u'    label="%s",' % dotquote(node["edge"]))
         if self.has_part("result"):
             self.writeln(u"    valid=%d," % node["valid"])
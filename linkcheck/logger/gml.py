@@ -44,30 +44,28 @@ class GMLLogger (_GraphLogger):
         """Write GML comment."""
         self.writeln(s=u'comment "%s"' % s, **args)
 
-    def log_url (self, url_data):
+    def write_node (self, node):
         """Write one node."""
-        node = self.get_node(url_data)
-        if node:
-            self.writeln(u"  node [")
-            self.writeln(u"    id     %d" % node["id"])
-            self.writeln(u'    label  "%s"' % node["label"])
-            if self.has_part("realurl"):
-                self.writeln(u'    url  "%s"' % node["url"])
-            if node["dltime"] >= 0 and self.has_part("dltime"):
-                self.writeln(u"    dltime %d" % node["dltime"])
-            if node["size"] >= 0 and self.has_part("dlsize"):
-                self.writeln(u"    size %d" % node["size"])
-            if node["checktime"] and self.has_part("checktime"):
-                self.writeln(u"    checktime %d" % node["checktime"])
-            if self.has_part("extern"):
-                self.writeln(u"    extern %d" % node["extern"])
-            self.writeln(u"  ]")
+        self.writeln(u"  node [")
+        self.writeln(u"    id     %d" % node["id"])
+        self.writeln(u'    label  "%s"' % node["label"])
+        if self.has_part("realurl"):
+            self.writeln(u'    url  "%s"' % node["url"])
+        if node["dltime"] >= 0 and self.has_part("dltime"):
+            self.writeln(u"    dltime %d" % node["dltime"])
+        if node["size"] >= 0 and self.has_part("dlsize"):
+            self.writeln(u"    size %d" % node["size"])
+        if node["checktime"] and self.has_part("checktime"):
+            self.writeln(u"    checktime %d" % node["checktime"])
+        if self.has_part("extern"):
+            self.writeln(u"    extern %d" % node["extern"])
+        self.writeln(u"  ]")
 
-    def write_edge (self, node):
+    def write_edge (self, parent_id, node):
         """Write one edge."""
         self.writeln(u"  edge [")
         self.writeln(u'    label  "%s"' % node["edge"])
-        self.writeln(u"    source %d" % self.nodes[node["parent_url"]]["id"])
+        self.writeln(u"    source %d" % parent_id)
         self.writeln(u"    target %d" % node["id"])
         if self.has_part("result"):
             self.writeln(u"    valid  %d" % node["valid"])
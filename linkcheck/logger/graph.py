@@ -16,22 +16,104 @@
 # 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 """
 Base class for graph loggers.
+
+Nodes and edges are written as soon as they are logged. Only the ids
+of the written nodes are kept, optionally in a temporary SQLite
+database when there are many of them. An edge is written when both its
+nodes have been written.
 """
+import os
+import re
+import sqlite3
+import tempfile
+import urlparse
 from . import _Logger
 from ..decorators import notimplemented
-import re
+
+
+class NodeIds (object):
+    """Map URLs to integer node ids. With a maximum size, the ids are
+    moved to a temporary SQLite database when more than max_size ids
+    are in memory."""
+
+    def __init__ (self, max_size=0):
+        """Initialize the id table.
+        @param max_size: maximum number of ids in memory, 0 for no limit
+        """
+        self.max_size = max_size
+        # {url -> id}
+        self.ids = {}
+        self.filename = None
+        self.conn = None
+
+    def get (self, url):
+        """Get the id of an URL.
+        @return: the id or None if not found
+        @rtype: int or None
+        """
+        node_id = self.ids.get(url)
+        if node_id is None and self.conn is not None:
+            row = self.conn.execute("select id from ids where url=?",
+                                    (url,)).fetchone()
+            if row is not None:
+                node_id = row[0]
+        return node_id
+
+    def __contains__ (self, url):
+        """Check if the URL has an id."""
+        return self.get(url) is not None
+
+    def add (self, url, node_id):
+        """Store the id of an URL."""
+        self.ids[url] = node_id
+        if self.max_size and len(self.ids) > self.max_size:
+            self.spill()
+
+    def spill (self):
+        """Move the ids in memory to the database."""
+        if self.conn is None:
+            fd, self.filename = tempfile.mkstemp(suffix=".sqlite",
+                                                 prefix="linkchecker-graph-")
+            os.close(fd)
+            self.conn = sqlite3.connect(self.filename,
+                                        check_same_thread=False)
+            self.conn.text_factory = unicode
+            self.conn.execute("pragma synchronous=off")
+            self.conn.execute(
+              "create table ids (url text primary key, id int not null)")
+        with self.conn:
+            self.conn.executemany("insert into ids (url, id) values (?, ?)",
+                                  self.ids.iteritems())
+        self.ids = {}
+
+    def close (self):
+        """Remove all ids and the database."""
+        self.ids = {}
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+            os.remove(self.filename)
+            self.filename = None
 
 
 class _GraphLogger (_Logger):
-    """Provide base method to get node data."""
+    """Provide base method to get node data, and write nodes and edges
+    while they are logged."""
 
     def __init__ (self, **kwargs):
-        """Initialize graph node list and internal id counter."""
+        """Initialize node id table and internal id counter."""
         args = self.get_args(kwargs)
         super(_GraphLogger, self).__init__(**args)
         self.init_fileoutput(args)
-        self.nodes = {}
+        self.init_nodes(args)
+
+    def init_nodes (self, args):
+        """Initialize node id table, internal id counter and edges
+        waiting for their parent node."""
+        self.nodes = NodeIds(max_size=int(args.get("maxnodes", 0)))
         self.nodeid = 0
+        # {parent URL without anchor -> list of edge data}
+        self.edges = {}
 
     def log_filter_url(self, url_data, do_print):
         """Update accounting data and log all valid URLs regardless the
@@ -42,6 +124,13 @@ class _GraphLogger (_Logger):
         if url_data.valid:
             self.log_url(url_data)
 
+    def log_url (self, url_data):
+        """Write a new node and the edges to and from it."""
+        node = self.get_node(url_data)
+        if node is not None:
+            self.write_node(node)
+            self.write_edges(node, url_data)
+
     def get_node (self, url_data):
         """Return new node data or None if node already exists."""
         if not url_data.url:
@@ -60,22 +149,53 @@ class _GraphLogger (_Logger):
             "edge": quote(url_data.name),
             "valid": 1 if url_data.valid else 0,
         }
-        self.nodes[node["url"]] = node
+        self.nodes.add(node["url"], node["id"])
+        # children may refer to their parent with the cache URL
+        if url_data.cache_url and url_data.cache_url != node["url"] and \
+           url_data.cache_url not in self.nodes:
+            self.nodes.add(url_data.cache_url, node["id"])
         self.nodeid += 1
         return node
 
-    def write_edges (self):
+    def write_edges (self, node, url_data):
+        """Write the edge from the parent of a new node if the parent has
+        been written, and the edges to the written children of the node.
         """
-        Write all edges we can find in the graph in a brute-force manner.
+        if node["parent_url"]:
+            parent_id = self.get_parent_id(node["parent_url"])
+            if parent_id is None:
+                # wait for the parent node
+                edge = dict((key, node[key]) for key in
+                            ("id", "label", "edge", "valid"))
+                url = urlparse.urldefrag(node["parent_url"])[0]
+                self.edges.setdefault(url, []).append(edge)
+            else:
+                self.write_edge(parent_id, node)
+        for url in set((urlparse.urldefrag(node["url"])[0],
+                        url_data.cache_url)):
+            for edge in self.edges.pop(url, []):
+                self.write_edge(node["id"], edge)
+
+    def get_parent_id (self, parent_url):
+        """Get node id of a parent URL, with or without anchor.
+        @return: the id or None if the parent has not been written
+        @rtype: int or None
         """
-        for node in self.nodes.values():
-            if node["parent_url"] in self.nodes:
-                self.write_edge(node)
-        self.flush()
+        parent_id = self.nodes.get(parent_url)
+        if parent_id is None:
+            url = urlparse.urldefrag(parent_url)[0]
+            if url != parent_url:
+                parent_id = self.nodes.get(url)
+        return parent_id
 
     @notimplemented
-    def write_edge (self, node):
-        """Write edge data for one node and its parent."""
+    def write_node (self, node):
+        """Write node data."""
+        pass
+
+    @notimplemented
+    def write_edge (self, parent_id, node):
+        """Write edge data for one node and its parent node id."""
         pass
 
     @notimplemented
@@ -83,9 +203,15 @@ class _GraphLogger (_Logger):
         """Write end-of-graph marker."""
         pass
 
+    def end_nodes (self):
+        """Remove the node ids and the edges whose parent has not been
+        logged."""
+        self.nodes.close()
+        self.edges = {}
+
     def end_output (self, **kwargs):
-        """Write edges and end of checking info as gml comment."""
-        self.write_edges()
+        """Write end of graph and end of checking info as comment."""
+        self.end_nodes()
         self.end_graph()
         if self.has_part("outro"):
             self.write_outro()
@@ -33,11 +33,10 @@ class GraphXMLLogger (_XMLLogger, _GraphLogger):
     }
 
     def __init__ (self, **kwargs):
-        """Initialize graph node list and internal id counter."""
+        """Initialize node id table and internal id counter."""
         args = self.get_args(kwargs)
         super(GraphXMLLogger, self).__init__(**args)
-        self.nodes = {}
-        self.nodeid = 0
+        self.init_nodes(args)
 
     def start_output (self):
         """Write start of checking info as xml comment."""
@@ -47,30 +46,28 @@ class GraphXMLLogger (_XMLLogger, _GraphLogger):
         self.xml_starttag(u'graph', attrs={u"isDirected": u"true"})
         self.flush()
 
-    def log_url (self, url_data):
-        """Write one node and all possible edges."""
-        node = self.get_node(url_data)
-        if node:
-            self.xml_starttag(u'node', attrs={u"name": u"%d" % node["id"]})
-            self.xml_tag(u"label", node["label"])
-            if self.has_part("realurl"):
-                self.xml_tag(u"url", node["url"])
-            self.xml_starttag(u"data")
-            if node["dltime"] >= 0 and self.has_part("dltime"):
-                self.xml_tag(u"dltime", u"%f" % node["dltime"])
-            if node["size"] >= 0 and self.has_part("dlsize"):
-                self.xml_tag(u"size", u"%d" % node["size"])
-            if node["checktime"] and self.has_part("checktime"):
-                self.xml_tag(u"checktime", u"%f" % node["checktime"])
-            if self.has_part("extern"):
-                self.xml_tag(u"extern", u"%d" % node["extern"])
-            self.xml_endtag(u"data")
-            self.xml_endtag(u"node")
+    def write_node (self, node):
+        """Write one node."""
+        self.xml_starttag(u'node', attrs={u"name": u"%d" % node["id"]})
+        self.xml_tag(u"label", node["label"])
+        if self.has_part("realurl"):
+            self.xml_tag(u"url", node["url"])
+        self.xml_starttag(u"data")
+        if node["dltime"] >= 0 and self.has_part("dltime"):
+            self.xml_tag(u"dltime", u"%f" % node["dltime"])
+        if node["size"] >= 0 and self.has_part("dlsize"):
+            self.xml_tag(u"size", u"%d" % node["size"])
+        if node["checktime"] and self.has_part("checktime"):
+            self.xml_tag(u"checktime", u"%f" % node["checktime"])
+        if self.has_part("extern"):
+            self.xml_tag(u"extern", u"%d" % node["extern"])
+        self.xml_endtag(u"data")
+        self.xml_endtag(u"node")
 
-    def write_edge (self, node):
+    def write_edge (self, parent_id, node):
         """Write one edge."""
         attrs = {
-            u"source": u"%d" % self.nodes[node["parent_url"]]["id"],
+            u"source": u"%d" % parent_id,
             u"target": u"%d" % node["id"],
         }
         self.xml_starttag(u"edge", attrs=attrs)
@@ -84,6 +81,7 @@ class GraphXMLLogger (_XMLLogger, _GraphLogger):
     def end_output (self, **kwargs):
         """Finish graph output, and print end of checking info as xml
         comment."""
+        self.end_nodes()
         self.xml_endtag(u"graph")
         self.xml_endtag(u"GraphXML")
         self.xml_end_output()
@@ -111,7 +111,6 @@ class SitemapXmlLogger (xmllog._XMLLogger):
         self.xml_tag(u'changefreq', self.frequency)
         self.xml_tag(u'priority', "%.2f" % priority)
         self.xml_endtag(u'url')
-        self.flush()
 
     def end_output (self, **kwargs):
         """Write XML end tag."""
@@ -0,0 +1,174 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+A logger writing directly to a SQLite database.
+"""
+
+import os
+import sqlite3
+from . import _Logger
+from .. import log, LOG_CHECK, url as urlutil
+
+# columns of the table, see config/create.sql
+Columns = ("urlname", "parentname", "baseref", "valid", "result",
+    "warning", "info", "url", "line", "col", "name", "checktime", "dltime",
+    "size", "cached", "level", "modified")
+
+# write the logged URLs in one transaction after this number of URLs
+BatchSize = 1000
+
+
+class SQLiteLogger (_Logger):
+    """
+    SQLite database output. The table is created like in the
+    config/create.sql script, and indexes on the URL and parent URL
+    columns are added at the end of the output.
+    """
+
+    LoggerName = 'sqlite'
+
+    LoggerArgs = {
+        "filename": "linkchecker-out.sqlite",
+        'dbname': 'linksdb',
+        'wal': '0',
+    }
+
+    def __init__ (self, **kwargs):
+        """Initialize database file name and table name."""
+        args = self.get_args(kwargs)
+        super(SQLiteLogger, self).__init__(**args)
+        self.filename = os.path.expanduser(args['filename'])
+        self.dbname = args['dbname']
+        self.wal = args['wal'] not in ('0', '', False)
+        self.conn = None
+        # URLs waiting to be written
+        self.rows = []
+
+    def get_table (self, suffix=u""):
+        """Get quoted table name, or index name with given suffix."""
+        return u'"%s%s"' % (self.dbname.replace(u'"', u'""'), suffix)
+
+    def start_output (self):
+        """
+        Open the database and create the table. An existing table
+        is replaced.
+        """
+        super(SQLiteLogger, self).start_output()
+        path = os.path.dirname(self.filename)
+        try:
+            if path and not os.path.isdir(path):
+                os.makedirs(path)
+            self.conn = sqlite3.connect(self.filename,
+                                        check_same_thread=False)
+            self.conn.text_factory = unicode
+            if self.wal:
+                self.conn.execute("pragma journal_mode=wal")
+                self.conn.execute("pragma synchronous=normal")
+            table = self.get_table()
+            self.conn.execute(u"drop table if exists %s" % table)
+            self.conn.execute(u"""create table %s (
+                urlname text not null,
+                parentname text,
+                baseref text,
+                valid int,
+                result text,
+                warning text,
+                info text,
+                url text,
+                line int,
+                col int,
+                name text,
+                checktime int,
+                dltime int,
+                size int,
+                cached int,
+                level int not null,
+                modified text
+            )""" % table)
+            self.conn.commit()
+        except (OSError, sqlite3.Error) as msg:
+            self.disable(msg)
+
+    def log_url (self, url_data):
+        """
+        Store url check info into the database. The URLs are written
+        in batches.
+        """
+        self.rows.append((
+            url_data.base_url,
+            url_data.parent_url,
+            url_data.base_ref,
+            1 if url_data.valid else 0,
+            url_data.result,
+            os.linesep.join(x[1] for x in url_data.warnings),
+            os.linesep.join(url_data.info),
+            urlutil.url_quote(url_data.url),
+            url_data.line,
+            url_data.column,
+            url_data.name,
+            int(url_data.checktime),
+            int(url_data.dltime),
+            url_data.size,
+            0,
+            url_data.level,
+            self.format_modified(url_data.modified) or None,
+        ))
+        if len(self.rows) >= BatchSize:
+            self.flush()
+
+    def flush (self):
+        """Write the waiting URLs in one transaction."""
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+        if self.conn is None:
+            return
+        sql = u"insert into %s (%s) values (%s)" % (self.get_table(),
+            u",".join(Columns), u",".join(u"?" * len(Columns)))
+        try:
+            with self.conn:
+                self.conn.executemany(sql, rows)
+        except sqlite3.Error as msg:
+            self.disable(msg)
+
+    def disable (self, msg):
+        """Close the database after an error and disable this logger."""
+        log.warn(LOG_CHECK,
+            "Could not write to database %s: %s\n"
+            "Disabling log output of %s", self.filename, msg, self)
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.is_active = False
+
+    def end_output (self, **kwargs):
+        """
+        Write the waiting URLs, add the indexes and close the database.
+        """
+        self.flush()
+        if self.conn is None:
+            return
+        try:
+            for column in ("urlname", "parentname"):
+                self.conn.execute(u"create index %s on %s (%s)" %
+                    (self.get_table(u"_" + column), self.get_table(), column))
+            self.conn.commit()
+        except sqlite3.Error as msg:
+            self.disable(msg)
+        else:
+            self.conn.close()
+            self.conn = None
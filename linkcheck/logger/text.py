@@ -21,6 +21,8 @@ import time
 from . import _Logger
 from .. import ansicolor, strformat, configuration, i18n
 
+# maximum number of throttled hosts listed in the statistics
+MaxThrottledHosts = 5
 
 class TextLogger (_Logger):
     """
@@ -272,6 +274,14 @@ class TextLogger (_Logger):
         self.writeln(_("Statistics:"))
         if self.stats.downloaded_bytes is not None:
             self.writeln(_("Downloaded: %s.") % strformat.strsize(self.stats.downloaded_bytes))
+        if self.stats.result_cache_stats is not None:
+            self.writeln(_("Result cache: %(hits)d hits, %(misses)d misses, "
+                "%(evictions)d evictions, %(size)d cached results.") %
+                self.stats.result_cache_stats)
+        if self.stats.connection_stats:
+            self.write_connection_stats()
+        if self.stats.throttled_seconds:
+            self.write_throttled_seconds()
         if self.stats.number > 0:
             self.writeln(_(
               "Content types: %(image)d image, %(text)d text, %(video)d video, "
@@ -284,9 +294,35 @@ class TextLogger (_Logger):
         else:
             self.writeln(_("No statistics available since no URLs were checked."))
 
+    def write_connection_stats (self):
+        """Write number of HTTP requests and opened connections."""
+        stats = self.stats.connection_stats
+        if not stats["requests"]:
+            return
+        reused = stats["requests"] - stats["connections"]
+        self.writeln(_("Connections: %(requests)d HTTP requests, "
+            "%(connections)d new connections, %(handshakes)d TLS handshakes, "
+            "%(reuse)d%% reused.") % dict(stats,
+            reuse=100 * reused // stats["requests"]))
+
+    def write_throttled_seconds (self):
+        """Write time spent waiting for throttled hosts."""
+        throttled = self.stats.throttled_seconds
+        total = sum(throttled.values())
+        self.writeln(_n("Throttled: %(duration)s on %(num)d host.",
+            "Throttled: %(duration)s on %(num)d hosts.", len(throttled)) %
+            dict(duration=strformat.strduration_long(total), num=len(throttled)))
+        hosts = sorted(throttled, key=throttled.get, reverse=True)
+        for host in hosts[:MaxThrottledHosts]:
+            self.writeln(u"  %s: %s" % (host,
+                strformat.strduration_long(throttled[host])))
+
     def end_output (self, **kwargs):
         """Write end of output info, and flush all output buffers."""
         self.stats.downloaded_bytes = kwargs.get("downloaded_bytes")
+        self.stats.throttled_seconds = kwargs.get("throttled_seconds")
+        self.stats.result_cache_stats = kwargs.get("result_cache_stats")
+        self.stats.connection_stats = kwargs.get("connection_stats")
         self.stats.num_urls = kwargs.get("num_urls")
         if self.has_part('stats'):
             self.write_stats()
@@ -44,10 +44,11 @@ def parse_url(url_data):
 
 
 def parse_html (url_data):
-    """Parse into HTML content and search for URLs to check.
+    """Search the HTML analysis of the content for URLs to check.
     Found URLs are added to the URL queue.
     """
-    find_links(url_data, url_data.add_url, linkparse.LinkTags)
+    for url, line, column, name, base in url_data.get_html_analysis().links:
+        url_data.add_url(url, line=line, column=column, name=name, base=base)
 
 
 def parse_opera (url_data):
@@ -117,15 +118,57 @@ def find_links (url_data, callback, tags):
     """Parse into content and search for URLs to check.
     Found URLs are added to the URL queue.
     """
+    parse_content(url_data, linkparse.LinkFinder(callback, tags,
+        prefetch=get_prefetch(url_data)))
+
+
+def analyze_html (url_data):
+    """Parse HTML content once for all data needed by the checker.
+    @return: the analysis with links, anchors, meta robots and title
+    @rtype: linkparse.HtmlAnalyzer
+    """
+    handler = linkparse.HtmlAnalyzer(prefetch=get_prefetch(url_data))
+    parse_content(url_data, handler)
+    return handler
+
+
+def stream_html (url_data, chunks):
+    """Parse HTML content chunks while they download.
+    @return: the analysis with links, anchors, meta robots and title
+    @rtype: linkparse.HtmlAnalyzer
+    """
+    handler = linkparse.HtmlAnalyzer(prefetch=get_prefetch(url_data))
+    parse_content(url_data, handler, chunks=chunks)
+    return handler
+
+
+def get_prefetch (url_data):
+    """Get the function resolving the hosts of found URLs in the
+    background, if enabled.
+    @rtype: function or None
+    """
+    aggregate = url_data.aggregate
+    if aggregate.config["dnsprefetch"]:
+        return aggregate.host_cache.prefetch
+    return None
+
+
+def parse_content (url_data, handler, chunks=None):
+    """Parse content of given URL with the given HTML parser handler.
+    @param chunks: iterable of content data chunks, default is the
+      whole content of the URL
+    """
+    if chunks is None:
+        chunks = [url_data.get_content()]
     # construct parser object
-    handler = linkparse.LinkFinder(callback, tags)
     parser = htmlsax.parser(handler)
     if url_data.charset:
         parser.encoding = url_data.charset
     handler.parser = parser
     # parse
     try:
-        parser.feed(url_data.get_content())
+        for data in chunks:
+            parser.feed(data)
         parser.flush()
     except linkparse.StopParse as msg:
         log.debug(LOG_CHECK, "Stopped parsing: %s", msg)
@@ -52,7 +52,28 @@ class _ConnectionPlugin(_PluginBase):
 
 class _ContentPlugin(_PluginBase):
     """Plugins run for valid URLs with content."""
-    pass
+
+    # set to True if the plugin only uses UrlBase.get_html_analysis()
+    # and not the content data, which is not kept when HTML content
+    # is parsed while it downloads
+    uses_html_analysis = False
+
+    def needs_content(self, url_data):
+        """Check before the URL is requested if the plugin might need
+        its content. If no plugin needs it, an HTTP HEAD request is
+        sufficient to check the URL. The content type is not known yet.
+        @rtype: bool
+        """
+        return True
+
+    def check_cached_result(self, url_data, result):
+        """Run the URL specific checks, eg. of the URL anchor, on the
+        cached result of another URL with the same cache key. The result
+        is a copy that can be changed.
+        @return: False if the URL must be checked again
+        @rtype: bool
+        """
+        return True
 
 
 class _ParserPlugin(_PluginBase):
@@ -113,6 +134,28 @@ class PluginManager(object):
         """Run all content plugins."""
         run_plugins(self.content_plugins, url_data)
 
+    def check_cached_result(self, url_data, result):
+        """Run URL specific checks of all content plugins on a cached
+        result of another URL with the same cache key.
+        @return: False if the URL must be checked again
+        @rtype: bool
+        """
+        return all(plugin.check_cached_result(url_data, result)
+                   for plugin in self.content_plugins)
+
+    def content_plugins_need_content(self, url_data):
+        """Check before the URL is requested if a content plugin might
+        need its content."""
+        return any(plugin.needs_content(url_data)
+                   for plugin in self.content_plugins)
+
+    def content_plugins_need_data(self, url_data):
+        """Check if a content plugin for the given URL needs the
+        content data."""
+        return any(plugin.applies_to(url_data)
+                   for plugin in self.content_plugins
+                   if not plugin.uses_html_analysis)
+
     def run_parser_plugins(self, url_data, pagetype):
         """Run parser plugins for given pagetype."""
         run_plugins(self.parser_plugins, url_data, stop_after_match=True, pagetype=pagetype)
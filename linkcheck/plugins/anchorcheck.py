@@ -18,44 +18,132 @@
 Check HTML anchors
 """
 from . import _ContentPlugin
-from .. import log, LOG_PLUGIN, url as urlutil
-from ..htmlutil import linkparse
-from ..parser import find_links
+from .. import log, LOG_PLUGIN, url as urlutil, LinkCheckerError
+from ..cache import results
+from ..checker.const import WARN_URL_ANCHOR_NOT_FOUND
+
+# configuration option names
+anchorcachesize = "anchorcachesize"
+
+# default number of indexed documents
+DefaultAnchorCacheSize = 1000
 
 
 class AnchorCheck(_ContentPlugin):
-    """Checks validity of HTML anchors."""
+    """Checks validity of HTML anchors.
+    The anchors of each checked document are stored in an index, so
+    URLs with different anchors of the same document need only one
+    parse and one lookup per anchor. Since these URLs share one cached
+    check result, the anchors of all URLs but the checked one are
+    checked with the index of the cached document.
+    The maximum number of indexed documents can be configured with the
+    anchorcachesize option. The least recently used index is removed
+    when the limit is reached."""
+
+    uses_html_analysis = True
+
+    def __init__(self, config):
+        """Initialize the anchor index cache. One shard keeps the
+        number of indexes exactly within the configured limit."""
+        super(AnchorCheck, self).__init__(config)
+        self.anchor_indexes = results.ResultCache(
+            max_size=config.get(anchorcachesize, DefaultAnchorCacheSize),
+            num_shards=1)
 
     def applies_to(self, url_data):
-        """Check for HTML anchor existence."""
-        return url_data.is_html() and url_data.anchor
+        """Check for HTML anchor existence. Documents parsed for
+        recursion are indexed for the URLs with anchors that use
+        their cached result."""
+        return url_data.is_html() and \
+            (url_data.anchor or url_data.allows_recursion())
+
+    def needs_content(self, url_data):
+        """Only URLs with anchors need the content."""
+        return bool(url_data.anchor)
 
     def check(self, url_data):
         """Check content for invalid anchors."""
         log.debug(LOG_PLUGIN, "checking content for invalid anchors")
-        # list of parsed anchors
-        self.anchors = []
-        find_links(url_data, self.add_anchor, linkparse.AnchorTags)
-        self.check_anchor(url_data)
+        index = self.get_anchor_index(url_data)
+        if url_data.anchor:
+            self.check_anchor(url_data, index)
+
+    def check_cached_result(self, url_data, result):
+        """Replace the anchor warning of the cached result with the
+        check of the anchor of the given URL.
+        @return: False if the cached document has not been indexed
+        @rtype: bool
+        """
+        if not result.valid:
+            return True
+        warning = None
+        if url_data.anchor:
+            index = self.anchor_indexes.get_result(result.cache_url)
+            if index is None:
+                return url_data.ContentMimetypes.get(result.content_type) != "html"
+            warning = self.get_anchor_warning(url_data.anchor, index)
+        result.warnings = [x for x in result.warnings
+                           if x[0] != WARN_URL_ANCHOR_NOT_FOUND]
+        if warning and WARN_URL_ANCHOR_NOT_FOUND not in \
+           url_data.aggregate.config["ignorewarnings"]:
+            result.warnings.append((WARN_URL_ANCHOR_NOT_FOUND, warning))
+        return True
 
-    def add_anchor (self, url, line, column, name, base):
-        """Add anchor URL."""
-        self.anchors.append((url, line, column, name, base))
+    def get_anchor_index(self, url_data):
+        """Get the anchors of the URL document, parsing the content if
+        the document has not been indexed yet.
+        @return: mapping {quoted anchor -> anchor}
+        @rtype: dict
+        """
+        key = url_data.cache_url
+        index = self.anchor_indexes.get_result(key)
+        if index is None:
+            enc = lambda anchor: urlutil.url_quote_part(anchor, encoding=url_data.encoding)
+            index = dict((enc(x[0]), x[0]) for x in
+                         url_data.get_html_analysis().anchors
+                         if x[0] is not None)
+            self.anchor_indexes.add_result(key, index)
+        return index
 
-    def check_anchor(self, url_data):
+    def check_anchor(self, url_data, index):
         """If URL is valid, parseable and has an anchor, check it.
-        A warning is logged and True is returned if the anchor is not found.
+        A warning is logged if the anchor is not found in the given
+        anchor index.
+        """
+        log.debug(LOG_PLUGIN, "checking anchor %r in %s", url_data.anchor, index.values())
+        warning = self.get_anchor_warning(url_data.anchor, index)
+        if warning:
+            url_data.add_warning(warning, tag=WARN_URL_ANCHOR_NOT_FOUND)
+
+    def get_anchor_warning(self, anchor, index):
+        """Get the warning message if the anchor is not in the index.
+        @return: warning message or None
         """
-        log.debug(LOG_PLUGIN, "checking anchor %r in %s", url_data.anchor, self.anchors)
-        enc = lambda anchor: urlutil.url_quote_part(anchor, encoding=url_data.encoding)
-        if any(x for x in self.anchors if enc(x[0]) == url_data.anchor):
-            return
-        if self.anchors:
-            anchornames = sorted(set(u"`%s'" % x[0] for x in self.anchors))
+        if anchor in index:
+            return None
+        if index:
+            anchornames = sorted(set(u"`%s'" % x for x in index.values()))
             anchors = u", ".join(anchornames)
         else:
             anchors = u"-"
-        args = {"name": url_data.anchor, "anchors": anchors}
-        msg = u"%s %s" % (_("Anchor `%(name)s' not found.") % args,
-                          _("Available anchors: %(anchors)s.") % args)
-        url_data.add_warning(msg)
+        args = {"name": anchor, "anchors": anchors}
+        return u"%s %s" % (_("Anchor `%(name)s' not found.") % args,
+                           _("Available anchors: %(anchors)s.") % args)
+
+    @classmethod
+    def read_config(cls, configparser):
+        """Read configuration file options."""
+        config = dict()
+        section = cls.__name__
+        option = anchorcachesize
+        if configparser.has_option(section, option):
+            num = configparser.getint(section, option)
+            if num > 0:
+                config[option] = num
+            else:
+                msg = _("invalid value for %s: %d must not be less than %d") % (option, num, 1)
+                raise LinkCheckerError(msg)
+        else:
+            # set the default
+            config[option] = DefaultAnchorCacheSize
+        return config
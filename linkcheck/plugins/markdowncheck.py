@@ -92,6 +92,10 @@ class MarkdownCheck(_ContentPlugin):
         """Check for Markdown file."""
         return self.filename_re.search(url_data.base_url) is not None
 
+    def needs_content(self, url_data):
+        """Markdown files need the content."""
+        return self.applies_to(url_data)
+
     def check(self, url_data):
         """Extracts urls from the file."""
         content = url_data.get_content()
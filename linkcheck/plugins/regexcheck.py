@@ -49,6 +49,10 @@ class RegexCheck(_ContentPlugin):
         """Check for warningregex, extern flag and parseability."""
         return self.warningregex and not url_data.extern[0] and url_data.is_parseable()
 
+    def needs_content(self, url_data):
+        """Only intern URLs need the content."""
+        return bool(self.warningregex) and not url_data.extern[0]
+
     def check(self, url_data):
         """Check content."""
         log.debug(LOG_PLUGIN, "checking content for warning regex")
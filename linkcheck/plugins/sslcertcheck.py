@@ -48,14 +48,23 @@ class SslCertificateCheck(_ConnectionPlugin):
           not url_data.extern[0] and url_data.url_connection is not None
 
     @synchronized(_lock)
+    def add_checked_host(self, host):
+        """Mark host as checked.
+        @return: False if the host has been checked already
+        @rtype: bool
+        """
+        if host in self.checked_hosts:
+            return False
+        self.checked_hosts.add(host)
+        return True
+
     def check(self, url_data):
         """Run all SSL certificate checks that have not yet been done.
         OpenSSL already checked the SSL notBefore and notAfter dates.
         """
         host = url_data.urlparts[1]
-        if host in self.checked_hosts:
+        if not self.add_checked_host(host):
             return
-        self.checked_hosts.add(host)
         cert = url_data.ssl_cert
         config = url_data.aggregate.config
         if cert and 'notAfter' in cert:
@@ -57,6 +57,10 @@ class HtmlSyntaxCheck(_ContentPlugin):
         """Check for HTML and extern."""
         return url_data.is_html() and not url_data.extern[0]
 
+    def needs_content(self, url_data):
+        """Only intern URLs need the content."""
+        return not url_data.extern[0]
+
     def check(self, url_data):
         """Check HTML syntax of given URL."""
         self.timer.check_w3_time()
@@ -89,6 +93,10 @@ class CssSyntaxCheck(_ContentPlugin):
         """Check for CSS and extern."""
         return url_data.is_css() and not url_data.extern[0]
 
+    def needs_content(self, url_data):
+        """Only intern URLs need the content."""
+        return not url_data.extern[0]
+
     def check(self, url_data):
         """Check CSS syntax of given URL."""
         self.timer.check_w3_time()
@@ -40,6 +40,10 @@ class VirusCheck(_ContentPlugin):
         """Check for clamav and extern."""
         return self.clamav_conf and not url_data.extern[0]
 
+    def needs_content(self, url_data):
+        """Only intern URLs need the content."""
+        return bool(self.clamav_conf) and not url_data.extern[0]
+
     def check(self, url_data):
         """Try to ask GeoIP database for country info."""
         data = url_data.get_content()
@@ -28,7 +28,7 @@ except ImportError:
 import urllib
 import time
 import requests
-from . import log, LOG_CHECK, configuration
+from . import log, LOG_CHECK, configuration, httputil
 
 __all__ = ["RobotFileParser"]
 
@@ -38,9 +38,10 @@ class RobotFileParser (object):
     """This class provides a set of methods to read, parse and answer
     questions about a single robots.txt file."""
 
-    def __init__ (self, url='', session=None, proxies=None, auth=None):
-        """Initialize internal entry lists and store given url and
-        credentials."""
+    def __init__ (self, url='', session=None, proxies=None, auth=None,
+                  timeout=None):
+        """Initialize internal entry lists and store given url,
+        credentials and request timeout in seconds."""
         self.set_url(url)
         if session is None:
             self.session = requests.Session()
@@ -48,6 +49,7 @@ class RobotFileParser (object):
             self.session = session
         self.proxies = proxies
         self.auth = auth
+        self.timeout = timeout
         self._reset()
 
     def _reset (self):
@@ -59,6 +61,11 @@ class RobotFileParser (object):
         self.last_checked = 0
         # list of tuples (sitemap url, line number)
         self.sitemap_urls = []
+        # True if the robots.txt file could not be fetched
+        self.fetch_error = False
+        # seconds the fetched file may be cached according to the
+        # response headers, or None
+        self.max_age = None
 
     def mtime (self):
         """Returns the time the robots.txt file was last fetched.
@@ -94,9 +101,12 @@ class RobotFileParser (object):
             kwargs["auth"] = self.auth
         if self.proxies:
             kwargs["proxies"] = self.proxies
+        if self.timeout:
+            kwargs["timeout"] = self.timeout
         try:
             response = self.session.get(self.url, **kwargs)
             response.raise_for_status()
+            self.max_age = httputil.get_max_age(response.headers)
             content_type = response.headers.get('content-type')
             if content_type and content_type.lower().startswith('text/plain'):
                 self.parse(response.iter_lines())
@@ -109,12 +119,14 @@ class RobotFileParser (object):
                 log.debug(LOG_CHECK, "%r disallow all (code %d)", self.url, x.response.status_code)
             else:
                 self.allow_all = True
+                self.fetch_error = True
                 log.debug(LOG_CHECK, "%r allow all (HTTP error)", self.url)
         except requests.exceptions.Timeout:
             raise
         except requests.exceptions.RequestException:
             # no network or other failure
             self.allow_all = True
+            self.fetch_error = True
             log.debug(LOG_CHECK, "%r allow all (request error)", self.url)
 
     def _add_entry (self, entry):
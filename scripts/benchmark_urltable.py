@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Measure memory and time of checking a synthetic site with and without
+sharing the URL strings in the URL table of the aggregate.
+
+A local HTTP server generates the site. Each check runs in a new process
+with the checker threads, URL queue, result cache and loggers of a
+normal check run; the results are logged verbosely with the text logger
+and with the GML logger, both to /dev/null.
+
+The site cases are:
+- site: each page links to 20 navigation pages and 80 other pages,
+  so most links point to already checked URLs
+- unique: each page links to 10 other pages and 90 text files that
+  are linked nowhere else, so most URLs are unique
+
+Usage: $0 [number of pages of the site case] [number of pages of the unique case]
+"""
+import os
+import sys
+import time
+import resource
+import threading
+import multiprocessing
+import BaseHTTPServer
+import SocketServer
+sys.path.insert(0, ".")
+import linkcheck.configuration
+import linkcheck.director
+from linkcheck.checker import get_url_from
+
+LinksPerPage = 100
+
+
+class SiteHandler (BaseHTTPServer.BaseHTTPRequestHandler):
+    """Generate the pages of the synthetic site."""
+
+    # number of pages of the site
+    num_pages = 1
+    # link 10 pages and 90 unique text files instead of 20 navigation
+    # pages and 80 other pages
+    unique = False
+
+    def do_GET (self):
+        """Send page or text file."""
+        path = self.path.split("?", 1)[0]
+        if path.endswith(".html"):
+            page = int(path.rsplit("page", 1)[1][:-5])
+            self.send_content("text/html", self.get_page(page))
+        else:
+            self.send_content("text/plain", "")
+
+    def do_HEAD (self):
+        """Send headers of page or text file."""
+        self.do_GET()
+
+    def send_content (self, content_type, data):
+        """Send the given content data."""
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def get_page (self, page):
+        """Get the HTML of the given page."""
+        links = []
+        for i in xrange(LinksPerPage):
+            if self.unique:
+                if i >= 10:
+                    links.append(u"file%d-%d.txt" % (page, i))
+                    continue
+                target = (page * 10 + i + 1) % self.num_pages
+            elif i < 20:
+                target = i % self.num_pages
+            else:
+                target = (page * 7919 + i) % self.num_pages
+            links.append(u"page%d.html#top" % target)
+        html = [u"<html><head><title>Page %d</title></head><body>" % page]
+        html.extend(u'<a href="%s">link</a>' % link for link in links)
+        html.append(u"</body></html>")
+        return u"\n".join(html).encode("ascii")
+
+    def log_message (self, format, *args):
+        """Logging is disabled."""
+        pass
+
+
+class ThreadedHttpServer (SocketServer.ThreadingMixIn,
+                          BaseHTTPServer.HTTPServer):
+    """HTTP server answering each request in a new thread."""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class NoUrlTable (object):
+    """URL table that does not share any URL string."""
+
+    def intern (self, url):
+        """Return the given URL."""
+        return url
+
+    def __len__ (self):
+        """The table is always empty."""
+        return 0
+
+
+def check (port, use_table, queue):
+    """Check the site and report the memory usage and time."""
+    config = linkcheck.configuration.Configuration()
+    config["threads"] = 10
+    config["status"] = False
+    config["verbose"] = True
+    config["maxrequestspersecond"] = 100000
+    devnull = open(os.devnull, "w")
+    config["logger"] = config.logger_new("text", fd=devnull)
+    config["fileoutput"].append(config.logger_new("gml", fd=devnull))
+    config.sanitize()
+    aggregate = linkcheck.director.get_aggregate(config)
+    if not use_table:
+        aggregate.url_table = NoUrlTable()
+    # the start URL directory is the intern URL pattern
+    url = u"http://localhost:%d/site/page0.html" % port
+    aggregate.urlqueue.put(get_url_from(url, 0, aggregate))
+    start = time.time()
+    linkcheck.director.check_urls(aggregate)
+    duration = time.time() - start
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    num_links = config["logger"].stats.number
+    queue.put((num_links, len(aggregate.result_cache), maxrss, duration))
+
+
+def run_case (name, num_pages, unique):
+    """Serve one site case and check it with and without URL table."""
+    SiteHandler.num_pages = num_pages
+    SiteHandler.unique = unique
+    server = ThreadedHttpServer(("localhost", 0), SiteHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        for use_table in (False, True):
+            queue = multiprocessing.Queue()
+            process = multiprocessing.Process(target=check,
+                args=(server.server_port, use_table, queue))
+            process.start()
+            num_links, num_results, maxrss, duration = queue.get()
+            process.join()
+            print "%-7s %-13s %7d links %7d results  max. RSS %7.1f MB  %6.1f s" % (
+              name, "URL table" if use_table else "no URL table",
+              num_links, num_results, maxrss / 1024.0, duration)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main (args):
+    """Run the benchmark cases."""
+    site_pages = int(args[0]) if len(args) > 0 else 2000
+    unique_pages = int(args[1]) if len(args) > 1 else 200
+    run_case("site", site_pages, False)
+    run_case("unique", unique_pages, True)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
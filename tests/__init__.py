@@ -287,6 +287,33 @@ def get_file (filename=None):
     return unicode(directory)
 
 
+class UrlData (object):
+    """Check result stub for logger tests. Keyword arguments replace
+    the default attribute values."""
+
+    def __init__ (self, url, parent_url=u"", valid=True, **kwargs):
+        self.url = self.base_url = self.cache_url = url
+        self.parent_url = parent_url
+        self.base_ref = u""
+        self.name = url.rsplit(u"/", 1)[-1]
+        self.title = None
+        self.valid = valid
+        self.extern = None
+        self.result = u"200 OK" if valid else u"404 Not Found"
+        self.warnings = []
+        self.info = []
+        self.content_type = u"text/html"
+        self.size = -1
+        self.checktime = 0
+        self.dltime = -1
+        self.modified = None
+        self.level = 0
+        self.line = None
+        self.column = None
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+
 if __name__ == '__main__':
     print "has clamav", has_clamav()
     print "has network", has_network()
@@ -17,7 +17,8 @@
 """
 Test html anchor parsing and checking.
 """
-from . import LinkCheckTest
+from . import LinkCheckTest, get_test_aggregate, get_url_from
+from linkcheck.plugins.anchorcheck import AnchorCheck
 
 
 class TestAnchor (LinkCheckTest):
@@ -40,3 +41,32 @@ class TestAnchor (LinkCheckTest):
         ]
         self.direct(urlanchor, resultlines, confargs=confargs)
 
+    def test_anchor_index (self):
+        confargs = {"enabledplugins": ["AnchorCheck"]}
+        aggregate = get_test_aggregate(confargs, {'expected': []})
+        plugin = aggregate.plugin_manager.content_plugins[0]
+        url = u"file://%(curdir)s/%(datadir)s/anchor.html" % self.get_attrs()
+        url_data = get_url_from(url + u"#broken", 0, aggregate)
+        url_data.check()
+        url_data.check_content()
+        self.assertEqual(len(url_data.warnings), 1)
+        index = plugin.anchor_indexes.get_result(url_data.cache_url)
+        self.assertEqual(index, {"myid%3A": u"myid:"})
+        # other anchors of the document use the index without parsing
+        # the document again
+        url_data = get_url_from(url + u"#myid:", 0, aggregate)
+        url_data.check()
+        url_data.get_html_analysis = None
+        url_data.check_content()
+        self.assertEqual(url_data.warnings, [])
+
+    def test_anchor_cache_size (self):
+        plugin = AnchorCheck({"anchorcachesize": 3})
+        for i in range(20):
+            plugin.anchor_indexes.add_result(u"url%d" % i, {})
+        self.assertEqual(len(plugin.anchor_indexes), 3)
+
+    def test_anchor_links (self):
+        # URLs with other anchors of the same document share its result
+        confargs = {"enabledplugins": ["AnchorCheck"]}
+        self.file_test("anchor_links.html", confargs=confargs)
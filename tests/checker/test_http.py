@@ -35,6 +35,20 @@ class TestHttp (HttpServerTest):
         self.file_test("http.xhtml", confargs=confargs)
         self.file_test("http_file.html", confargs=confargs)
 
+    def test_html_stream (self):
+        confargs = dict(recursionlevel=1, streamparse=True)
+        self.file_test("http.xhtml", confargs=confargs)
+        self.file_test("http_file.html", confargs=confargs)
+        # links of pages with a robots meta nofollow tag are not queued
+        url = self.get_url(u"norobots.html")
+        resultlines = [
+            u"url %s" % url,
+            u"cache key %s" % url,
+            u"real url %s" % url,
+            u"valid",
+        ]
+        self.direct(url, resultlines, confargs=confargs)
+
     def test_status(self):
         for status in sorted(self.handler.responses.keys()):
             self._test_status(status)
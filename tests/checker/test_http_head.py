@@ -0,0 +1,103 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test http checking with HEAD requests.
+"""
+from .httpserver import HttpServerTest, NoQueryHttpRequestHandler
+
+
+class MethodHttpRequestHandler (NoQueryHttpRequestHandler):
+    """Handler recording the request methods of the test data files."""
+
+    methods = []
+
+    def do_GET (self):
+        """Record GET request."""
+        if "/data/" in self.path:
+            self.methods.append("GET")
+        super(MethodHttpRequestHandler, self).do_GET()
+
+    def do_HEAD (self):
+        """Record HEAD request."""
+        if "/data/" in self.path:
+            self.methods.append("HEAD")
+        super(MethodHttpRequestHandler, self).do_HEAD()
+
+
+class HeadErrorHttpRequestHandler (MethodHttpRequestHandler):
+    """Handler not supporting HEAD requests."""
+
+    methods = []
+
+    def do_HEAD (self):
+        """Send 405 Method Not Allowed."""
+        if "/data/" in self.path:
+            self.methods.append("HEAD")
+        self.send_error(405)
+
+
+class TestHttpHead (HttpServerTest):
+    """Test http:// link checking with HEAD requests."""
+
+    def __init__ (self, methodName='runTest'):
+        super(TestHttpHead, self).__init__(methodName=methodName)
+        self.handler = MethodHttpRequestHandler
+
+    def test_head (self):
+        url = self.get_url(u"http.html")
+        resultlines = [
+            u"url %s" % url,
+            u"cache key %s" % url,
+            u"real url %s" % url,
+            u"valid",
+        ]
+        confargs = dict(headrequests=True)
+        self.direct(url, resultlines, confargs=confargs)
+        self.assertEqual(self.handler.methods, ["HEAD"])
+        # URLs with anchors need the content
+        del self.handler.methods[:]
+        confargs = dict(headrequests=True, enabledplugins=["AnchorCheck"])
+        url = self.get_url(u"anchor.html#myid:")
+        nurl = self.get_url(u"anchor.html")
+        resultlines = [
+            u"url %s" % url,
+            u"cache key %s" % nurl,
+            u"real url %s#myid%%3A" % nurl,
+            u"valid",
+        ]
+        self.direct(url, resultlines, confargs=confargs)
+        self.assertEqual(self.handler.methods, ["GET"])
+
+
+class TestHttpHeadError (HttpServerTest):
+    """Test http:// link checking with servers not supporting HEAD."""
+
+    def __init__ (self, methodName='runTest'):
+        super(TestHttpHeadError, self).__init__(methodName=methodName)
+        self.handler = HeadErrorHttpRequestHandler
+
+    def test_head_error (self):
+        url = self.get_url(u"http.html")
+        resultlines = [
+            u"url %s" % url,
+            u"cache key %s" % url,
+            u"real url %s" % url,
+            u"valid",
+        ]
+        confargs = dict(headrequests=True)
+        self.direct(url, resultlines, confargs=confargs)
+        self.assertEqual(self.handler.methods, ["HEAD", "GET"])
@@ -0,0 +1,96 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test parsing HTML of http URLs while it downloads.
+"""
+import os
+import linkcheck.director
+from . import get_test_aggregate, get_url_from
+from .httpserver import HttpServerTest, NoQueryHttpRequestHandler
+
+
+class ChunkedHttpRequestHandler (NoQueryHttpRequestHandler):
+    """Handler sending the test data files with chunked transfer
+    encoding and without Content-Length header."""
+
+    # size of the sent chunks in bytes
+    ChunkSize = 100
+
+    def do_GET (self):
+        """Send test data file in chunks."""
+        if "/data/" not in self.path:
+            return super(ChunkedHttpRequestHandler, self).do_GET()
+        self.remove_path_query()
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return self.send_error(404)
+        with open(path, "rb") as fd:
+            data = fd.read()
+        self.protocol_version = "HTTP/1.1"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i in range(0, len(data), self.ChunkSize):
+            chunk = data[i:i + self.ChunkSize]
+            self.wfile.write("%x\r\n%s\r\n" % (len(chunk), chunk))
+        self.wfile.write("0\r\n\r\n")
+        self.close_connection = 1
+
+
+class TestHttpStream (HttpServerTest):
+    """Test parsing HTML of http URLs while it downloads."""
+
+    def __init__ (self, methodName='runTest'):
+        super(TestHttpStream, self).__init__(methodName=methodName)
+        self.handler = ChunkedHttpRequestHandler
+
+    def test_chunked (self):
+        confargs = dict(recursionlevel=1, streamparse=True)
+        self.file_test("http_stream.html", confargs=confargs)
+
+    def test_chunked_too_large (self):
+        # the links of content larger than maxfilesizeparse are not
+        # checked, even if they have been parsed before the limit
+        url = self.get_url(u"http_stream.html")
+        resultlines = [
+            u"url %s" % url,
+            u"cache key %s" % url,
+            u"real url %s" % url,
+            u"valid",
+        ]
+        confargs = dict(recursionlevel=1, streamparse=True,
+                        maxfilesizeparse=150)
+        aggregate = get_test_aggregate(confargs, {'expected': resultlines})
+        url_data = get_url_from(url, 0, aggregate, extern=(0, 0))
+        aggregate.urlqueue.put(url_data)
+        linkcheck.director.check_urls(aggregate)
+        self.assertEqual(aggregate.config['logger'].diff, [])
+
+    def test_chunked_parse_limit (self):
+        # the first chunk crosses maxfilesizeparse in the middle of the
+        # link tag, so the link is not parsed
+        url = self.get_url(u"http_stream.html")
+        confargs = dict(streamparse=True, maxfilesizeparse=60)
+        aggregate = get_test_aggregate(confargs, {'expected': []})
+        url_data = get_url_from(url, 0, aggregate, extern=(0, 0))
+        aggregate.urlqueue.put(url_data)
+        linkcheck.director.check_urls(aggregate)
+        self.assertEqual(url_data.size, 445)
+        self.assertEqual(url_data.html_analysis.title, u"stream")
+        self.assertEqual(url_data.html_analysis.links, [])
@@ -0,0 +1,226 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test checking with worker processes.
+"""
+import os
+import pickle
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import linkcheck.configuration
+import linkcheck.director
+from linkcheck.cache import urlqueue
+from linkcheck.director import processes, broker
+from linkcheck.director.interrupt import Interrupt
+from tests import need_posix
+from . import LinkCheckTest, get_test_aggregate, get_url_from
+from .httpserver import HttpServerTest, NoQueryHttpRequestHandler
+
+# set when the slow HTTP requests may finish
+request_finished = threading.Event()
+
+
+class SlowHttpRequestHandler (NoQueryHttpRequestHandler):
+    """Handler answering requests of slow.html only when the test
+    allows it."""
+
+    def do_GET (self):
+        """Wait before answering requests of slow.html."""
+        if self.path.endswith("/slow.html"):
+            request_finished.wait(60)
+            try:
+                self.send_response(404)
+                self.end_headers()
+            except socket.error:
+                # the worker process has been terminated
+                pass
+        else:
+            super(SlowHttpRequestHandler, self).do_GET()
+
+    def do_HEAD (self):
+        """Wait before answering requests of slow.html."""
+        self.do_GET()
+
+
+def check_worker (address):
+    """Check URLs for the coordinator at given address when it is
+    listening."""
+    config = linkcheck.configuration.Configuration()
+    config["worker"] = address
+    config["brokerkey"] = "secret"
+    config["threads"] = 1
+    for dummy in range(50):
+        try:
+            processes.check_worker(config)
+            break
+        except socket.error:
+            time.sleep(0.1)
+
+
+class TestProcesses (LinkCheckTest):
+    """
+    Test checking with several worker processes.
+    """
+
+    def test_partition (self):
+        for host in (u"", u"example.com", u"\xe4.example.com"):
+            partition = processes.get_partition(host, 3)
+            self.assertTrue(0 <= partition < 3)
+            self.assertEqual(partition, processes.get_partition(host, 3))
+
+    def test_pickle_ref (self):
+        aggregate = get_test_aggregate({}, {'expected': []})
+        url_data = get_url_from(u"http://example.com/", 1, aggregate,
+            parent_url=u"http://example.org/", line=2, name=u"name")
+        ref = pickle.loads(pickle.dumps(urlqueue.UrlRef(url_data), 2))
+        self.assertEqual(ref.aggregate, None)
+        self.assertEqual(ref.host, u"example.com")
+        ref.aggregate = aggregate
+        url_data = ref.get_url_data()
+        self.assertEqual(url_data.url, u"http://example.com/")
+        self.assertEqual(url_data.parent_url, u"http://example.org/")
+        self.assertEqual(url_data.line, 2)
+
+    @need_posix
+    def test_file (self):
+        # one thread per process keeps the order of the results
+        confargs = {"processes": 2, "threads": 1}
+        self.file_test("file.html", confargs=confargs)
+
+    def test_socket_address (self):
+        self.assertEqual(broker.get_socket_address("/tmp/lc.sock"),
+                         (socket.AF_UNIX, "/tmp/lc.sock"))
+        self.assertEqual(broker.get_socket_address("localhost:8080"),
+                         (socket.AF_INET, ("localhost", 8080)))
+        self.assertEqual(broker.get_socket_address(":8080"),
+                         (socket.AF_INET, ("localhost", 8080)))
+        self.assertEqual(broker.get_socket_address("8080"),
+                         (socket.AF_INET, ("localhost", 8080)))
+        self.assertRaises(linkcheck.LinkCheckerError,
+                          broker.get_socket_address, "localhost")
+
+    def test_queue_broker (self):
+        filename = "file.html"
+        logargs = {'expected': self.get_resultlines(filename)}
+        aggregate = get_test_aggregate({"threads": 1}, logargs)
+        url_data = get_url_from(self.get_url(filename), 0, aggregate,
+                                extern=(0, 0))
+        aggregate.urlqueue.put(url_data)
+        queue_broker = broker.QueueBroker(1)
+        worker = threading.Thread(target=processes.check_partition,
+            args=(aggregate.config, None, 0, 1, queue_broker))
+        worker.start()
+        aggregate.logger.start_log_output()
+        processes.coordinate(aggregate, queue_broker, lambda: True)
+        worker.join()
+        aggregate.end_log_output()
+        self.assertEqual(aggregate.config['logger'].diff, [])
+        self.assertEqual(len(aggregate.process_stats), 1)
+
+    @need_posix
+    def test_socket_broker (self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            address = os.path.join(tmpdir, "coordinator.sock")
+            worker = threading.Thread(target=check_worker, args=(address,))
+            worker.start()
+            confargs = {"coordinator": address, "processes": 1, "threads": 1,
+                        "brokerkey": "secret"}
+            self.file_test("file.html", confargs=confargs)
+            worker.join()
+            self.assertFalse(os.path.exists(address))
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_authenticate (self):
+        for key, valid in (("secret", True), ("wrong", False)):
+            sock1, sock2 = socket.socketpair()
+            # other tests may have set a default timeout
+            sock1.setblocking(1)
+            sock2.setblocking(1)
+            coordinator = (sock1.makefile("rb"), sock1.makefile("wb"))
+            errors = []
+            def authenticate_coordinator ():
+                try:
+                    broker.authenticate(coordinator[0], coordinator[1],
+                                        "secret", "coordinator", "worker")
+                except broker.AuthenticationError as msg:
+                    errors.append(msg)
+            thread = threading.Thread(target=authenticate_coordinator)
+            thread.start()
+            args = (sock2.makefile("rb"), sock2.makefile("wb"), key,
+                    "worker", "coordinator")
+            if valid:
+                broker.authenticate(*args)
+            else:
+                self.assertRaises(broker.AuthenticationError,
+                                  broker.authenticate, *args)
+            thread.join()
+            self.assertEqual(len(errors), 0 if valid else 1)
+            sock1.close()
+            sock2.close()
+
+    @need_posix
+    def test_socket_broker_wrong_key (self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            address = os.path.join(tmpdir, "coordinator.sock")
+            socket_broker = broker.SocketBroker(address, 1, {}, "secret")
+            try:
+                self.assertRaises(broker.AuthenticationError,
+                                  broker.SocketBrokerClient, address, "wrong")
+                self.assertEqual(socket_broker.num_workers, 0)
+            finally:
+                socket_broker.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+
+class TestProcessesMaxRunSeconds (HttpServerTest):
+    """
+    Test stopping the worker processes after maxrunseconds.
+    """
+
+    def __init__ (self, methodName='runTest'):
+        super(TestProcessesMaxRunSeconds, self).__init__(methodName=methodName)
+        self.handler = SlowHttpRequestHandler
+
+    def tearDown (self):
+        request_finished.set()
+        super(TestProcessesMaxRunSeconds, self).tearDown()
+        request_finished.clear()
+
+    @need_posix
+    def test_maxrunseconds (self):
+        confargs = {"processes": 2, "threads": 1, "maxrunseconds": 1}
+        aggregate = get_test_aggregate(confargs, {'expected': []})
+        url_data = get_url_from(self.get_url("slow.html"), 0, aggregate,
+                                extern=(0, 0))
+        aggregate.urlqueue.put(url_data)
+        wait_seconds = Interrupt.WaitSeconds
+        Interrupt.WaitSeconds = 0.1
+        try:
+            start = time.time()
+            linkcheck.director.check_urls(aggregate)
+            duration = time.time() - start
+        finally:
+            Interrupt.WaitSeconds = wait_seconds
+        # the request of the worker takes 60 seconds
+        self.assertTrue(duration < 30, duration)
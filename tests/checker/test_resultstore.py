@@ -0,0 +1,137 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test checking with stored results.
+"""
+import os
+import time
+import sqlite3
+import tempfile
+from linkcheck.cache import store
+from linkcheck.checker.urlbase import CompactUrlData, urlDataAttr
+from tests import need_posix
+from . import LinkCheckTest
+
+
+def get_result (url):
+    """Get a result object for given URL."""
+    attrs = dict((attr, None) for attr in urlDataAttr)
+    attrs["url"] = url
+    attrs["valid"] = True
+    return CompactUrlData(attrs)
+
+
+class TestResultStore (LinkCheckTest):
+    """
+    Test the persistent result store.
+    """
+
+    def setUp (self):
+        super(TestResultStore, self).setUp()
+        fd, self.filename = tempfile.mkstemp(suffix=".sqlite")
+        os.close(fd)
+
+    def tearDown (self):
+        os.remove(self.filename)
+
+    def test_store (self):
+        result_store = store.ResultStore(self.filename, 60)
+        self.assertEqual(result_store.get_result(u"a"), None)
+        links = [(u"b", 1, 2, 0, u"name", None)]
+        result_store.add_result(u"a", get_result(u"a"), links, etag=u'"x"')
+        result_store.close()
+        result_store = store.ResultStore(self.filename, 60)
+        stored = result_store.get_result(u"a")
+        self.assertTrue(stored.is_fresh())
+        self.assertEqual(stored.result.url, u"a")
+        self.assertEqual(stored.links, links)
+        self.assertEqual(stored.etag, u'"x"')
+        self.assertEqual(stored.last_modified, None)
+        self.assertEqual(len(result_store), 1)
+        result_store.close()
+
+    def test_expire (self):
+        result_store = store.ResultStore(self.filename, 0)
+        result_store.add_result(u"a", get_result(u"a"), [])
+        result_store.add_result(u"b", get_result(u"b"), [],
+                                last_modified=u"Tue, 15 Nov 1994 12:45:26 GMT")
+        time.sleep(0.01)
+        self.assertFalse(result_store.get_result(u"a").is_fresh())
+        result_store.close()
+        # expired results without validators are removed
+        result_store = store.ResultStore(self.filename, 60)
+        self.assertEqual(result_store.get_result(u"a"), None)
+        self.assertFalse(result_store.get_result(u"b").is_fresh())
+        result_store.refresh_result(u"b")
+        self.assertTrue(result_store.get_result(u"b").is_fresh())
+        result_store.close()
+
+    def test_shared (self):
+        timeout = store.SharedTimeout
+        store.SharedTimeout = 0.1
+        try:
+            result_store = store.ResultStore(self.filename, 60, shared=True)
+        finally:
+            store.SharedTimeout = timeout
+        # other processes see each stored result
+        result_store.add_result(u"a", get_result(u"a"), [])
+        self.assertEqual(len(self.get_expires()), 1)
+        conn = sqlite3.connect(self.filename)
+        try:
+            conn.execute("begin exclusive")
+            # the lock timeout only loses the result
+            result_store.add_result(u"b", get_result(u"b"), [])
+            self.assertEqual(result_store.get_result(u"a"), None)
+            conn.rollback()
+        finally:
+            conn.close()
+        self.assertEqual(result_store.get_result(u"b"), None)
+        result_store.add_result(u"c", get_result(u"c"), [])
+        self.assertEqual(sorted(self.get_expires()), [u"a", u"c"])
+        result_store.close()
+
+    def get_expires (self):
+        """Get expiration times of the stored results."""
+        conn = sqlite3.connect(self.filename)
+        try:
+            return dict(conn.execute("select key, expires from results"))
+        finally:
+            conn.close()
+
+    def test_file (self):
+        confargs = {"resultcachefile": self.filename}
+        self.file_test("file.html", confargs=confargs.copy())
+        expires = self.get_expires()
+        self.assertTrue(len(expires) > 0)
+        time.sleep(0.01)
+        # the second check uses the stored results and their links
+        self.file_test("file.html", confargs=confargs.copy())
+        # rechecked results would have been stored with a new
+        # expiration time
+        self.assertEqual(self.get_expires(), expires)
+
+    @need_posix
+    def test_processes (self):
+        # the worker processes share the result store
+        confargs = {"resultcachefile": self.filename, "processes": 2,
+                    "threads": 1}
+        self.file_test("file.html", confargs=confargs.copy())
+        expires = self.get_expires()
+        self.assertTrue(len(expires) > 0)
+        time.sleep(0.01)
+        self.file_test("file.html", confargs=confargs.copy())
+        self.assertEqual(self.get_expires(), expires)
@@ -43,19 +43,35 @@ class TestConfig (unittest.TestCase):
         for scheme in ("http", "https", "ftp"):
             self.assertTrue(scheme in config["allowedschemes"])
         self.assertEqual(config["threads"], 5)
+        self.assertEqual(config["processes"], 2)
         self.assertEqual(config["timeout"], 42)
         self.assertEqual(config["aborttimeout"], 99)
         self.assertEqual(config["recursionlevel"], 1)
         self.assertEqual(config["nntpserver"], "example.org")
+        self.assertEqual(config["brokerkey"], "secret")
         self.assertEqual(config["cookiefile"], "blablabla")
         self.assertEqual(config["useragent"], "Example/0.0")
         self.assertEqual(config["debugmemory"], 1)
         self.assertEqual(config["localwebroot"], "foo")
         self.assertEqual(config["sslverify"], "/path/to/cacerts.crt")
         self.assertEqual(config["maxnumurls"], 1000)
+        self.assertEqual(config["maxconnectionsperhost"], 3)
+        self.assertEqual(config["maxconnections"], 30)
+        self.assertEqual(config["connectionidletimeout"], 5)
+        self.assertEqual(config["dnscachettl"], 100)
+        self.assertEqual(config["dnscachenegativettl"], 10)
+        self.assertTrue(config["dnsprefetch"])
+        self.assertEqual(config["robotscachesize"], 50)
+        self.assertEqual(config["robotscachettl"], 600)
+        self.assertEqual(config["robotscachenegativettl"], 30)
+        self.assertFalse(config["robotsprefetch"])
+        self.assertEqual(config["resultcachesize"], 1234)
+        self.assertEqual(config["resultcachebytes"], 5678)
         self.assertEqual(config["maxrunseconds"], 1)
         self.assertEqual(config["maxfilesizeparse"], 100)
         self.assertEqual(config["maxfilesizedownload"], 100)
+        self.assertTrue(config["streamparse"])
+        self.assertTrue(config["headrequests"])
         # filtering section
         patterns = [x["pattern"].pattern for x in config["externlinks"]]
         for prefix in ("ignore_", "nofollow_"):
@@ -86,9 +102,11 @@ class TestConfig (unittest.TestCase):
         self.assertTrue(config["warnings"])
         self.assertFalse(config["quiet"])
         self.assertEqual(len(config["fileoutput"]), 8)
+        self.assertEqual(config["logqueuesize"], 10)
         # plugins
         for plugin in ("AnchorCheck", "CssSyntaxCheck", "HtmlSyntaxCheck", "LocationInfo", "RegexCheck", "SslCertificateCheck", "VirusCheck", "HttpHeaderInfo"):
             self.assertTrue(plugin in config["enabledplugins"])
+        self.assertEqual(config["AnchorCheck"]["anchorcachesize"], 10)
         # text logger section
         self.assertEqual(config["text"]["filename"], "imadoofus.txt")
         self.assertEqual(config["text"]["parts"], ["realurl"])
@@ -108,6 +126,7 @@ class TestConfig (unittest.TestCase):
         self.assertEqual(config["gml"]["filename"], "imadoofus.gml")
         self.assertEqual(config["gml"]["parts"], ["realurl"])
         self.assertEqual(config["gml"]["encoding"], "utf-8")
+        self.assertEqual(config["gml"]["maxnodes"], "1000")
         # dot logger section
         self.assertEqual(config["dot"]["filename"], "imadoofus.dot")
         self.assertEqual(config["dot"]["parts"], ["realurl"])
@@ -124,6 +143,13 @@ class TestConfig (unittest.TestCase):
         self.assertEqual(config["sql"]["encoding"], "utf-8")
         self.assertEqual(config["sql"]["separator"], ";")
         self.assertEqual(config["sql"]["dbname"], "linksdb")
+        # sqlite logger section
+        self.assertEqual(config["sqlite"]["filename"], "imadoofus.sqlite")
+        self.assertEqual(config["sqlite"]["dbname"], "links")
+        self.assertEqual(config["sqlite"]["wal"], "1")
+        # column logger section
+        self.assertEqual(config["column"]["filename"], "imadoofus.column")
+        self.assertEqual(config["column"]["chunksize"], "100")
         # html logger section
         self.assertEqual(config["html"]["filename"], "imadoofus.html")
         self.assertEqual(config["html"]["parts"], ["realurl"])
@@ -156,3 +182,17 @@ class TestConfig (unittest.TestCase):
         config = linkcheck.configuration.Configuration()
         files = [get_file("config2.ini")]
         self.assertRaises(linkcheck.LinkCheckerError, config.read, files)
+
+    def test_engine_fallback (self):
+        # the standard library is not patched in the test process
+        config = linkcheck.configuration.Configuration()
+        config["engine"] = "events"
+        config.sanitize_engine()
+        self.assertEqual(config["engine"], "threads")
+
+    def test_processes_fallback (self):
+        config = linkcheck.configuration.Configuration()
+        config["processes"] = 2
+        config["threads"] = 0
+        config.sanitize_processes()
+        self.assertEqual(config["processes"], 1)
@@ -0,0 +1,63 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+import os
+from linkcheck.logger.blacklist import BlacklistLogger
+from .. import UrlData
+
+
+def get_url_data (url, valid):
+    """Get check result of a link on the same page."""
+    return UrlData(url, u"http://example.org/", valid)
+
+
+class TestBlacklistLogger (unittest.TestCase):
+
+    def setUp (self):
+        self.filename = os.path.join(os.path.dirname(__file__), "blacklist")
+
+    def tearDown (self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def log_urls (self, urls):
+        logger = BlacklistLogger(filename=self.filename, fileoutput=1)
+        logger.start_output()
+        for url_data in urls:
+            logger.log_filter_url(url_data, True)
+        logger.end_output()
+        return logger
+
+    def test_update (self):
+        url = u"http://example.org/a"
+        self.log_urls([get_url_data(url, False),
+                       get_url_data(u"http://example.org/b", False)])
+        # the written blacklist is read by the next run
+        logger = self.log_urls([get_url_data(url, False),
+                                get_url_data(u"http://example.org/b", True)])
+        self.assertEqual(logger.blacklist,
+                         {(u"http://example.org/", url): 2})
+
+    def test_old_keys (self):
+        with open(self.filename, "w") as fd:
+            fd.write("# comment\n")
+            fd.write("""1 "(u'http://example.org/', u'http://example.org/a')"\n""")
+            fd.write("1 (invalid\n")
+        logger = BlacklistLogger(filename=self.filename, fileoutput=1)
+        self.assertEqual(logger.blacklist,
+            {(u"http://example.org/", u"http://example.org/a"): 1})
@@ -0,0 +1,88 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+import os
+import datetime
+from linkcheck.logger.columnlog import ColumnLogger, ColumnReader
+from .. import UrlData
+
+
+# check result attributes that differ from the stub defaults
+Attrs = dict(name=u"n\xe4me", info=[u"a", u"b"], checktime=0.5, dltime=0.25,
+             modified=datetime.datetime(2014, 1, 2, 3, 4, 5, 500000),
+             level=1, line=3)
+
+
+class TestColumnLogger (unittest.TestCase):
+
+    def setUp (self):
+        self.filename = os.path.join(os.path.dirname(__file__),
+                                     "testlog.column")
+
+    def tearDown (self):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def log_urls (self, urls, chunksize):
+        logger = ColumnLogger(filename=self.filename, fileoutput=1,
+                              chunksize=chunksize)
+        logger.start_output()
+        for url_data in urls:
+            logger.log_filter_url(url_data, True)
+        logger.end_output()
+        return logger
+
+    def test_values (self):
+        self.log_urls([UrlData(u"http://example.org/", size=100, **Attrs)],
+                      "10")
+        reader = ColumnReader(self.filename)
+        try:
+            rows = list(reader.rows())
+        finally:
+            reader.close()
+        self.assertEqual(rows, [dict(url=u"http://example.org/",
+            parent_url=u"", base_ref=u"", name=u"n\xe4me", result=u"200 OK",
+            warning=u"", info=u"a\nb", content_type=u"text/html", valid=1,
+            extern=0, size=100.0, checktime=0.5, dltime=0.25,
+            modified=1388631845.5, level=1, line=3, column=-1)])
+
+    def test_chunks (self):
+        urls = [UrlData(u"http://example.org/%d" % (i % 5),
+                        parent_url=u"http://example.org/",
+                        valid=bool(i % 2), size=i, **Attrs)
+                for i in range(25)]
+        logger = self.log_urls(urls, "10")
+        # the strings are stored once
+        self.assertEqual(len(logger.strings), 12)
+        reader = ColumnReader(self.filename)
+        try:
+            self.assertEqual(len(reader.chunks), 3)
+            self.assertEqual(len(reader), 25)
+            self.assertEqual(reader.num_strings, 12)
+            rows = list(reader.rows(columns=["url", "size", "valid"],
+                                    where=lambda row: not row["valid"]))
+        finally:
+            reader.close()
+        self.assertEqual([row["size"] for row in rows], range(0, 25, 2))
+        self.assertEqual(rows[-1], dict(url=u"http://example.org/4",
+                                        size=24.0, valid=0))
+
+    def test_invalid (self):
+        with open(self.filename, "wb") as fd:
+            fd.write("no column file")
+        self.assertRaises(ValueError, ColumnReader, self.filename)
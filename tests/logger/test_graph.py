@@ -0,0 +1,73 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+import os
+from StringIO import StringIO
+from linkcheck.logger.gml import GMLLogger
+from linkcheck.logger.graph import NodeIds
+from .. import UrlData
+
+
+class TestGraphLogger (unittest.TestCase):
+
+    def log_urls (self, urls):
+        fd = StringIO()
+        logger = GMLLogger(fd=fd, parts=["realurl"])
+        logger.start_output()
+        for url_data in urls:
+            logger.log_filter_url(url_data, False)
+            # nodes are written while they are logged
+            self.assertTrue(url_data.url in fd.getvalue() or
+                            not url_data.valid)
+        logger.end_output()
+        return fd.getvalue()
+
+    def get_edges (self, output):
+        """Get (source, target) tuples of the edges in GML output."""
+        lines = [line.split() for line in output.splitlines()]
+        sources = [int(x[1]) for x in lines if x and x[0] == "source"]
+        targets = [int(x[1]) for x in lines if x and x[0] == "target"]
+        return zip(sources, targets)
+
+    def test_edges (self):
+        output = self.log_urls([
+            UrlData(u"http://example.org/"),
+            UrlData(u"http://example.org/a", u"http://example.org/"),
+            # the child is logged before its parent
+            UrlData(u"http://example.org/c", u"http://example.org/b#x"),
+            UrlData(u"http://example.org/b", u"http://example.org/"),
+            # invalid URLs have no node
+            UrlData(u"http://example.org/d", u"http://example.org/a",
+                    valid=False),
+            # the parent has not been logged
+            UrlData(u"http://example.org/e", u"http://example.org/f"),
+        ])
+        self.assertEqual(self.get_edges(output), [(0, 1), (0, 3), (3, 2)])
+
+    def test_node_ids (self):
+        nodes = NodeIds(max_size=2)
+        for i in range(5):
+            nodes.add(u"http://example.org/%d" % i, i)
+        self.assertTrue(nodes.filename is not None)
+        self.assertTrue(len(nodes.ids) <= 2)
+        for i in range(5):
+            self.assertEqual(nodes.get(u"http://example.org/%d" % i), i)
+        self.assertFalse(u"http://example.org/5" in nodes)
+        filename = nodes.filename
+        nodes.close()
+        self.assertFalse(os.path.exists(filename))
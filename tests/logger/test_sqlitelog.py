@@ -0,0 +1,80 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+import unittest
+import os
+import sqlite3
+from linkcheck.logger import sqlitelog
+from linkcheck.logger.sqlitelog import SQLiteLogger
+from .. import UrlData
+
+
+# check result attributes that differ from the stub defaults
+Attrs = dict(warnings=[(u"tag", u"warning")], line=1, column=2, size=100)
+
+
+class TestSqliteLogger (unittest.TestCase):
+
+    def setUp (self):
+        self.filename = os.path.join(os.path.dirname(__file__),
+                                     "testlog.sqlite")
+
+    def tearDown (self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.filename + suffix):
+                os.remove(self.filename + suffix)
+
+    def log_urls (self, urls, **kwargs):
+        logger = SQLiteLogger(filename=self.filename, fileoutput=1, **kwargs)
+        logger.start_output()
+        for url_data in urls:
+            logger.log_filter_url(url_data, True)
+        logger.end_output()
+        return sqlite3.connect(self.filename)
+
+    def test_rows (self):
+        urls = [UrlData(u"http://example.org/", None, **Attrs),
+                UrlData(u"http://example.org/x", u"http://example.org/",
+                        valid=False, **Attrs)]
+        conn = self.log_urls(urls)
+        rows = conn.execute("select urlname, parentname, valid, warning, "
+                            "line, col, size from linksdb").fetchall()
+        self.assertEqual(rows, [
+            (u"http://example.org/", None, 1, u"warning", 1, 2, 100),
+            (u"http://example.org/x", u"http://example.org/", 0,
+             u"warning", 1, 2, 100),
+        ])
+        indexes = conn.execute("select name from sqlite_master "
+                               "where type='index' order by name").fetchall()
+        self.assertEqual(indexes, [(u"linksdb_parentname",),
+                                   (u"linksdb_urlname",)])
+        conn.close()
+
+    def test_batches (self):
+        num = sqlitelog.BatchSize * 2 + 1
+        urls = [UrlData(u"http://example.org/%d" % i, None, **Attrs) for i in range(num)]
+        conn = self.log_urls(urls, dbname=u"links", wal=u"1")
+        self.assertEqual(conn.execute("pragma journal_mode").fetchone()[0],
+                         u"wal")
+        count = conn.execute("select count(*) from links").fetchone()[0]
+        self.assertEqual(count, num)
+        conn.close()
+        # an existing table is replaced
+        conn = self.log_urls(urls[:1], dbname=u"links")
+        count = conn.execute("select count(*) from links").fetchone()[0]
+        self.assertEqual(count, 1)
+        conn.close()
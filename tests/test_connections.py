@@ -0,0 +1,116 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test the HTTP connections shared by the checker threads.
+"""
+
+import unittest
+import time
+import threading
+import BaseHTTPServer
+import SocketServer
+import requests
+from linkcheck.director import aggregator, connections
+from linkcheck.cache import hosts
+from linkcheck.configuration import Configuration
+
+
+class KeepAliveHandler (BaseHTTPServer.BaseHTTPRequestHandler):
+    """Handler keeping connections open."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET (self):
+        """Send a short response."""
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write("ok")
+
+    def log_message (self, format, *args):
+        """Logging is disabled."""
+        pass
+
+
+class ThreadingHttpServer (SocketServer.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    """HTTP server with one thread per connection."""
+    daemon_threads = True
+
+
+class TestConnections (unittest.TestCase):
+    """Test connection reuse and statistics."""
+
+    def setUp (self):
+        self.server = ThreadingHttpServer(("localhost", 0), KeepAliveHandler)
+        self.url = "http://localhost:%d/" % self.server.server_port
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.config = Configuration()
+
+    def tearDown (self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get (self, adapter):
+        """Send a request with a new session using the given adapter."""
+        session = aggregator.new_request_session(self.config, None, adapter)
+        response = session.get(self.url)
+        self.assertEqual(response.content, "ok")
+
+    def test_reuse (self):
+        adapter = connections.SharedHTTPAdapter(4, 400, 30)
+        for dummy in range(3):
+            self.get(adapter)
+        self.assertEqual(adapter.get_stats(),
+                         dict(requests=3, connections=1, handshakes=0))
+        adapter.close()
+
+    def test_idle_timeout (self):
+        adapter = connections.SharedHTTPAdapter(4, 400, 0.05)
+        self.get(adapter)
+        self.get(adapter)
+        time.sleep(0.1)
+        self.get(adapter)
+        self.assertEqual(adapter.get_stats(),
+                         dict(requests=3, connections=2, handshakes=0))
+        adapter.close()
+
+    def test_max_connections (self):
+        adapter = connections.SharedHTTPAdapter(4, 10, 30)
+        self.assertEqual(adapter.poolmanager.pools._maxsize, 2)
+        adapter.close()
+
+    def test_host_cache (self):
+        host_cache = hosts.HostCache(300, 60)
+        adapter = connections.SharedHTTPAdapter(1, 400, 0,
+                                                host_cache=host_cache)
+        self.get(adapter)
+        self.assertEqual(host_cache.misses, 1)
+        self.assertEqual(len(host_cache), 1)
+        adapter.close()
+
+    def test_host_cache_no_addresses (self):
+        host_cache = hosts.HostCache(300, 60)
+        host_cache.get_addresses = lambda host: []
+        adapter = connections.SharedHTTPAdapter(1, 400, 0,
+                                                host_cache=host_cache)
+        session = aggregator.new_request_session(self.config, None, adapter)
+        self.assertRaises(requests.exceptions.ConnectionError,
+                          session.get, self.url)
+        adapter.close()
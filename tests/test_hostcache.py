@@ -0,0 +1,92 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test host address cache.
+"""
+
+import unittest
+import socket
+import time
+from linkcheck.cache import hosts
+
+
+class TestLookupCache (unittest.TestCase):
+
+    def setUp (self):
+        self.keys = []
+
+    def lookup (self, key):
+        """Count lookups, and fail for keys starting with 'x'."""
+        self.keys.append(key)
+        if key.startswith(u"x"):
+            return None, []
+        return time.time() + 300, key.upper()
+
+    def test_get (self):
+        cache = hosts.LookupCache(negative_ttl=0)
+        for dummy in range(2):
+            self.assertEqual(cache.get(u"a", self.lookup), u"A")
+            self.assertEqual(cache.get(u"b", self.lookup), u"B")
+        self.assertEqual(self.keys, [u"a", u"b"])
+
+    def test_negative_ttl (self):
+        cache = hosts.LookupCache(negative_ttl=0)
+        cache.get(u"x", self.lookup)
+        time.sleep(0.01)
+        self.assertEqual(cache.get(u"x", self.lookup), [])
+        self.assertEqual(self.keys, [u"x", u"x"])
+
+
+class TestHostCache (unittest.TestCase):
+
+    def test_addresses (self):
+        cache = hosts.HostCache(ttl=300, negative_ttl=60)
+        self.assertTrue("127.0.0.1" in cache.get_addresses(u"localhost"))
+        self.assertTrue("127.0.0.1" in cache.get_addresses(u"LocalHost"))
+        self.assertEqual(len(cache), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_negative (self):
+        cache = hosts.HostCache(ttl=300, negative_ttl=60)
+        for dummy in range(2):
+            self.assertRaises(socket.error, cache.get_addresses,
+                              u"example.invalid")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_expiry (self):
+        cache = hosts.HostCache(ttl=0, negative_ttl=0)
+        cache.get_addresses(u"localhost")
+        time.sleep(0.01)
+        cache.get_addresses(u"localhost")
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+    def test_max_size (self):
+        cache = hosts.HostCache(ttl=300, negative_ttl=60, max_size=4)
+        for i in range(5):
+            cache.get_addresses(u"127.0.0.%d" % (i + 1))
+        self.assertTrue(len(cache) <= 4)
+        self.assertTrue(u"127.0.0.5" in cache.entries)
+
+    def test_prefetch (self):
+        cache = hosts.HostCache(ttl=300, negative_ttl=60)
+        cache.prefetch(u"localhost")
+        for dummy in range(100):
+            if len(cache):
+                break
+            time.sleep(0.01)
+        self.assertTrue("127.0.0.1" in cache.get_addresses(u"localhost"))
+        self.assertEqual(cache.hits, 1)
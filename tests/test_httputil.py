@@ -0,0 +1,73 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test HTTP utility functions.
+"""
+
+import unittest
+from linkcheck import httputil
+
+
+class SslSocket (object):
+    """SSL socket stub counting the certificate requests."""
+
+    def __init__ (self, cert):
+        self.cert = cert
+        self.num_calls = 0
+
+    def cipher (self):
+        return None
+
+    def getpeercert (self):
+        self.num_calls += 1
+        return self.cert
+
+
+class Connection (object):
+    """HTTPS connection stub."""
+
+    def __init__ (self, sock):
+        self.sock = sock
+
+
+class TestHttputil (unittest.TestCase):
+
+    def test_ssl_cert_cache (self):
+        sock = SslSocket(dict(notAfter="Jan  1 00:00:00 2030 GMT"))
+        connection = Connection(sock)
+        for dummy in range(3):
+            self.assertEqual(httputil.get_ssl_cert(connection), sock.cert)
+        self.assertEqual(sock.num_calls, 1)
+        # a reconnected connection has a new certificate
+        connection.sock = SslSocket(dict(notAfter="Jan  1 00:00:00 2031 GMT"))
+        self.assertEqual(httputil.get_ssl_cert(connection),
+                         connection.sock.cert)
+        self.assertEqual(connection.sock.num_calls, 1)
+
+    def test_max_age (self):
+        self.assertEqual(httputil.get_max_age({}), None)
+        headers = {"Cache-Control": "public, max-age=3600"}
+        self.assertEqual(httputil.get_max_age(headers), 3600)
+        headers = {"Cache-Control": "no-cache"}
+        self.assertEqual(httputil.get_max_age(headers), 0)
+        headers = {
+            "Date": "Sat, 01 Jan 2030 00:00:00 GMT",
+            "Expires": "Sat, 01 Jan 2030 01:00:00 GMT",
+        }
+        self.assertEqual(httputil.get_max_age(headers), 3600)
+        headers = {"Expires": "0"}
+        self.assertEqual(httputil.get_max_age(headers), 0)
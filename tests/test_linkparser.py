@@ -129,3 +129,38 @@ class TestLinkparser (unittest.TestCase):
         url = u'http://example.com/bla/a=b'
         content = u'<a href="%s&quot;">'
         self._test_one_link(content % url, url + u'"')
+
+    def test_html_analyzer (self):
+        content = u"""<html><head><title>A title</title>
+<meta name="robots" content="noindex,nofollow"></head>
+<body><meta name="robots" content="index">
+<a name="top" href="link1">x</a><p id="para"><img src="link2"></p>
+</body></html>"""
+        h = linkparse.HtmlAnalyzer()
+        p = linkcheck.HtmlParser.htmlsax.parser(h)
+        h.parser = p
+        p.feed(content)
+        p.flush()
+        h.parser = None
+        p.handler = None
+        self.assertEqual([x[0] for x in h.links], [u"link1", u"link2"])
+        self.assertEqual([x[0] for x in h.anchors], [u"top", u"para"])
+        self.assertEqual(h.title, u"A title")
+        self.assertFalse(h.follow)
+        self.assertFalse(h.index)
+
+    def test_prefetch (self):
+        hosts = []
+        def callback (url, line, column, name, base):
+            pass
+        h = linkparse.LinkFinder(callback, linkparse.LinkTags,
+                                 prefetch=hosts.append)
+        p = linkcheck.HtmlParser.htmlsax.parser(h)
+        h.parser = p
+        p.feed(u'<a href="http://Example.com/a"><a href="relative">'
+               u'<img src="//example.org:8080/b.png">'
+               u'<a href="mailto:user@example.net"><a href="https://[bad">')
+        p.flush()
+        h.parser = None
+        p.handler = None
+        self.assertEqual(hosts, ["example.com", "example.org"])
@@ -0,0 +1,118 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test the writer thread of the aggregate logger.
+"""
+
+import unittest
+import time
+import threading
+from linkcheck.director import logger
+from . import UrlData
+
+
+class LoggerStub (object):
+    """Logger stub recording its calls."""
+
+    def __init__ (self):
+        self.is_active = True
+        self.calls = []
+        self.wait = None
+
+    def start_output (self):
+        self.calls.append("start")
+
+    def log_filter_url (self, url_data, do_print):
+        if self.wait is not None:
+            self.wait.wait()
+        self.calls.append(url_data.url)
+
+    def log_internal_error (self):
+        self.calls.append("error")
+
+    def flush (self):
+        self.calls.append("flush")
+
+    def end_output (self, **kwargs):
+        self.calls.append("end")
+
+
+def get_logger (queue_size):
+    """Get aggregate logger with two logger stubs."""
+    config = dict(logger=LoggerStub(), fileoutput=[LoggerStub()],
+                  verbose=False, warnings=True, logqueuesize=queue_size)
+    return logger.Logger(config)
+
+
+class TestLogQueue (unittest.TestCase):
+    """Test logging check results with the writer thread."""
+
+    def test_order (self):
+        aggregate_logger = get_logger(10)
+        aggregate_logger.start_log_output()
+        aggregate_logger.log_url(UrlData(u"a"))
+        aggregate_logger.log_internal_error()
+        aggregate_logger.log_url(UrlData(u"b"))
+        aggregate_logger.end_log_output()
+        for test_logger in aggregate_logger.loggers:
+            calls = [x for x in test_logger.calls if x != "flush"]
+            self.assertEqual(calls, ["start", u"a", "error", u"b", "end"])
+            # the output is flushed before it ends
+            self.assertEqual(test_logger.calls[-2], "flush")
+
+    def test_backpressure (self):
+        aggregate_logger = get_logger(1)
+        test_logger = aggregate_logger.loggers[0]
+        test_logger.wait = threading.Event()
+        aggregate_logger.start_log_output()
+        aggregate_logger.log_url(UrlData(u"a"))
+        while not aggregate_logger.queue.empty():
+            time.sleep(0.01)
+        # the writer logs a, b is queued and the queue is full
+        aggregate_logger.log_url(UrlData(u"b"))
+        thread = threading.Thread(target=aggregate_logger.log_url,
+                                  args=(UrlData(u"c"),))
+        thread.start()
+        try:
+            thread.join(0.1)
+            self.assertTrue(thread.is_alive())
+        finally:
+            test_logger.wait.set()
+        thread.join()
+        aggregate_logger.end_log_output()
+        self.assertEqual([x for x in test_logger.calls if x != "flush"],
+                         ["start", u"a", u"b", u"c", "end"])
+
+    def test_flush (self):
+        aggregate_logger = get_logger(10)
+        test_logger = aggregate_logger.loggers[0]
+        flushed = threading.Event()
+        test_logger.flush = flushed.set
+        aggregate_logger.start_log_output()
+        aggregate_logger.log_url(UrlData(u"a"))
+        # the output is flushed when no result arrives
+        self.assertTrue(flushed.wait(logger.FlushSeconds * 5))
+        aggregate_logger.end_log_output()
+
+    def test_synchronous (self):
+        aggregate_logger = get_logger(0)
+        aggregate_logger.start_log_output()
+        self.assertTrue(aggregate_logger.writer is None)
+        aggregate_logger.log_url(UrlData(u"a"))
+        for test_logger in aggregate_logger.loggers:
+            self.assertEqual(test_logger.calls, ["start", u"a"])
+        aggregate_logger.end_log_output()
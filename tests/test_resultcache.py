@@ -0,0 +1,196 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test result cache.
+"""
+
+import unittest
+import sys
+import threading
+from linkcheck.cache import results
+from linkcheck.checker.urlbase import CompactUrlData, urlDataAttr
+
+
+def get_result (url):
+    """Get a result object for given URL."""
+    attrs = dict((attr, None) for attr in urlDataAttr)
+    attrs["url"] = url
+    attrs["warnings"] = []
+    attrs["info"] = []
+    return CompactUrlData(attrs)
+
+
+class TestResultCache (unittest.TestCase):
+
+    def test_lru (self):
+        cache = results.ResultCache(max_size=2, num_shards=1)
+        for key in (u"a", u"b"):
+            cache.add_result(key, get_result(key))
+        # use a, so b is the least recently used result
+        self.assertEqual(cache.get_result(u"a").url, u"a")
+        cache.add_result(u"c", get_result(u"c"))
+        self.assertTrue(cache.has_result(u"a"))
+        self.assertFalse(cache.has_result(u"b"))
+        self.assertTrue(cache.has_result(u"c"))
+        self.assertEqual(cache.get_result(u"b"), None)
+        stats = cache.get_stats()
+        self.assertEqual(stats, dict(hits=1, misses=1, evictions=1, size=2))
+        self.assertEqual(cache.num_added, 3)
+
+    def test_evicted_used_key (self):
+        cache = results.ResultCache(max_size=2, num_shards=1)
+        shard = cache.shards[0]
+        for key in (u"a", u"b", u"c"):
+            cache.add_result(key, get_result(key))
+        # a lookup marked a after another thread evicted it
+        self.assertFalse(cache.has_result(u"a"))
+        shard.used.add(u"a")
+        # a re-added result gets no second chance from the stale mark
+        cache.add_result(u"a", get_result(u"a"))
+        self.assertEqual(shard.used, set())
+        # stale marks of results that are not re-added are removed
+        shard.used.update((u"x", u"y", u"z"))
+        cache.add_result(u"d", get_result(u"d"))
+        self.assertEqual(shard.used, set())
+        self.assertEqual(len(cache), 2)
+
+    def test_none_key (self):
+        cache = results.ResultCache()
+        cache.add_result(None, get_result(u"a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_max_bytes (self):
+        size = results.get_result_size(u"a", get_result(u"a"))
+        cache = results.ResultCache(max_size=None, max_bytes=size * 5,
+                                    num_shards=1)
+        for i in range(10):
+            key = u"%d" % i
+            cache.add_result(key, get_result(key))
+        self.assertEqual(len(cache), 5)
+        self.assertTrue(cache.shards[0].num_bytes <= size * 5)
+        self.assertEqual(cache.get_stats()["evictions"], 5)
+        self.assertTrue(cache.has_result(u"9"))
+        self.assertFalse(cache.has_result(u"0"))
+        # replacing a result does not count twice
+        cache.add_result(u"9", get_result(u"9"))
+        self.assertEqual(len(cache), 5)
+        self.assertEqual(cache.get_stats()["evictions"], 5)
+
+    def test_shards (self):
+        cache = results.ResultCache(max_size=100, num_shards=4)
+        self.assertEqual(len(cache.shards), 4)
+        self.assertEqual(cache.shards[0].max_size, 25)
+        for i in range(100):
+            key = u"http://example.org/%d" % i
+            cache.add_result(key, get_result(key))
+        self.assertTrue(len(cache) > 50)
+        self.assertEqual(cache.num_added, 100)
+        for shard in cache.shards:
+            self.assertTrue(len(shard.cache) <= 25)
+            for key in shard.cache:
+                self.assertTrue(cache.get_shard(key) is shard)
+
+
+class ContentionLock (object):
+    """Lock wrapper counting all and contended acquisitions."""
+
+    def __init__ (self, lock):
+        self.lock = lock
+        self.acquired = 0
+        self.contended = 0
+
+    def __enter__ (self):
+        # count with acquired lock, since += is not atomic
+        if self.lock.acquire(False):
+            self.acquired += 1
+        else:
+            self.lock.acquire()
+            self.acquired += 1
+            self.contended += 1
+
+    def __exit__ (self, *args):
+        self.lock.release()
+
+
+class GlobalLockCache (object):
+    """Result cache where every access holds one global lock,
+    like the result cache before it was split into shards."""
+
+    def __init__ (self, lock):
+        self.cache = results.ResultCache(num_shards=1)
+        self.lock = lock
+
+    def get_result (self, key):
+        with self.lock:
+            return self.cache.get_result(key)
+
+    def add_result (self, key, result):
+        with self.lock:
+            self.cache.add_result(key, result)
+
+
+class TestResultCacheContention (unittest.TestCase):
+    """Benchmark lock usage of the result cache with several threads
+    looking up and adding results. As on real sites most lookups are
+    hits since many pages link to the same URLs."""
+
+    num_threads = 8
+    num_keys = 500
+    num_lookups = 4000
+
+    def run_workload (self, cache):
+        """Run the lookup workload with several threads."""
+        keys = [u"http://example.org/%d" % i for i in range(self.num_keys)]
+        result = get_result(keys[0])
+
+        def work (offset):
+            for i in range(self.num_lookups):
+                key = keys[(i * 7 + offset) % self.num_keys]
+                if cache.get_result(key) is None:
+                    cache.add_result(key, result)
+
+        threads = [threading.Thread(target=work, args=(i * 97,))
+                   for i in range(self.num_threads)]
+        # switch threads as often as possible
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        try:
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            sys.setcheckinterval(interval)
+
+    def test_contention (self):
+        lock = ContentionLock(results.get_lock("test"))
+        self.run_workload(GlobalLockCache(lock))
+        cache = results.ResultCache()
+        locks = []
+        for shard in cache.shards:
+            shard.lock = ContentionLock(shard.lock)
+            locks.append(shard.lock)
+        self.run_workload(cache)
+        acquired = sum(l.acquired for l in locks)
+        contended = sum(l.contended for l in locks)
+        self.assertTrue(lock.acquired >= self.num_threads * self.num_lookups)
+        # only adding results needs a lock
+        self.assertTrue(acquired < self.num_keys * 2, acquired)
+        self.assertTrue(lock.contended > 0)
+        self.assertTrue(contended < lock.contended,
+            "%d contended of %d with shards, %d of %d with one lock" %
+            (contended, acquired, lock.contended, lock.acquired))
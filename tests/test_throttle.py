@@ -0,0 +1,55 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test host throttling.
+"""
+
+import unittest
+from linkcheck.director import throttle
+
+
+class TestHostThrottle (unittest.TestCase):
+
+    def test_interval (self):
+        t = throttle.HostThrottle(10)
+        self.assertEqual(t.reserve(u"a"), 0)
+        wait = t.reserve(u"a")
+        self.assertTrue(0.09 < wait <= 0.1, wait)
+        wait = t.reserve(u"a")
+        self.assertTrue(0.19 < wait <= 0.2, wait)
+        # other hosts are not affected
+        self.assertEqual(t.reserve(u"b"), 0)
+        wait_times = t.get_wait_times()
+        self.assertEqual(list(wait_times), [u"a"])
+        self.assertTrue(0.28 < wait_times[u"a"] <= 0.3)
+
+    def test_burst (self):
+        t = throttle.HostThrottle(10, burst=3)
+        self.assertEqual(t.reserve(u"a"), 0)
+        self.assertEqual(t.reserve(u"a"), 0)
+        self.assertEqual(t.reserve(u"a"), 0)
+        self.assertTrue(t.reserve(u"a") > 0)
+
+    def test_crawl_delay (self):
+        t = throttle.HostThrottle(10)
+        t.set_crawl_delay(u"a", 5)
+        self.assertEqual(t.get_due_time(u"a"), 0)
+        t.reserve(u"a")
+        wait = t.reserve(u"a")
+        self.assertTrue(4.9 < wait <= 5, wait)
+        t.set_crawl_delay(u"a", 0)
+        self.assertEqual(t.get_interval(u"a"), 0.1)
@@ -0,0 +1,183 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test URL queue routines.
+"""
+
+import unittest
+import time
+from linkcheck.cache import urlqueue
+
+
+class Cache (object):
+    """Result cache stub."""
+
+    def __init__ (self):
+        self.results = set()
+
+    def has_result (self, key):
+        return key in self.results
+
+
+class Aggregate (object):
+    """Aggregate stub with result cache and host due times."""
+
+    def __init__ (self):
+        self.result_cache = Cache()
+        self.times = {}
+
+    def get_host_due_time (self, host):
+        return self.times.get(host, 0)
+
+
+class UrlData (object):
+    """URL data stub."""
+
+    def __init__ (self, aggregate, host, path, parent_url=None,
+                  base_ref=None, line=0, column=0, page=0, name=u"",
+                  extern=None):
+        self.aggregate = aggregate
+        self.url = self.cache_url = self.base_url = u"http://%s%s" % (host, path)
+        self.urlparts = [u"http", host, path, u"", u""]
+        self.has_result = False
+        self.parent_url = parent_url
+        self.base_ref = base_ref
+        self.recursion_level = 1
+        self.line = line
+        self.column = column
+        self.page = page
+        self.name = name
+        self.extern = extern
+        self.anchor = None
+
+
+class TestUrlQueue (unittest.TestCase):
+    """Test host scheduling of the URL queue."""
+
+    def setUp (self):
+        self.aggregate = Aggregate()
+
+    def put (self, queue, host, path, **kwargs):
+        url_data = UrlData(self.aggregate, host, path, **kwargs)
+        queue.put(url_data)
+        return url_data
+
+    def test_fifo (self):
+        queue = urlqueue.UrlQueue()
+        for i in range(3):
+            self.put(queue, u"a", u"/%d" % i)
+        for i in range(3):
+            self.assertEqual(queue.get(timeout=0).url, u"http://a/%d" % i)
+        self.assertRaises(urlqueue.Empty, queue.get, timeout=0)
+
+    def test_max_connections_per_host (self):
+        queue = urlqueue.UrlQueue(max_connections_per_host=1)
+        self.put(queue, u"a", u"/1")
+        self.put(queue, u"a", u"/2")
+        self.put(queue, u"b", u"/1")
+        first = queue.get(timeout=0)
+        self.assertEqual(first.url, u"http://a/1")
+        # host a is busy
+        self.assertEqual(queue.get(timeout=0).url, u"http://b/1")
+        self.assertRaises(urlqueue.Empty, queue.get, timeout=0)
+        queue.task_done(first)
+        self.assertEqual(queue.get(timeout=0).url, u"http://a/2")
+        self.assertEqual(queue.qsize(), 0)
+
+    def test_host_due_time (self):
+        queue = urlqueue.UrlQueue()
+        self.aggregate.times[u"a"] = time.time() + 0.2
+        self.put(queue, u"a", u"/1")
+        self.put(queue, u"b", u"/1")
+        self.assertEqual(queue.get(timeout=0).url, u"http://b/1")
+        self.assertRaises(urlqueue.Empty, queue.get, timeout=0.01)
+        self.assertEqual(queue.get(timeout=1).url, u"http://a/1")
+        self.assertTrue(time.time() >= self.aggregate.times[u"a"])
+
+    def test_cached_first (self):
+        queue = urlqueue.UrlQueue()
+        self.put(queue, u"a", u"/1")
+        self.aggregate.result_cache.results.add(u"http://a/2")
+        self.put(queue, u"a", u"/2")
+        self.assertEqual(queue.get(timeout=0).url, u"http://a/2")
+
+    def test_promote (self):
+        queue = urlqueue.UrlQueue(max_connections_per_host=1)
+        first = self.put(queue, u"a", u"/1")
+        second = self.put(queue, u"a", u"/2")
+        self.put(queue, u"a", u"/3")
+        self.put(queue, u"b", u"/1")
+        self.assertTrue(queue.get(timeout=0) is first)
+        # eg. a redirect of a/1 to a/2
+        queue.promote(u"http://a/2")
+        # the promoted URL is returned although host a is busy
+        self.assertTrue(queue.get(timeout=0) is second)
+        queue.task_done(second)
+        queue.task_done(first)
+        urls = [queue.get(timeout=0).url for i in range(2)]
+        self.assertEqual(sorted(urls), [u"http://a/3", u"http://b/1"])
+        self.assertRaises(urlqueue.Empty, queue.get, timeout=0)
+        self.assertEqual(queue.promoted, set())
+        self.assertEqual(queue.pending, {})
+
+    def test_duplicates (self):
+        queue = urlqueue.UrlQueue()
+        first = self.put(queue, u"a", u"/1")
+        self.put(queue, u"a", u"/1", parent_url=u"http://a/2", line=3, name=u"x")
+        self.assertEqual(queue.qsize(), 2)
+        self.assertEqual(len(queue.host_queues[u"a"]), 1)
+        self.assertTrue(queue.get(timeout=0) is first)
+        # duplicates wait for the result of the first URL
+        self.put(queue, u"a", u"/1", line=4)
+        self.assertRaises(urlqueue.Empty, queue.get, timeout=0)
+        queue.promote(u"http://a/1")
+        refs = [queue.get(timeout=0) for i in range(2)]
+        self.assertTrue(isinstance(refs[0], urlqueue.UrlRef))
+        self.assertEqual(refs[0].url, u"http://a/1")
+        self.assertEqual(refs[0].parent_url, u"http://a/2")
+        self.assertEqual(refs[0].line, 3)
+        self.assertEqual(refs[0].name, u"x")
+        self.assertEqual(refs[1].line, 4)
+        for url_data in refs + [first]:
+            queue.task_done(url_data)
+        self.assertEqual(queue.refs, {})
+        self.assertEqual(queue.checking, set())
+        queue.join(timeout=0)
+
+    def test_duplicates_without_result (self):
+        queue = urlqueue.UrlQueue()
+        first = self.put(queue, u"a", u"/1")
+        self.put(queue, u"a", u"/1")
+        self.assertTrue(queue.get(timeout=0) is first)
+        self.assertRaises(urlqueue.Empty, queue.get, timeout=0)
+        # the check ended without adding a result
+        queue.task_done(first)
+        ref = queue.get(timeout=0)
+        self.assertTrue(isinstance(ref, urlqueue.UrlRef))
+        queue.task_done(ref)
+        queue.join(timeout=0)
+
+    def test_shutdown (self):
+        queue = urlqueue.UrlQueue()
+        self.put(queue, u"a", u"/1")
+        self.put(queue, u"b", u"/1")
+        url_data = queue.get(timeout=0)
+        queue.do_shutdown()
+        self.assertTrue(queue.empty())
+        self.assertEqual(queue.unfinished_tasks, 1)
+        queue.task_done(url_data)
+        queue.join(timeout=0)
@@ -0,0 +1,52 @@
+# -*- coding: iso-8859-1 -*-
+# Copyright (C) 2014 Bastian Kleineidam
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program; if not, write to the Free Software Foundation, Inc.,
+# 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+"""
+Test the URL string table.
+"""
+
+import unittest
+from linkcheck.cache.urls import UrlTable
+
+
+def new_url (path):
+    """Get new string object of an URL."""
+    return u"".join([u"http://example.org/", path])
+
+
+class TestUrlTable (unittest.TestCase):
+    """Test sharing URL strings."""
+
+    def test_intern (self):
+        table = UrlTable()
+        url = new_url(u"a")
+        self.assertTrue(table.intern(url) is url)
+        other = new_url(u"a")
+        self.assertFalse(other is url)
+        self.assertTrue(table.intern(other) is url)
+        self.assertEqual(len(table), 1)
+        self.assertTrue(table.intern(None) is None)
+        self.assertEqual(table.intern(u""), u"")
+        self.assertEqual(len(table), 1)
+
+    def test_max_size (self):
+        table = UrlTable(max_size=2)
+        urls = [table.intern(new_url(u"%d" % i)) for i in range(3)]
+        # the full table has been cleared
+        self.assertEqual(len(table), 0)
+        url = new_url(u"0")
+        self.assertTrue(table.intern(url) is url)
+        self.assertFalse(url is urls[0])